@@ -0,0 +1,1126 @@
+"""
+성능 측정 스크립트 모음.
+
+사용법:
+    python benchmark.py client [--requests N] [--connect-delay 초]
+    python benchmark.py stream [--requests N] [--prompt-delay 초] [--token-delay 초]
+    python benchmark.py router [--requests N] [--slow-delay 초] [--failure-rate 비율]
+    python benchmark.py pipeline [--requests N] [--latency 초]
+    python benchmark.py tiering [--requests N]
+    python benchmark.py cancel [--requests N] [--cancel-after 초]
+    python benchmark.py council [--requests N] [--latency 초]
+    python benchmark.py scheduler [--requests N] [--parallel N] [--background N]
+    python benchmark.py encoding [--positions N] [--mock]
+    python benchmark.py registry [--iterations N]
+    python benchmark.py journal [--positions N] [--seed N]
+    python benchmark.py safety [--repeat N]
+    python benchmark.py loop [--positions N] [--frames N] [--seed N]
+    python benchmark.py session [--games N] [--max-plies N] [--seed N]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import random
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import chess
+import ollama
+
+import persuade
+from chess_logic import (
+    apply_move,
+    compute_game_status,
+    council_persuade,
+    get_game_status,
+    get_square_safety,
+    is_move_valid,
+    move_piece,
+    prepare_council,
+    prepare_persuaded_move,
+    undo_move,
+)
+from game_session import GameSession, RandomEngine
+from history_manager import count_message_tokens, estimate_tokens, truncate_to_tokens
+from llm_backend import MockBackend, OllamaBackend
+from llm_client import create_ollama_client
+from llm_router import LLMRouter
+from llm_scheduler import LLMScheduler, RequestDropped
+from persuasion_worker import submit_persuasion
+from position_cache import POSITION_CACHE
+from safety_table import SafetyTableCache, build_safety_table, move_safety
+from start_chess import initialize_game
+
+
+# --- 1. 로컬 대역(stand-in) Ollama 서버 ---
+class StubOllamaServer:
+    """
+    /api/chat 요청에 고정된 응답을 돌려주는 로컬 Ollama 대역 서버입니다.
+
+    Args:
+        reply (str): assistant 응답 내용
+        connect_delay (float): 새 TCP 연결마다 추가되는 지연(초).
+                               RunPod 프록시의 TLS 핸드셰이크 비용을 흉내냅니다.
+        response_delay (float): 요청마다 첫 토큰 전에 추가되는 지연(초).
+                                (프롬프트 평가 시간 대역)
+        token_delay (float): 응답 토큰(2글자 단위)마다 추가되는 생성 지연(초)
+        failure_rate (float): 요청이 HTTP 503으로 실패할 확률 (0~1)
+        jitter (float): 요청마다 0~jitter초의 임의 지연을 추가 (느린 꼬리 지연 대역)
+        model_speeds (dict): {모델 이름: (response_delay, token_delay)}.
+                             모델별로 속도를 다르게 흉내낼 때 사용
+    요청의 options.num_predict가 있으면 응답을 그 토큰 수에서 자릅니다.
+    """
+
+    def __init__(
+        self,
+        reply: str = "[수락][알겠습니다, 폐하!]",
+        connect_delay: float = 0.0,
+        response_delay: float = 0.0,
+        token_delay: float = 0.0,
+        failure_rate: float = 0.0,
+        jitter: float = 0.0,
+        seed: int = 0,
+        model_speeds: dict = None,
+    ):
+        self.reply = reply
+        self.connect_delay = connect_delay
+        self.response_delay = response_delay
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.jitter = jitter
+        self.model_speeds = model_speeds or {}
+        self._random = random.Random(seed)
+        self.connections = 0
+        self.requests = 0
+        self.failures = 0
+        self.streamed_tokens = 0
+        self.aborted_streams = 0
+        self.last_stream_end = 0.0
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> str:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive 허용
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                with stub._lock:
+                    stub.connections += 1
+                if stub.connect_delay:
+                    time.sleep(stub.connect_delay)
+                super().setup()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub._lock:
+                    stub.requests += 1
+                    fail = stub._random.random() < stub.failure_rate
+                    extra_delay = stub._random.uniform(0, stub.jitter)
+                    if fail:
+                        stub.failures += 1
+                if fail:
+                    self.send_json(503, {"error": "stub: 서버 과부하"})
+                    return
+                response_delay, _ = stub.speed(request)
+                if response_delay or extra_delay:
+                    time.sleep(response_delay + extra_delay)
+
+                if request.get("stream"):
+                    self.send_stream(request)
+                    return
+
+                _, token_delay = stub.speed(request)
+                tokens = stub.reply_tokens(request)
+                if token_delay:
+                    time.sleep(token_delay * len(tokens))
+                response = stub.build_response(request, "".join(tokens))
+                response["eval_count"] = estimate_tokens(response["message"]["content"])
+                self.send_json(200, response)
+
+            def do_GET(self):
+                # 상태 확인용 (/api/tags, /api/version)
+                self.send_json(200, {"models": [], "version": "stub"})
+
+            def send_json(self, status: int, data: dict):
+                body = json.dumps(data).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_stream(self, request):
+                # NDJSON 청크 스트리밍 (Transfer-Encoding: chunked)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                _, token_delay = stub.speed(request)
+                tokens = stub.reply_tokens(request)
+                try:
+                    for i, token in enumerate(tokens):
+                        if token_delay:
+                            time.sleep(token_delay)
+                        part = stub.build_response(request, token)
+                        part["done"] = i == len(tokens) - 1
+                        if part["done"]:
+                            part["eval_count"] = estimate_tokens("".join(tokens))
+                        self.write_chunk(json.dumps(part).encode("utf-8") + b"\n")
+                        with stub._lock:
+                            stub.streamed_tokens += 1
+                    self.wfile.write(b"0\r\n\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    # 클라이언트가 스트림을 닫음 -> 생성 중단
+                    with stub._lock:
+                        stub.aborted_streams += 1
+                finally:
+                    with stub._lock:
+                        stub.last_stream_end = time.perf_counter()
+
+            def write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+
+            def log_message(self, format, *args):
+                pass  # 벤치마크 출력이 지저분해지지 않도록 로그 생략
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.url
+
+    def speed(self, request: dict) -> (float, float):
+        return self.model_speeds.get(
+            request.get("model"), (self.response_delay, self.token_delay)
+        )
+
+    def reply_tokens(self, request: dict = None) -> list:
+        # (num_predict는 dialogue_options와 같은 estimate_tokens 비율로 자름)
+        reply = self.reply
+        num_predict = ((request or {}).get("options") or {}).get("num_predict", -1)
+        if num_predict > 0:
+            reply = truncate_to_tokens(reply, num_predict)
+        return [reply[i : i + 2] for i in range(0, len(reply), 2)]
+
+    def build_response(self, request: dict, content: str = None) -> dict:
+        return {
+            "model": request.get("model", "stub"),
+            "created_at": "2024-01-01T00:00:00Z",
+            "message": {
+                "role": "assistant",
+                "content": self.reply if content is None else content,
+            },
+            "done": True,
+            "prompt_eval_count": count_message_tokens(request.get("messages", [])),
+            "prompt_eval_duration": int(self.speed(request)[0] * 1e9),
+        }
+
+    def stop(self):
+        if self._httpd:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+
+# --- 2. 공통 헬퍼 ---
+def summarize(label: str, samples: list):
+    """
+    지연 시간 샘플(초)을 ms 단위 요약으로 출력합니다.
+    """
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(
+        f"{label:<28} n={len(ms):<4} 평균 {statistics.mean(ms):7.2f}ms "
+        f"p50 {statistics.median(ms):7.2f}ms p95 {p95:7.2f}ms"
+    )
+
+
+# --- 3. 벤치마크: 요청마다 새 클라이언트 vs 공유 연결 풀 ---
+def bench_client(args):
+    messages = [{"role": "user", "content": "전진하라"}]
+
+    def run(label, get_client):
+        stub = StubOllamaServer(connect_delay=args.connect_delay)
+        url = stub.start()
+        samples = []
+        try:
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                get_client(url).chat(model="stub", messages=messages)
+                samples.append(time.perf_counter() - start)
+        finally:
+            stub.stop()
+        summarize(label, samples)
+        print(f"{'':<28} 서버가 받은 새 연결 수: {stub.connections}")
+
+    print(f"--- 새 연결 지연(핸드셰이크 대역): {args.connect_delay * 1000:.0f}ms ---")
+    run("before: 요청마다 새 Client", lambda url: ollama.Client(host=url))
+
+    shared = {}
+
+    def get_shared(url):
+        if url not in shared:
+            shared[url] = create_ollama_client(url)
+        return shared[url]
+
+    run("after: 공유 연결 풀", get_shared)
+
+
+# --- 4. 벤치마크: 전체 응답 대기 vs 스트리밍 (첫 피드백까지의 시간) ---
+def bench_stream(args):
+    stub = StubOllamaServer(
+        reply="[수락][알겠습니다, 폐하! 가문의 영광을 위해 목숨을 바치겠습니다!]",
+        response_delay=args.prompt_delay,
+        token_delay=args.token_delay,
+    )
+    persuade.LLM_BACKEND = OllamaBackend(LLMRouter([stub.start()]))
+    # (빠른 결정/설득 캐시가 답하면 LLM을 부르지 않으므로 양쪽 모두 실제 호출하도록 끔)
+    persuade.DECISION_SCORER.enabled = False
+    persuade.PERSUASION_CACHE.enabled = False
+
+    board, white_ids, piece_data = initialize_game()
+
+    def persuade_once(**callbacks):
+        fresh_piece_data = copy.deepcopy(piece_data)
+        return persuade.persuade_piece(
+            board.copy(),
+            fresh_piece_data,
+            white_ids,
+            "e2e4",
+            "전진하라",
+            1,
+            0,
+            1,
+            use_cache=False,
+            **callbacks,
+        )
+
+    blocking_total = []
+    stream_first, stream_total = [], []
+    try:
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            persuade_once()
+            blocking_total.append(time.perf_counter() - start)
+
+            first = []
+            start = time.perf_counter()
+            persuade_once(
+                on_decision=lambda d: first.append(time.perf_counter() - start),
+                on_dialogue=lambda d, text: None,
+            )
+            stream_total.append(time.perf_counter() - start)
+            stream_first.append(first[0])
+    finally:
+        stub.stop()
+
+    print(
+        f"--- 프롬프트 평가 {args.prompt_delay * 1000:.0f}ms, "
+        f"토큰당 {args.token_delay * 1000:.0f}ms ---"
+    )
+    summarize("before: 전체 응답 대기", blocking_total)
+    summarize("after: 결정 도착(첫 피드백)", stream_first)
+    summarize("after: 스트리밍 완료", stream_total)
+
+
+# --- 5. 벤치마크: 단일 서버 vs 여러 서버 라우터 (+헤징) ---
+def bench_router(args):
+    messages = [{"role": "user", "content": "전진하라"}]
+
+    def make_stubs():
+        # 기존 pod(빠르지만 가끔 실패하고 느린 꼬리가 있음), 안정적인 서버, 항상 느린 서버
+        return [
+            StubOllamaServer(
+                response_delay=0.05,
+                failure_rate=args.failure_rate,
+                jitter=args.slow_delay,
+                seed=1,
+            ),
+            StubOllamaServer(response_delay=0.1),
+            StubOllamaServer(response_delay=args.slow_delay),
+        ]
+
+    class FixedRetryClient:
+        # 라우터 도입 전 query_ollama와 같은 동작: 한 서버에 1초 간격 5회 재시도
+        hedge = False
+
+        def __init__(self, url):
+            self.client = create_ollama_client(url)
+
+        def chat(self, **kwargs):
+            for attempt in range(5):
+                try:
+                    return self.client.chat(**kwargs)
+                except Exception:
+                    if attempt == 4:
+                        raise
+                    time.sleep(1)
+
+        def close(self):
+            pass
+
+    def run(label, make_router):
+        stubs = make_stubs()
+        router = make_router([stub.start() for stub in stubs])
+        samples, errors = [], 0
+        try:
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                try:
+                    router.chat(model="stub", messages=messages)
+                except Exception:
+                    errors += 1
+                samples.append(time.perf_counter() - start)
+        finally:
+            for stub in stubs:
+                stub.stop()
+            router.close()
+        summarize(label, samples)
+        served = ", ".join(str(stub.requests - stub.failures) for stub in stubs)
+        print(f"{'':<28} 실패 {errors}건, 서버별 처리 수: {served}")
+        if router.hedge:
+            print(
+                f"{'':<28} 헤징 {router.hedged_requests}회, "
+                f"두 번째 서버 승리 {router.hedge_wins}회"
+            )
+
+    print(
+        f"--- 기존 pod 실패율 {args.failure_rate:.0%}, "
+        f"느린 지연 {args.slow_delay * 1000:.0f}ms ---"
+    )
+    run("before: 단일 pod 1초 재시도", lambda urls: FixedRetryClient(urls[0]))
+    run("after: 라우터", lambda urls: LLMRouter(urls, deadline=args.deadline))
+    run(
+        "after: 라우터 + 헤징",
+        lambda urls: LLMRouter(urls, deadline=args.deadline, hedge=True),
+    )
+
+
+# --- 6. 벤치마크: 가짜 LLM으로 설득 파이프라인 전체 처리량 측정 ---
+def bench_pipeline(args):
+    persuade.LLM_BACKEND = MockBackend(latency=args.latency)
+    board, white_ids, piece_data = initialize_game()
+    moves = [m.uci() for m in board.legal_moves]
+    dialogues = ["전진하라", "가문의 영광을 위해 앞으로 나아가라!", "부탁한다"]
+
+    samples, decisions = [], {}
+    started = time.perf_counter()
+    for i in range(args.requests):
+        fresh_piece_data = copy.deepcopy(piece_data)
+        start = time.perf_counter()
+        decision, _ = persuade.persuade_piece(
+            board.copy(),
+            fresh_piece_data,
+            white_ids,
+            moves[i % len(moves)],
+            dialogues[i % len(dialogues)],
+            i % 3,
+            i % 2,
+            1,
+            use_cache=False,
+        )
+        samples.append(time.perf_counter() - start)
+        decisions[decision] = decisions.get(decision, 0) + 1
+    elapsed = time.perf_counter() - started
+
+    print(f"--- 가짜 LLM 지연 {args.latency * 1000:.0f}ms ---")
+    summarize("설득 1건 (준비+호출+반영)", samples)
+    print(f"{'':<28} 처리량 {args.requests / elapsed:.1f}건/초, 결정 분포 {decisions}")
+    print(persuade.DECISION_SCORER.report())
+    print(persuade.LLM_TELEMETRY.report())
+
+
+# --- 7. 벤치마크: 단일 모델 vs 결정(작은 모델) + 대사(큰 모델) 단계 분리 ---
+def bench_tiering(args):
+    stub = StubOllamaServer(
+        reply="[수락][알겠습니다, 폐하! 가문의 영광을 위해 목숨을 바치겠습니다!]",
+        model_speeds={
+            "large": (args.large_prompt_delay, args.large_token_delay),
+            "small": (args.small_prompt_delay, args.small_token_delay),
+        },
+    )
+    persuade.LLM_BACKEND = OllamaBackend(LLMRouter([stub.start()]))
+    persuade.DIALOGUE_MODEL = "large"
+    persuade.DECISION_MODEL = "small"
+    persuade.DECISION_SCORER.enabled = False  # 빠른 결정 없이 LLM 경로만 비교
+
+    board, white_ids, piece_data = initialize_game()
+
+    def persuade_once(streaming: bool) -> (float | None, float):
+        first = []
+        start = time.perf_counter()
+        callbacks = {}
+        if streaming:
+            callbacks = {
+                "on_decision": lambda d: first.append(time.perf_counter() - start),
+                "on_dialogue": lambda d, text: None,
+            }
+        persuade.persuade_piece(
+            board.copy(),
+            copy.deepcopy(piece_data),
+            white_ids,
+            "e2e4",
+            "전진하라",
+            1,
+            0,
+            1,
+            use_cache=False,
+            **callbacks,
+        )
+        return (first[0] if first else None), time.perf_counter() - start
+
+    results = {}
+    try:
+        for tiering in (False, True):
+            persuade.MODEL_TIERING = tiering
+            for streaming in (False, True):
+                for _ in range(args.requests):
+                    first, total = persuade_once(streaming)
+                    key = (tiering, streaming)
+                    results.setdefault(key, ([], []))
+                    if first is not None:
+                        results[key][0].append(first)
+                    results[key][1].append(total)
+    finally:
+        stub.stop()
+
+    print(
+        f"--- 큰 모델 {args.large_prompt_delay * 1000:.0f}ms + "
+        f"토큰당 {args.large_token_delay * 1000:.0f}ms, "
+        f"작은 모델 {args.small_prompt_delay * 1000:.0f}ms + "
+        f"토큰당 {args.small_token_delay * 1000:.0f}ms ---"
+    )
+    summarize("before: 단일 모델 전체 대기", results[(False, False)][1])
+    summarize("before: 단일 모델 결정 도착", results[(False, True)][0])
+    summarize("before: 단일 모델 스트리밍 완료", results[(False, True)][1])
+    summarize("after: 단계 분리 전체 대기", results[(True, False)][1])
+    summarize("after: 단계 분리 결정 도착", results[(True, True)][0])
+    summarize("after: 단계 분리 대사 완료", results[(True, True)][1])
+
+
+# --- 8. 벤치마크: 취소된 설득의 서버 점유 시간 ---
+def bench_cancel(args):
+    stub = StubOllamaServer(
+        reply="[거부][" + "폐하, 그 명령은 따를 수 없습니다. " * 6 + "]",
+        response_delay=args.prompt_delay,
+        token_delay=args.token_delay,
+    )
+    persuade.LLM_BACKEND = OllamaBackend(LLMRouter([stub.start()]))
+    persuade.DECISION_SCORER.enabled = False  # 항상 LLM이 대사를 생성하도록
+
+    board, white_ids, piece_data = initialize_game()
+
+    def abandon_once(cancel: bool) -> (float, int):
+        request = prepare_persuaded_move(
+            board, white_ids, copy.deepcopy(piece_data), "e2e4", "전진하라", 1
+        )
+        request["use_cache"] = False
+        task = submit_persuasion(request)
+        time.sleep(args.cancel_after)  # 플레이어가 ESC를 누르는 시점
+
+        abandoned_at = time.perf_counter()
+        tokens_before = stub.streamed_tokens
+        if cancel:
+            task.cancel()
+        try:
+            task.future.exception()  # 작업(또는 취소) 끝날 때까지 대기
+        except Exception:
+            pass
+        time.sleep(args.token_delay * 3)  # 서버가 연결 끊김을 알아챌 시간
+        busy = max(0.0, stub.last_stream_end - abandoned_at)
+        return busy, stub.streamed_tokens - tokens_before
+
+    results = {}
+    try:
+        for cancel in (False, True):
+            for _ in range(args.requests):
+                busy, tokens = abandon_once(cancel)
+                results.setdefault(cancel, ([], []))
+                results[cancel][0].append(busy)
+                results[cancel][1].append(tokens)
+    finally:
+        stub.stop()
+
+    print(
+        f"--- {args.cancel_after * 1000:.0f}ms 후 설득 포기, "
+        f"토큰당 {args.token_delay * 1000:.0f}ms ---"
+    )
+    summarize("before: 포기 후 서버 점유", results[False][0])
+    summarize("after: 취소 후 서버 점유", results[True][0])
+    print(
+        f"포기 후 생성된 토큰: before 평균 {statistics.mean(results[False][1]):.1f}개, "
+        f"after 평균 {statistics.mean(results[True][1]):.1f}개 "
+        f"(중단된 스트림 {stub.aborted_streams}건)"
+    )
+
+
+# --- 9. 벤치마크: 기물별 순차 설득 vs 회의 모드 동시 설득 ---
+def bench_council(args):
+    persuade.LLM_BACKEND = MockBackend(latency=args.latency)
+    persuade.DECISION_SCORER.enabled = False  # 모든 기물이 LLM을 거치도록
+    persuade.PERSUASION_CACHE.enabled = False
+    # f3으로 갈 수 있는 기물: 나이트, 퀸, 폰
+    board, white_ids, piece_data = initialize_game(
+        fen="r3k3/8/8/8/8/8/3P1P2/R2QK1N1 w Q - 0 1"
+    )
+
+    serial, council = [], []
+    for _ in range(args.requests):
+        fresh_piece_data = copy.deepcopy(piece_data)
+        requests = prepare_council(
+            board, white_ids, fresh_piece_data, "f3", "모두 앞으로!", 1
+        )
+        start = time.perf_counter()
+        for request in requests:
+            persuade.run_persuasion(request)
+        serial.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        accepted = council_persuade(
+            board, white_ids, copy.deepcopy(piece_data), "f3", "모두 앞으로!", 1
+        )
+        council.append(time.perf_counter() - start)
+
+    print(f"--- 후보 {len(requests)}명, 가짜 LLM 지연 {args.latency * 1000:.0f}ms ---")
+    summarize("before: 기물별 순차 설득", serial)
+    summarize("after: 회의 모드 동시 설득", council)
+    print(f"{'':<28} 수락한 기물: {[r['piece_id'] for r in accepted]}")
+
+
+# --- 10. 벤치마크: 배경 작업이 몰릴 때 설득 요청의 대기 시간 (스케줄러 유무) ---
+class ParallelLimitedBackend:
+    """
+    동시에 parallel건만 처리하고 나머지는 도착 순서대로 기다리게 하는 가짜 서버입니다.
+    (OLLAMA_NUM_PARALLEL이 있는 서버 대역)
+    """
+
+    def __init__(self, parallel: int, latency: float):
+        self.inner = MockBackend(latency=latency)
+        self._slots = threading.Semaphore(parallel)
+
+    def chat(self, messages, model, **kwargs) -> str:
+        with self._slots:
+            return self.inner.chat(messages, model, **kwargs)
+
+    def stream(self, messages, on_text, model, **kwargs) -> str:
+        with self._slots:
+            return self.inner.stream(messages, on_text, model, **kwargs)
+
+
+def bench_scheduler(args):
+    persuade.LLM_BACKEND = ParallelLimitedBackend(args.parallel, args.latency)
+    messages = [{"role": "user", "content": "전진하라"}]
+
+    def low_priority_call(kind: str):
+        try:
+            persuade.query_ollama(messages, tags={"kind": kind})
+        except RequestDropped:
+            pass  # (예열은 설득 요청이 오면 버려짐)
+
+    def interactive_latency(scheduler) -> float:
+        persuade.LLM_SCHEDULER = scheduler
+        workers = [
+            threading.Thread(target=low_priority_call, args=(kind,))
+            for kind in ["summary"] * args.background + ["prefetch"] * 2
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(args.latency / 4)  # 배경 작업이 서버를 차지한 뒤 설득 요청 도착
+
+        start = time.perf_counter()
+        persuade.query_ollama(messages, tags={"kind": "persuasion"})
+        elapsed = time.perf_counter() - start
+        for worker in workers:
+            worker.join()
+        return elapsed
+
+    before, after = [], []
+    for _ in range(args.requests):
+        before.append(interactive_latency(LLMScheduler(max_concurrency=1000)))
+        scheduler = LLMScheduler(max_concurrency=args.parallel)
+        after.append(interactive_latency(scheduler))
+
+    print(
+        f"--- 서버 동시 처리 {args.parallel}, 배경 요약 {args.background}건 + 예열 2건, "
+        f"호출당 {args.latency * 1000:.0f}ms ---"
+    )
+    summarize("before: 스케줄러 없음", before)
+    summarize("after: 우선순위 스케줄러", after)
+    print(scheduler.report())
+
+
+# --- 11. 벤치마크: FEN 상황 프롬프트 vs 압축 상황 프롬프트 (토큰 수, 결정 일치율) ---
+def bench_encoding(args):
+    if args.mock:
+        persuade.LLM_BACKEND = MockBackend()
+    persuade.DECISION_SCORER.enabled = False  # 두 형식 모두 LLM이 결정하도록
+    rng = random.Random(args.seed)
+    dialogues = [
+        "전진하라",
+        "가문의 영광을 위해 앞으로 나아가라!",
+        "부탁한다, 너만 믿는다",
+    ]
+
+    tokens = {"fen": ([], []), "compact": ([], [])}
+    agree, disagreements = 0, []
+    for i in range(args.positions):
+        # 1. 무작위로 몇 수 둔 백 차례의 국면 (최근 수 기록 유지)
+        board = chess.Board()
+        for _ in range(rng.randrange(0, 12) * 2):
+            if board.is_game_over():
+                break
+            board.push(rng.choice(list(board.legal_moves)))
+        moves = [
+            m
+            for m in board.legal_moves
+            if board.piece_type_at(m.from_square) != chess.KING
+        ]
+        if board.turn != chess.WHITE or not moves:
+            continue
+        _, white_ids, piece_data = initialize_game(fen=board.fen())
+        move_uci = rng.choice(moves).uci()
+        stability, risk = get_square_safety(board, move_uci)
+        dialogue = dialogues[i % len(dialogues)]
+
+        # 2. 같은 명령을 두 형식으로 설득
+        decisions = {}
+        for encoding in tokens:
+            request = persuade.prepare_persuasion(
+                board,
+                copy.deepcopy(piece_data),
+                white_ids,
+                move_uci,
+                dialogue,
+                stability,
+                risk,
+                1,
+                use_cache=False,
+                encoding=encoding,
+            )
+            if "error" in request:
+                break
+            tokens[encoding][0].append(
+                count_message_tokens(
+                    [{"role": "user", "content": request["situation_prompt"]}]
+                )
+            )
+            tokens[encoding][1].append(count_message_tokens(request["messages"]))
+            decisions[encoding] = persuade.run_persuasion(request)[0]
+        if len(decisions) < 2:
+            continue
+        if decisions["fen"] == decisions["compact"]:
+            agree += 1
+        else:
+            disagreements.append((board.fen(), move_uci, decisions))
+
+    compared = agree + len(disagreements)
+    print(
+        f"--- 국면 {compared}개, LLM 백엔드 {type(persuade.LLM_BACKEND).__name__} ---"
+    )
+    for encoding, (situation, total) in tokens.items():
+        print(
+            f"{encoding:<8} 상황 프롬프트 평균 {statistics.mean(situation):.0f}토큰, "
+            f"전체 요청 평균 {statistics.mean(total):.0f}토큰"
+        )
+    saved = 1 - statistics.mean(tokens["compact"][0]) / statistics.mean(
+        tokens["fen"][0]
+    )
+    print(f"상황 프롬프트 토큰 {saved:.0%} 감소")
+    print(f"결정 일치: {agree}/{compared} ({agree / max(1, compared):.0%})")
+    for fen, move_uci, decisions in disagreements[:5]:
+        print(f"   불일치 {move_uci} {decisions} @ {fen}")
+
+
+# --- 12. 벤치마크: white_ids 딕셔너리 훑기 vs PieceRegistry 조회 ---
+def bench_registry(args):
+    board, white_ids, _ = initialize_game()
+    plain_ids = dict(white_ids)
+    clicked = ["e2", "g1", "e5", "d1"]
+    n = args.iterations
+
+    def per_frame_before():
+        # GUI가 매 프레임 하던 일: 역방향 딕셔너리를 새로 만든 뒤 클릭한 칸 조회
+        location_to_id = {v: k for k, v in plain_ids.items() if v is not None}
+        return location_to_id.get(clicked[0])
+
+    def per_frame_after():
+        return white_ids.id_at(clicked[0])
+
+    # 수 1개 (백의 수 + 흑의 잡기): 기존 move_piece / move_piece_black과 같은 조회와 갱신
+    white_move, black_move = chess.Move.from_uci("e2e4"), chess.Move.from_uci("d5e4")
+    after_white = board.copy()
+    after_white.push(white_move)
+    after_white.push(chess.Move.from_uci("d7d5"))
+
+    def per_move_before():
+        location_to_id = {v: k for k, v in plain_ids.items()}
+        piece_id = location_to_id.get("e2")
+        board.is_capture(white_move)
+        board.is_castling(white_move)
+        plain_ids[piece_id] = "e4"
+        if after_white.is_capture(black_move):
+            after_white.is_en_passant(black_move)
+            for captured_id, location in plain_ids.items():
+                if location == "e4":
+                    break
+            plain_ids[captured_id] = None
+        plain_ids[piece_id] = "e2"  # (다음 반복을 위해 되돌림)
+
+    def per_move_after():
+        board.is_capture(white_move)  # (잡은 기물 점수 계산은 그대로)
+        changes = white_ids.apply_move(board, white_move)
+        after_white.is_capture(black_move)
+        changes += white_ids.apply_move(after_white, black_move)
+        white_ids.undo(changes)
+
+    def measure(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(n):
+            fn()
+        return (time.perf_counter() - start) / n * 1e6
+
+    print(f"--- 기물 {len(white_ids)}개, {n}회 반복 평균 ---")
+    for label, before, after in [
+        ("프레임당 칸 -> ID 조회", per_frame_before, per_frame_after),
+        ("수당 이동 반영", per_move_before, per_move_after),
+    ]:
+        b, a = measure(before), measure(after)
+        print(f"{label:<20} before {b:6.2f}us  after {a:6.2f}us  ({b / a:.1f}배)")
+
+
+def bench_journal(args):
+    """
+    수 읽기(백의 모든 합법 수를 두어 보고 되돌리기) 비용:
+    상태 전체 복사(board.copy + deepcopy) vs apply_move/undo_move
+    """
+    rng = random.Random(args.seed)
+    positions = []
+    while len(positions) < args.positions:
+        board, white_ids, piece_data = initialize_game()
+        for _ in range(rng.randrange(10, 40)):
+            if board.is_game_over():
+                break
+            move = rng.choice(list(board.legal_moves))
+            apply_move(board, white_ids, piece_data, move)
+        if board.turn == chess.WHITE and not board.is_game_over():
+            positions.append((board, white_ids, piece_data))
+
+    def look_ahead_before(board, white_ids, piece_data):
+        for move in list(board.legal_moves):
+            trial_board = board.copy()
+            move_piece(
+                trial_board,
+                white_ids.copy(),
+                copy.deepcopy(piece_data),
+                move.uci(),
+                persuade=False,
+            )
+
+    def look_ahead_after(board, white_ids, piece_data):
+        for move in list(board.legal_moves):
+            entry = apply_move(board, white_ids, piece_data, move)
+            undo_move(board, white_ids, piece_data, entry)
+
+    moves = sum(board.legal_moves.count() for board, _, _ in positions)
+    print(f"--- 국면 {len(positions)}개, 백의 합법 수 {moves}개 ---")
+    timings = {}
+    for label, fn in [("before", look_ahead_before), ("after", look_ahead_after)]:
+        start = time.perf_counter()
+        for position in positions:
+            fn(*position)
+        timings[label] = (time.perf_counter() - start) / moves * 1e6
+        print(f"{label:<7} 수당 {timings[label]:8.1f}us")
+    print(f"-> {timings['before'] / timings['after']:.1f}배")
+
+
+# 수 안전도 표 측정용 중반 국면 (백 차례)
+MIDDLEGAME_FENS = [
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+    "r2q1rk1/ppp2ppp/2npbn2/2b1p3/2B1P3/2NP1N2/PPP1QPPP/R1B2RK1 w - - 0 8",
+    "r1bqr1k1/pp3pbp/2pp1np1/4p3/2PPP3/2N1BP2/PP1QN1PP/R3KB1R w KQ - 0 10",
+    "2rq1rk1/pp1bppbp/2np1np1/8/3NP3/1BN1BP2/PPPQ2PP/2KR3R w - - 0 11",
+    "r1b2rk1/2q1bppp/p2ppn2/1p6/3NP3/1BN1B3/PPP1QPPP/R4RK1 w - - 0 12",
+    "r3k2r/pp1n1ppp/2pbpn2/q7/2BP4/2N1PN2/PP1B1PPP/R2QK2R w KQkq - 0 10",
+    "rnbq1rk1/ppp1bppp/4pn2/3p2B1/2PP4/2N1P3/PP3PPP/R2QKBNR w KQ - 0 6",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    "r1bqk2r/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R1BQK2R w KQkq - 0 7",
+    "r2qr1k1/1b1nbppp/p2p1n2/1p2p3/3PP3/1BP2N1P/PP1N1PP1/R1BQR1K1 w - - 0 13",
+]
+
+
+def raw_square_safety(board: chess.Board, move: chess.Move) -> (int, int):
+    # 기존 get_square_safety: 이동 전 국면에서 도착 칸의 공격 기물 수
+    allied = board.attackers(chess.WHITE, move.to_square)
+    allied.discard(move.from_square)
+    return len(allied), len(board.attackers(chess.BLACK, move.to_square))
+
+
+def bench_safety(args):
+    boards = [chess.Board(fen) for fen in MIDDLEGAME_FENS]
+    moves = sum(board.legal_moves.count() for board in boards)
+    print(
+        f"--- 중반 국면 {len(boards)}개, 백의 합법 수 {moves}개, {args.repeat}회 반복 ---"
+    )
+
+    def per_turn(fn) -> float:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for board in boards:
+                fn(board)
+        return (time.perf_counter() - start) / (args.repeat * len(boards)) * 1000
+
+    def raw_counts(board):
+        for move in board.legal_moves:
+            raw_square_safety(board, move)
+
+    def per_call(board):
+        # 표 없이 수마다 이동 후 국면을 따로 만들어 계산하는 경우
+        for move in board.legal_moves:
+            move_safety(board.copy(), move)
+
+    cache = SafetyTableCache()
+    for label, fn in [
+        ("기존 (이동 전 공격 수만)", raw_counts),
+        ("수마다 따로 계산", per_call),
+        ("국면 표 계산 (캐시 없음)", build_safety_table),
+        ("국면 표 캐시 재사용", cache.table),
+    ]:
+        print(f"{label:<22} 국면당 {per_turn(fn):7.2f}ms")
+
+    # 기존 값과 달라지는 수
+    changed = flagged = losing = 0
+    for board in boards:
+        table = build_safety_table(board)
+        for move in board.legal_moves:
+            stability, risk = raw_square_safety(board, move)
+            safety = table[move.uci()]
+            if (stability, risk) != (safety["stability"], safety["risk"]):
+                changed += 1
+            flagged += risk > 0
+            losing += safety["see"] < 0
+    print(
+        f"위험도/안정도가 바뀐 수 {changed}/{moves}개, "
+        f"기존 위험도 > 0인 수 {flagged}개 중 실제로 잃는 교환(SEE < 0) {losing}개"
+    )
+    print(cache.report())
+
+
+def bench_loop(args):
+    """
+    백 턴 한 번 동안 메인 루프/GUI가 같은 국면에 대해 하는 일:
+    매 반복 게임 상태 확인 + 기물 클릭 시 합법 수 목록 + 이동 시 합법성 검사 3번
+    (handle_player_move, is_move_valid, move_piece)
+    """
+    rng = random.Random(args.seed)
+    positions = []
+    while len(positions) < args.positions:
+        board, white_ids, piece_data = initialize_game()
+        for _ in range(rng.randrange(20, 80)):
+            if board.is_game_over():
+                break
+            move = rng.choice(list(board.legal_moves))
+            apply_move(board, white_ids, piece_data, move)
+        if board.turn == chess.WHITE and not board.is_game_over():
+            positions.append(board)
+    clicks = [
+        (board, rng.choice(list(board.legal_moves)).from_square) for board in positions
+    ]
+
+    def iteration_before(board, square, click):
+        compute_game_status(board, board.is_check())
+        if click:
+            legal = [m.uci() for m in board.legal_moves if m.from_square == square]
+            move = chess.Move.from_uci(legal[0])
+            for _ in range(3):
+                move in board.legal_moves
+
+    def iteration_after(board, square, click):
+        get_game_status(board)
+        if click:
+            legal = POSITION_CACHE.legal_moves_from(board, square)
+            for _ in range(3):
+                is_move_valid(board, legal[0])
+
+    print(
+        f"--- 국면 {len(positions)}개 (20~80수 진행), 국면마다 {args.frames}회 반복 중 "
+        f"1회 클릭/이동 시도 ---"
+    )
+    rates = {}
+    for label, fn in [("before", iteration_before), ("after", iteration_after)]:
+        POSITION_CACHE.invalidate()
+        start = time.perf_counter()
+        for board, square in clicks:
+            POSITION_CACHE.invalidate()  # (백 턴 시작: 흑이 방금 둔 수)
+            for frame in range(args.frames):
+                fn(board, square, frame == 0)
+        elapsed = time.perf_counter() - start
+        rates[label] = len(positions) * args.frames / elapsed
+        print(f"{label:<7} 초당 {rates[label]:10.0f}회 반복")
+    print(f"-> {rates['after'] / rates['before']:.1f}배")
+
+
+def play_headless_game(session: GameSession, rng: random.Random, max_plies: int):
+    """
+    창 없이 한 판을 둡니다: 백은 무작위 합법 수를 설득으로 명령하고
+    (한 턴에 3번 거절당하면 강제 이동, 강제 이동도 없으면 종료), 흑은 session.engine이 둡니다.
+    """
+    orders = 0
+    while not session.is_over() and len(session.board.move_stack) < max_plies:
+        if session.board.turn == chess.BLACK:
+            if not session.play_black()[0]:
+                break
+            continue
+
+        moves = POSITION_CACHE.current(session.board)["moves"]
+        for _ in range(3):
+            orders += 1
+            decision, _ = session.submit_order(
+                rng.choice(moves).uci(), "폐하를 위해 전진하라!"
+            )
+            if decision == "수락":
+                break
+        else:
+            if session.force_move_remaining <= 0:
+                break
+            session.submit_order(rng.choice(moves).uci(), force_move=True)
+    return orders
+
+
+def bench_session(args):
+    """
+    GameSession만으로 (pygame/Stockfish/Ollama 없이) 여러 판을 연속으로 두는 처리량
+    """
+    persuade.PERSUASION_CACHE.enabled = False
+    rng = random.Random(args.seed)
+    session = GameSession(
+        engine=RandomEngine(seed=args.seed), backend=MockBackend(latency=0)
+    )
+
+    plies, orders, finished = 0, 0, 0
+    start = time.perf_counter()
+    for _ in range(args.games):
+        with contextlib.redirect_stdout(io.StringIO()):  # (사기 변화 출력 생략)
+            session.reset()
+            orders += play_headless_game(session, rng, args.max_plies)
+        plies += len(session.board.move_stack)
+        finished += session.is_over()
+    elapsed = time.perf_counter() - start
+    session.close()
+
+    print(
+        f"--- 가짜 LLM + 무작위 흑, {args.games}판 (판마다 최대 {args.max_plies}수) ---"
+    )
+    print(
+        f"{elapsed:.2f}초: 분당 {args.games / elapsed * 60:.0f}판, "
+        f"초당 {plies / elapsed:.0f}수, 설득 명령 {orders}회"
+    )
+    print(f"규칙상 끝난 판 {finished}/{args.games}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Please Chess 성능 측정")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("client", help="Ollama 클라이언트 연결 재사용 효과 측정")
+    p.add_argument("--requests", type=int, default=50)
+    p.add_argument("--connect-delay", type=float, default=0.05)
+    p.set_defaults(func=bench_client)
+
+    p = sub.add_parser("stream", help="스트리밍 설득의 첫 피드백 시간 측정")
+    p.add_argument("--requests", type=int, default=10)
+    p.add_argument("--prompt-delay", type=float, default=0.3)
+    p.add_argument("--token-delay", type=float, default=0.03)
+    p.set_defaults(func=bench_stream)
+
+    p = sub.add_parser("router", help="여러 Ollama 서버 라우팅/헤징 효과 측정")
+    p.add_argument("--requests", type=int, default=60)
+    p.add_argument("--slow-delay", type=float, default=0.4)
+    p.add_argument("--failure-rate", type=float, default=0.3)
+    p.add_argument("--deadline", type=float, default=10)
+    p.set_defaults(func=bench_router)
+
+    p = sub.add_parser("pipeline", help="가짜 LLM으로 설득 파이프라인 처리량 측정")
+    p.add_argument("--requests", type=int, default=500)
+    p.add_argument("--latency", type=float, default=0.0)
+    p.set_defaults(func=bench_pipeline)
+
+    p = sub.add_parser("tiering", help="결정/대사 모델 단계 분리 효과 측정")
+    p.add_argument("--requests", type=int, default=5)
+    p.add_argument("--large-prompt-delay", type=float, default=0.3)
+    p.add_argument("--large-token-delay", type=float, default=0.03)
+    p.add_argument("--small-prompt-delay", type=float, default=0.08)
+    p.add_argument("--small-token-delay", type=float, default=0.008)
+    p.set_defaults(func=bench_tiering)
+
+    p = sub.add_parser("cancel", help="취소된 설득이 서버를 점유하는 시간 측정")
+    p.add_argument("--requests", type=int, default=5)
+    p.add_argument("--cancel-after", type=float, default=0.5)
+    p.add_argument("--prompt-delay", type=float, default=0.2)
+    p.add_argument("--token-delay", type=float, default=0.03)
+    p.set_defaults(func=bench_cancel)
+
+    p = sub.add_parser("council", help="회의 모드 동시 설득의 대기 시간 측정")
+    p.add_argument("--requests", type=int, default=5)
+    p.add_argument("--latency", type=float, default=0.3)
+    p.set_defaults(func=bench_council)
+
+    p = sub.add_parser("scheduler", help="배경 작업 중 설득 요청의 대기 시간 측정")
+    p.add_argument("--requests", type=int, default=5)
+    p.add_argument("--parallel", type=int, default=2)
+    p.add_argument("--background", type=int, default=6)
+    p.add_argument("--latency", type=float, default=0.2)
+    p.set_defaults(func=bench_scheduler)
+
+    p = sub.add_parser("encoding", help="FEN/압축 상황 프롬프트의 토큰 수와 결정 비교")
+    p.add_argument("--positions", type=int, default=20)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--mock", action="store_true", help="Ollama 대신 가짜 LLM 사용")
+    p.set_defaults(func=bench_encoding)
+
+    p = sub.add_parser("registry", help="기물 ID <-> 칸 조회 비용 측정")
+    p.add_argument("--iterations", type=int, default=100000)
+    p.set_defaults(func=bench_registry)
+
+    p = sub.add_parser("journal", help="수 적용/되돌리기 비용 측정 (deepcopy 대비)")
+    p.add_argument("--positions", type=int, default=50)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_journal)
+
+    p = sub.add_parser("safety", help="중반 국면의 수 안전도 표 계산 비용 측정")
+    p.add_argument("--repeat", type=int, default=20)
+    p.set_defaults(func=bench_safety)
+
+    p = sub.add_parser("loop", help="국면 캐시 전후의 메인 루프 반복 속도 측정")
+    p.add_argument("--positions", type=int, default=50)
+    p.add_argument("--frames", type=int, default=60)
+    p.add_argument("--seed", type=int, default=11)
+    p.set_defaults(func=bench_loop)
+
+    p = sub.add_parser("session", help="창 없는 GameSession으로 연속 대국 처리량 측정")
+    p.add_argument("--games", type=int, default=200)
+    p.add_argument("--max-plies", type=int, default=200)
+    p.add_argument("--seed", type=int, default=5)
+    p.set_defaults(func=bench_session)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,11 @@ from gui_utils import (
 # ⬆️⬆️⬆️ [수정 완료] ⬆️⬆️⬆️
 
 from start_chess import initialize_game  # (main.py에서 사용, 여기선 직접 사용 안함)
+from position_cache import POSITION_CACHE
+from safety_table import SAFETY_TABLE
+
+# 설득 대기 중 표시할 스피너 프레임
+SPINNER_FRAMES = "|/-\\"
 
 # --- 4. 헬퍼 함수 정의 ---
 # [삭제됨] load_piece_images (gui_utils로 이동)
@@ -35,12 +40,18 @@ def draw_board(
     selected_square: str | None = None,
     legal_moves_uci: list = [],
     target_square: str | None = None,
+    council_squares: list = None,
+    move_safety: dict = None,
 ):
-    # (코드 로직 동일)
+    # (수정됨: move_safety({UCI: 안전도})가 주어지면 잃는 교환(SEE < 0)인 칸은 주황색)
     colors = [pygame.Color("white"), pygame.Color(200, 200, 200)]
     HIGHLIGHT_COLOR = pygame.Color(255, 255, 102, 180)  # 기물 선택 (노란색)
     LEGAL_MOVE_COLOR = pygame.Color(100, 255, 100, 180)  # 합법적 이동 (초록색)
+    LOSING_MOVE_COLOR = pygame.Color(255, 170, 60, 180)  # [추가] 잃는 교환 (주황색)
     TARGET_COLOR = pygame.Color(255, 100, 100, 180)  # <--- [추가] 목표 칸 (빨간색)
+    COUNCIL_COLOR = pygame.Color(
+        180, 120, 255, 180
+    )  # [추가] 회의에서 수락한 기물 (보라색)
     TEXT_COLOR = pygame.Color(0, 0, 0)
     files = "abcdefgh"
 
@@ -65,13 +76,18 @@ def draw_board(
             # 2. 이동 가능한 칸 하이라이트 (초록색)
             if legal_moves_uci:
                 # 합법적 이동 목록에서 목표 칸이 포함되는지 확인
-                if any(
-                    square_name == move[2:4]
+                moves_here = [
+                    move
                     for move in legal_moves_uci
-                    if len(move) >= 4
-                ):
+                    if len(move) >= 4 and square_name == move[2:4]
+                ]
+                if moves_here:
+                    losing = move_safety and all(
+                        move_safety.get(move, {}).get("see", 0) < 0
+                        for move in moves_here
+                    )
                     s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                    s.fill(LEGAL_MOVE_COLOR)
+                    s.fill(LOSING_MOVE_COLOR if losing else LEGAL_MOVE_COLOR)
                     screen.blit(s, rect)
 
             # 3. <--- [추가] 목표 칸 하이라이트 (빨간색)
@@ -81,6 +97,12 @@ def draw_board(
                 s.fill(TARGET_COLOR)
                 screen.blit(s, rect)
 
+            # 4. [추가] 회의 모드에서 고를 수 있는 기물 칸 (보라색)
+            if council_squares and square_name in council_squares:
+                s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+                s.fill(COUNCIL_COLOR)
+                screen.blit(s, rect)
+
     for r in range(8):
         for c in range(8):
             rect = pygame.Rect(
@@ -178,11 +200,13 @@ def draw_info_panel(
     last_piece_dialogue: str,
     cursor_on: bool,
     force_move_count: int,
+    streaming_dialogue: str | None = None,
 ) -> (pygame.Rect, pygame.Rect):
     """
     정보 패널을 그립니다.
     (수정됨: 킹(King)을 선택한 경우, 페르소나와 기물 응답 섹션을 숨깁니다.)
     (수정됨: 상단 응답 메시지(last_response)가 길어지면 자동 줄 바꿈 처리합니다.)
+    (추가됨: streaming_dialogue가 주어지면 생성 중인 기물 응답을 대신 표시합니다.)
     """
     panel_rect = pygame.Rect(BOARD_WIDTH, 0, PANEL_WIDTH, WINDOW_HEIGHT)
     pygame.draw.rect(screen, pygame.Color(30, 30, 30), panel_rect)
@@ -402,6 +426,8 @@ def draw_info_panel(
                 if "[" in assistant_dialogue and "]" in assistant_dialogue
                 else assistant_dialogue
             )
+            if streaming_dialogue is not None:
+                dialogue_text_body = streaming_dialogue
 
             dialogue_words = dialogue_text_body.split(" ")
             current_dialogue_line = ""
@@ -505,7 +531,30 @@ def run_game_gui(
     screen,
     clock,
     force_move_count: int,
+    submit_persuasion,
+    poll_persuasion,
+    on_piece_selected=None,
+    submit_council=None,
+    poll_council=None,
+    choose_council_member=None,
+    take_back=None,
 ):
+    """
+    백 턴의 GUI 루프를 실행합니다.
+    (추가됨: 설득은 submit_persuasion(uci, 대사)로 백그라운드에서 시작하고,
+     매 프레임 poll_persuasion(task)로 결과를 확인해 메인 스레드에서 적용합니다.
+     결과가 아직 없으면 poll_persuasion은 None을 반환합니다.)
+    (추가됨: 기물을 선택/선택 해제할 때마다 on_piece_selected(기물 ID 또는 None)를
+     호출합니다. 대사를 입력하는 동안 프롬프트를 미리 예열하는 데 사용)
+    (추가됨: 설득 중에 ESC, 다른 아군 기물 선택, 메뉴 복귀를 하면 task.cancel()로
+     진행 중인 설득을 취소하고 결과를 버립니다.)
+    (추가됨: 회의 모드 - 목표 칸과 대사를 정한 뒤 TAB을 누르면
+     submit_council(목표 칸, 대사)로 그 칸에 갈 수 있는 기물 모두에게 동시에 묻고,
+     poll_council(council)이 수락한 요청 목록을 돌려주면 그중 하나를 클릭해
+     choose_council_member(request)로 이동합니다.)
+    (추가됨: 설득이 진행 중이 아닐 때 Ctrl+Z를 누르면 take_back()으로 마지막 백/흑의 수를
+     무르고 "TAKEN_BACK"을 반환합니다. 되돌릴 수가 없으면 take_back()은 False를 반환)
+    """
     # (코드 로직 동일 - run_confirmation_popup 호출 부분 포함)
     screen = screen
     clock = clock
@@ -517,6 +566,9 @@ def run_game_gui(
     if piece_images is None:
         return "QUIT"
 
+    # (추가됨: 이번 백 턴의 모든 합법 수 안전도 표. 설득 프롬프트/빠른 결정도 같은 표를 재사용)
+    move_safety = SAFETY_TABLE.table(game_board)
+
     if not hasattr(run_game_gui, "prev_last_response"):
         run_game_gui.prev_last_response = "[INFO] 게임 시작. 백 턴."
         run_game_gui.prev_last_piece_dialogue = "아직 응답이 없습니다."
@@ -535,8 +587,6 @@ def run_game_gui(
     uci_move_to_try = None
     legal_moves_uci = []
 
-    location_to_id = {v: k for k, v in game_white_ids.items() if v is not None}
-
     dialogue_text = ""
     dialogue_active = False
     last_response = run_game_gui.prev_last_response
@@ -549,9 +599,79 @@ def run_game_gui(
     button_rect = pygame.Rect(0, 0, 0, 0)
     force_move_button_rect = pygame.Rect(0, 0, 0, 0)
 
+    # 백그라운드에서 진행 중인 설득 (없으면 None)과 스트리밍 중인 기물 응답
+    pending_task = None
+    streaming_dialogue = None
+
+    # 회의 모드: 진행 중인 회의와, 수락한 기물 중에서 고를 때의 {출발 칸: 설득 요청}
+    pending_council = None
+    council_choices = {}
+
+    def render_frame():
+        nonlocal button_rect, force_move_button_rect
+
+        screen.fill(pygame.Color(0, 0, 0))
+        draw_board(
+            screen,
+            selected_square_name,
+            legal_moves_uci,
+            target_square_name,
+            council_squares=list(council_choices),
+            move_safety=move_safety,
+        )
+        draw_pieces(screen, game_board, piece_images, game_white_ids)
+
+        button_rect, force_move_button_rect = draw_info_panel(
+            screen,
+            game_piece_data,
+            selected_piece_id_to_show,
+            dialogue_text,
+            dialogue_active,
+            last_response,
+            last_piece_dialogue,
+            cursor_on,
+            force_move_count=force_move_count,
+            streaming_dialogue=streaming_dialogue,
+        )
+
+        pygame.display.flip()
+
+    def notify_selection(piece_id):
+        if on_piece_selected:
+            on_piece_selected(piece_id)
+
+    def cancel_pending_persuasion():
+        nonlocal pending_task, streaming_dialogue, pending_council, council_choices
+
+        council_choices = {}
+        for task in (pending_task, pending_council):
+            if task is not None:
+                task.cancel()
+        pending_task = None
+        pending_council = None
+        streaming_dialogue = None
+
+    def is_interrupt_event(event):
+        # 진행 중인 설득을 취소하는 입력: ESC, 백틱(메뉴 복귀), 다른 아군 기물 클릭
+        if event.type == pygame.KEYDOWN:
+            return event.key in (pygame.K_ESCAPE, pygame.K_BACKQUOTE)
+        if event.type == pygame.MOUSEBUTTONDOWN:
+            clicked_square = get_clicked_square(pygame.mouse.get_pos())
+            return (
+                clicked_square is not None
+                and clicked_square != selected_square_name
+                and game_white_ids.id_at(clicked_square) is not None
+            )
+        return False
+
     def reset_move_state(full_reset=False):
         nonlocal game_state, selected_square_name, selected_piece_id, target_square_name, uci_move_to_try, legal_moves_uci, dialogue_active, last_response, last_piece_dialogue, selected_piece_id_to_show
 
+        # 선택이 바뀌면 진행 중인 설득은 버림
+        cancel_pending_persuasion()
+        if full_reset:
+            notify_selection(None)
+
         game_state = 0
         target_square_name = None
         uci_move_to_try = None
@@ -583,7 +703,7 @@ def run_game_gui(
         return last_response
 
     def attempt_persuasion(is_king_move=False):
-        nonlocal last_response, last_piece_dialogue, dialogue_text, dialogue_active, selected_piece_id_to_show
+        nonlocal last_response, dialogue_text, dialogue_active, pending_task
 
         # ⬇️⬇️⬇️ [수정된 부분] ⬇️⬇️⬇️
         if not is_king_move:
@@ -612,18 +732,96 @@ def run_game_gui(
             last_response = "[ERROR] 이동 목표 선택 및 대사 입력이 필요합니다."
             return None
 
-        persuasion_input = "" if is_king_move else dialogue_text
+        if not is_king_move:
+            # 설득은 백그라운드에서 진행하고, 결과는 매 프레임 poll 하여 적용
+            pending_task = submit_persuasion(uci_move_to_try, dialogue_text)
+            dialogue_text = ""
+            dialogue_active = False
+            last_response = "[WAIT] 기물 설득 중..."
+            return None
+
+        last_response = "[WAIT] 킹의 명령 처리 중..."
+        render_frame()
+
+        decision, dialogue = turn_callback(uci_move_to_try, "", force_move=False)
+        return handle_persuasion_result(decision, dialogue, is_king_move=True)
+
+    def attempt_council():
+        nonlocal last_response, dialogue_text, dialogue_active, pending_council
+
+        if game_state != 2 or not dialogue_text.strip():
+            last_response = "[ERROR] 이동 목표 선택 및 대사 입력이 필요합니다."
+            return None
+
+        # 목표 칸으로 갈 수 있는 기물 모두에게 같은 대사로 동시에 설득
+        pending_council = submit_council(target_square_name, dialogue_text)
+        if pending_council is None:
+            last_response = "[ERROR] 회의에 부를 수 있는 기물이 없습니다."
+            return None
+        dialogue_text = ""
+        dialogue_active = False
+        _, _, total = pending_council.progress()
+        last_response = f"[WAIT] 회의 소집: 기물 {total}명에게 묻는 중..."
+        return None
+
+    def poll_pending_council():
+        nonlocal pending_council, council_choices, game_state, last_response, dialogue_active
+
+        accepted = poll_council(pending_council)
+
+        if accepted is None:
+            answered, accepted_count, total = pending_council.progress()
+            elapsed = pending_council.elapsed()
+            spinner = SPINNER_FRAMES[int(elapsed * 8) % len(SPINNER_FRAMES)]
+            last_response = (
+                f"[WAIT] 회의 중... {spinner} 응답 {answered}/{total}, "
+                f"수락 {accepted_count} ({elapsed:.1f}초)"
+            )
+            return None
+
+        pending_council = None
+        if not accepted:
+            last_response = "[거부] 회의에서 아무도 나서지 않았습니다."
+            dialogue_active = True
+            return None
 
+        council_choices = {
+            game_white_ids[request["piece_id"]]: request for request in accepted
+        }
+        game_state = 3
+        names = ", ".join(
+            f"{game_piece_data[request['piece_id']].get('name', request['piece_id'])}({square})"
+            for square, request in council_choices.items()
+        )
         last_response = (
-            "[WAIT] 기물 설득 중..."
-            if not is_king_move
-            else "[WAIT] 킹의 명령 처리 중..."
+            f"[수락] 회의에서 나선 기물: {names}. 이동할 기물을 클릭하세요. (ESC: 취소)"
         )
-        pygame.display.flip()
+        return None
 
-        decision, dialogue = turn_callback(
-            uci_move_to_try, persuasion_input, force_move=False
-        )
+    def poll_pending_persuasion():
+        nonlocal pending_task, last_response, streaming_dialogue
+
+        result = poll_persuasion(pending_task)
+
+        if result is None:
+            # 아직 진행 중: 스트리밍된 대사 또는 스피너/경과 시간 표시
+            stream_decision, stream_dialogue = pending_task.stream_state()
+            elapsed = pending_task.elapsed()
+            if stream_decision:
+                streaming_dialogue = stream_dialogue
+                last_response = f"[{stream_decision}] {stream_dialogue}"
+            else:
+                spinner = SPINNER_FRAMES[int(elapsed * 8) % len(SPINNER_FRAMES)]
+                last_response = f"[WAIT] 기물 설득 중... {spinner} ({elapsed:.1f}초)"
+            return None
+
+        pending_task = None
+        streaming_dialogue = None
+        decision, dialogue = result
+        return handle_persuasion_result(decision, dialogue)
+
+    def handle_persuasion_result(decision, dialogue, is_king_move=False):
+        nonlocal last_response, last_piece_dialogue, dialogue_text, dialogue_active
 
         last_piece_dialogue = dialogue
         dialogue_text = ""
@@ -694,11 +892,7 @@ def run_game_gui(
         piece_at_sq = game_board.piece_at(start_sq_idx)
 
         if piece_at_sq and piece_at_sq.color == chess.WHITE:
-            legal_moves_uci = [
-                move.uci()
-                for move in game_board.legal_moves
-                if move.from_square == start_sq_idx
-            ]
+            legal_moves_uci = POSITION_CACHE.legal_moves_from(game_board, start_sq_idx)
             game_state = 1
         else:
             last_response = reset_move_state(full_reset=True)
@@ -709,9 +903,15 @@ def run_game_gui(
             cursor_on = not cursor_on
             cursor_timer = 0
 
-        location_to_id = {v: k for k, v in game_white_ids.items() if v is not None}
+        if pending_task:
+            result = poll_pending_persuasion()
+            if result:
+                return result
+
+        elif pending_council:
+            poll_pending_council()
 
-        if game_board.turn == chess.BLACK:
+        elif game_board.turn == chess.BLACK:
             run_game_gui.prev_selected_square_name = selected_square_name
             run_game_gui.prev_selected_piece_id = selected_piece_id
             run_game_gui.prev_selected_piece_id_to_show = selected_piece_id_to_show
@@ -724,6 +924,16 @@ def run_game_gui(
                 running = False
                 return "QUIT"
 
+            # 설득이 진행 중일 때는 화면만 갱신하고, 취소 입력만 받음
+            # (이미 [수락]되어 이동이 적용된 설득은 취소하지 않고 끝까지 기다림)
+            pending = pending_task or pending_council
+            if pending:
+                if not (pending.cancellable() and is_interrupt_event(event)):
+                    continue
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    # 설득을 취소하고 선택 전 상태로 돌아가 아래에서 새 기물을 선택
+                    last_response = reset_move_state(full_reset=False)
+
             if event.type == pygame.TEXTINPUT and dialogue_active:
                 dialogue_text += event.text
 
@@ -736,6 +946,23 @@ def run_game_gui(
                     if result:
                         return result
 
+                if event.key == pygame.K_TAB and game_state == 2 and submit_council:
+                    attempt_council()
+
+                if (
+                    event.key == pygame.K_z
+                    and event.mod & pygame.KMOD_CTRL
+                    and take_back
+                ):
+                    if take_back():
+                        reset_move_state(full_reset=True)
+                        dialogue_text = ""
+                        run_game_gui.prev_last_response = (
+                            "[INFO] 한 수 물렀습니다. 기물을 선택하세요."
+                        )
+                        return "TAKEN_BACK"
+                    last_response = "[INFO] 무를 수 있는 수가 없습니다."
+
                 if event.key == pygame.K_ESCAPE:
                     last_response = reset_move_state(full_reset=True)
                     dialogue_text = ""
@@ -750,6 +977,7 @@ def run_game_gui(
                     )
                     if confirmation_result == "CONFIRMED":
                         print("메인 메뉴로 복귀합니다.")
+                        cancel_pending_persuasion()
                         return "QUIT"
                     else:
                         print("게임을 계속합니다.")
@@ -770,7 +998,7 @@ def run_game_gui(
                         return result
 
                 elif clicked_square:
-                    clicked_piece_id = location_to_id.get(clicked_square)
+                    clicked_piece_id = game_white_ids.id_at(clicked_square)
                     clicked_piece = game_board.piece_at(
                         chess.parse_square(clicked_square)
                     )
@@ -786,14 +1014,13 @@ def run_game_gui(
                         selected_piece_id_to_show = clicked_piece_id
 
                         start_sq_idx = chess.parse_square(selected_square_name)
-                        legal_moves_uci = [
-                            move.uci()
-                            for move in game_board.legal_moves
-                            if move.from_square == start_sq_idx
-                        ]
+                        legal_moves_uci = POSITION_CACHE.legal_moves_from(
+                            game_board, start_sq_idx
+                        )
 
                         game_state = 1
                         dialogue_active = False
+                        notify_selection(clicked_piece_id)
                         piece_name = game_piece_data.get(clicked_piece_id, {}).get(
                             "name", clicked_piece_id
                         )
@@ -810,12 +1037,11 @@ def run_game_gui(
                                 selected_piece_id = clicked_piece_id
                                 selected_piece_id_to_show = clicked_piece_id
                                 start_sq_idx = chess.parse_square(selected_square_name)
-                                legal_moves_uci = [
-                                    move.uci()
-                                    for move in game_board.legal_moves
-                                    if move.from_square == start_sq_idx
-                                ]
+                                legal_moves_uci = POSITION_CACHE.legal_moves_from(
+                                    game_board, start_sq_idx
+                                )
                                 game_state = 1
+                                notify_selection(clicked_piece_id)
                                 piece_name = game_piece_data.get(
                                     clicked_piece_id, {}
                                 ).get("name", clicked_piece_id)
@@ -863,6 +1089,8 @@ def run_game_gui(
                                     game_state = 2
                                     dialogue_active = True
                                     last_response = f"[WAIT] '{uci_move_to_try}' 이동 확인. 대사를 입력 후 설득하세요."
+                                    if submit_council:
+                                        last_response += " (TAB: 이 칸으로 갈 수 있는 기물 모두에게 회의 소집)"
                                     legal_moves_uci = []
                             else:
                                 last_response = f"[ERROR] '{uci_move_to_try[:4]}'는 합법적인 이동이 아닙니다."
@@ -872,23 +1100,19 @@ def run_game_gui(
                     elif game_state == 2:
                         last_response = f"[WAIT] 현재 '{uci_move_to_try[:4]}' 설득 중입니다. [설득하기] 버튼을 누르거나 Enter를 치세요."
 
-        screen.fill(pygame.Color(0, 0, 0))
-        draw_board(screen, selected_square_name, legal_moves_uci, target_square_name)
-        draw_pieces(screen, game_board, piece_images, game_white_ids)
-
-        button_rect, force_move_button_rect = draw_info_panel(
-            screen,
-            game_piece_data,
-            selected_piece_id_to_show,
-            dialogue_text,
-            dialogue_active,
-            last_response,
-            last_piece_dialogue,
-            cursor_on,
-            force_move_count=force_move_count,
-        )
+                    elif game_state == 3:
+                        # 회의에서 수락한 기물 중 하나를 골라 이동
+                        request = council_choices.get(clicked_square)
+                        if request is None:
+                            last_response = "[WAIT] 회의에서 나선 기물(보라색 칸) 중 하나를 클릭하세요. (ESC: 취소)"
+                        else:
+                            selected_piece_id_to_show = request["piece_id"]
+                            decision, dialogue = choose_council_member(request)
+                            result = handle_persuasion_result(decision, dialogue)
+                            if result:
+                                return result
 
-        pygame.display.flip()
+        render_frame()
         clock.tick(60)
 
     return "QUIT"
@@ -1,5 +1,8 @@
 import chess
-from persuade import persuade_piece
+from persuade import prepare_persuasion, run_persuasion, apply_persuasion_result
+from persuasion_worker import submit_council
+from position_cache import POSITION_CACHE
+from safety_table import SAFETY_TABLE
 
 # ⬇️⬇️⬇️ [이 부분 추가] ⬇️⬇️⬇️
 # --- 기물 점수 상수 ---
@@ -29,11 +32,33 @@ STATUS_ONGOING_BLACK_TURN = "ONGOING_BLACK_TURN"  # 흑 턴 (진행 중)
 STATUS_CHECK_WHITE_TURN = "CHECK_WHITE_TURN"  # 백 턴 (체크 상태)
 STATUS_CHECK_BLACK_TURN = "CHECK_BLACK_TURN"  # 흑 턴 (체크 상태)
 
+# (추가됨: 게임 종료 상태 모음)
+GAME_OVER_STATUSES = {
+    STATUS_CHECKMATE_WHITE_WINS,
+    STATUS_CHECKMATE_BLACK_WINS,
+    STATUS_STALEMATE,
+    STATUS_DRAW_INSUFFICIENT_MATERIAL,
+    STATUS_DRAW_SEVENTYFIVE_MOVES,
+    STATUS_DRAW_FIVEFOLD_REPETITION,
+    STATUS_DRAW_OTHER,
+}
+
 
 def get_game_status(board: chess.Board) -> str:
     """
     현재 체스 보드의 상태를 검사하여 문자열로 반환합니다.
     (수정됨: ONGOING 또는 CHECK 상태일 때 현재 턴 정보를 포함합니다.)
+    (수정됨: 수를 두거나 무르기 전까지는 POSITION_CACHE에 보관한 결과를 반환합니다.)
+    """
+    position = POSITION_CACHE.current(board)
+    if "status" not in position:
+        position["status"] = compute_game_status(board, position["check"])
+    return position["status"]
+
+
+def compute_game_status(board: chess.Board, in_check: bool) -> str:
+    """
+    get_game_status의 실제 계산 (반복 규칙 검사 포함)
     """
 
     # 1. 게임 종료 여부 확인 (기존과 동일)
@@ -60,7 +85,7 @@ def get_game_status(board: chess.Board) -> str:
             return STATUS_DRAW_OTHER
 
     # 2. 게임이 종료되지 않았다면, 체크 상태인지 확인 (턴 정보 포함)
-    if board.is_check():
+    if in_check:
         if board.turn == chess.WHITE:
             return STATUS_CHECK_WHITE_TURN  # 백이 체크 상태 (백 턴)
         else:
@@ -84,11 +109,8 @@ def is_move_valid(board: chess.Board, uci_move: str) -> bool:
     except ValueError:
         return False
 
-    # 2. 'board.legal_moves'에 해당 수가 포함되어 있는지 확인
-    if move in board.legal_moves:
-        return True
-    else:
-        return False
+    # 2. 합법 수에 해당 수가 포함되어 있는지 확인 (수정됨: POSITION_CACHE 사용)
+    return POSITION_CACHE.is_legal(board, move.uci())
 
 
 # ⬇️⬇️⬇️ [수정됨] ⬇️⬇️⬇️
@@ -100,9 +122,14 @@ def move_piece(
     persuade: bool = False,
     persuasion_dialogue: str = "",
     morale: int = 1,
+    on_dialogue=None,
+    journal: list = None,
 ) -> (bool, str, int):  # <--- [반환값 수정] (bool, str, captured_value)
     """
     [수정] UCI 이동을 시도하고, (성공여부, 메시지, 잡은기물점수)를 반환합니다.
+    [추가] on_dialogue(decision, dialogue)가 주어지면 스트리밍 설득을 사용합니다.
+           [수락]이 도착하는 즉시 이동을 적용하고, 대사는 생성되는 대로 전달합니다.
+    [추가] journal(리스트)이 주어지면 이 수의 되돌리기 항목을 쌓습니다. (take_back용)
     """
     # ⬆️⬆️⬆️ [수정 완료] ⬆️⬆️⬆️
 
@@ -116,17 +143,16 @@ def move_piece(
             0,
         )  # <--- [수정] 0점 반환
 
-    if move not in board.legal_moves:
+    if not POSITION_CACHE.is_legal(board, move.uci()):
         message = f"'{uci_move}'는 유효한 행마법이 아닙니다."
         if board.is_check():
             message = "현재 체크 상태입니다! 킹을 방어하는 수만 둘 수 있습니다."
 
         return False, message, 0  # <--- [수정] 0점 반환
 
-    # 2. 이동할 기물의 ID 찾기
-    location_to_id = {v: k for k, v in white_ids.items()}
+    # 2. 이동할 기물의 ID 찾기 (수정됨: PieceRegistry의 칸 -> ID 조회)
     start_sq_name = chess.square_name(move.from_square)
-    piece_id = location_to_id.get(start_sq_name)
+    piece_id = white_ids.id_at(move.from_square)
 
     if not piece_id:
         return (
@@ -152,45 +178,70 @@ def move_piece(
         else:
             message = "설득 없이 이동합니다."
 
-        # ⬇️⬇️⬇️ [추가] ⬇️⬇️⬇️
-        # 이동 직전에 캡처 여부 확인
-        if board.is_capture(move):
-            captured_piece = board.piece_at(move.to_square)  # 흑 기물
-            if captured_piece:
-                symbol = captured_piece.symbol().upper()
-                captured_value = PIECE_VALUES.get(symbol, 0)
-        # ⬆️⬆️⬆️ [추가 완료] ⬆️⬆️⬆️
-
-        # --- (기존 이동 로직) ---
-        end_sq = chess.square_name(move.to_square)
-        if board.is_castling(move):
-            rook_start_sq, rook_end_sq = (None, None)
-            if move.to_square == chess.G1:
-                rook_start_sq, rook_end_sq = "h1", "f1"
-            elif move.to_square == chess.C1:
-                rook_start_sq, rook_end_sq = "a1", "d1"
-            if rook_start_sq:
-                rook_id = location_to_id.get(rook_start_sq)
-                if rook_id:
-                    white_ids[rook_id] = rook_end_sq
-                    piece_data[rook_id]["current_square"] = rook_end_sq
-
-        white_ids[piece_id] = end_sq
-        piece_data[piece_id]["current_square"] = end_sq
-
-        if move.promotion:
-            new_type_symbol = chess.piece_symbol(move.promotion).upper()
-            piece_data[piece_id]["type"] = new_type_symbol
-
-        board.push(move)
-        # --- (기존 로직 끝) ---
+        # (수정됨: 잡기/캐슬링/승진/push는 백/흑 공통의 apply_move 한 곳에서 처리)
+        entry = apply_move(
+            board, white_ids, piece_data, move, journal=journal, forced=not persuade
+        )
+        captured_value = entry["value"]
 
         return True, message, captured_value  # <--- [수정] 점수 반환
 
     # 4. [persuade=True] 및 [킹 외 기물]인 경우: 설득 시도
+    request = prepare_persuaded_move(
+        board, white_ids, piece_data, uci_move, persuasion_dialogue, morale
+    )
+    if "error" in request:
+        return request["error"]
+
+    def commit_on_accept(decision: str):
+        # [수락]이 확정되면 (스트리밍 중이라도) 바로 이동을 적용
+        if decision == "수락":
+            commit_persuaded_move(board, white_ids, piece_data, request, journal)
+
+    decision, dialogue, llm_output = run_persuasion(
+        request,
+        on_decision=commit_on_accept if on_dialogue else None,
+        on_dialogue=on_dialogue,
+    )
+
+    # 4-3. 설득 결과 처리
+    return finish_persuaded_move(
+        board,
+        white_ids,
+        piece_data,
+        request,
+        decision,
+        dialogue,
+        llm_output,
+        journal,
+    )
+
+
+def prepare_persuaded_move(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    uci_move: str,
+    persuasion_dialogue: str = "",
+    morale: int = 1,
+) -> dict:
+    """
+    설득 이동의 준비 단계: 이동을 검사하고 LLM 설득 요청을 만듭니다.
+    (run_persuasion을 백그라운드에서 돌리고, 결과는 메인 스레드에서
+     commit_persuaded_move / finish_persuaded_move로 적용합니다.)
+    실패 시 "error" 키에 move_piece와 같은 (False, 메시지, 0)을 담아 반환합니다.
+    """
+    try:
+        move = chess.Move.from_uci(uci_move)
+    except ValueError:
+        return {"error": (False, f"'{uci_move}'는 올바른 이동 형식이 아닙니다.", 0)}
+
+    if not POSITION_CACHE.is_legal(board, move.uci()):
+        return {"error": (False, f"'{uci_move}'는 유효한 행마법이 아닙니다.", 0)}
+
     stability, risk = get_square_safety(board, uci_move)
 
-    decision, dialogue = persuade_piece(
+    request = prepare_persuasion(
         board,
         piece_data,
         white_ids,
@@ -200,52 +251,198 @@ def move_piece(
         risk,
         morale,
     )
+    if "error" in request:
+        return {"error": (False, request["error"][1], 0)}
+
+    request["move"] = move
+    request["committed"] = False
+    request["captured_value"] = 0
+    request["flight_key"] = persuasion_flight_key(
+        board, white_ids, uci_move, persuasion_dialogue
+    )
+    return request
 
-    # 4-3. 설득 결과 처리
+
+def persuasion_flight_key(
+    board: chess.Board, white_ids: dict, uci_move: str, persuasion_dialogue: str
+) -> tuple | None:
+    """
+    같은 수(ply)에 같은 기물/이동/대사로 다시 제출된 설득을 알아보는 키 (중복 제출 병합용)
+    (설득 요청을 만들기 전에도 계산할 수 있도록 기물 ID는 출발 칸에서 찾음)
+    """
+    try:
+        move = chess.Move.from_uci(uci_move)
+    except ValueError:
+        return None
+    piece_id = white_ids.id_at(move.from_square)
+    if piece_id is None:
+        return None
+    return (piece_id, uci_move, persuasion_dialogue.strip(), board.ply())
+
+
+def commit_persuaded_move(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    request: dict,
+    journal: list = None,
+):
+    """
+    [수락]된 설득 이동을 보드와 기물 데이터에 적용합니다. (여러 번 호출해도 한 번만 적용)
+    (수정됨: 강제 이동과 같은 apply_move 경로를 사용하고, 되돌리기 항목은 request["undo"]에 보관)
+    """
+    if request["committed"]:
+        return
+    request["committed"] = True
+
+    entry = apply_move(board, white_ids, piece_data, request["move"], journal=journal)
+    request["captured_value"] = entry["value"]
+    request["undo"] = entry
+    # (회의 모드처럼 대답이 이동보다 먼저 반영된 경우 그 대화도 이 수와 함께 되돌림)
+    if request.get("history_added"):
+        entry["history"] = (request["piece_id"], request["history_added"])
+
+
+def finish_persuaded_move(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    request: dict,
+    decision: str,
+    dialogue: str,
+    llm_output: str,
+    journal: list = None,
+) -> (bool, str, int):
+    """
+    run_persuasion의 결과를 반영하고 move_piece와 같은 (성공여부, 메시지, 잡은기물점수)를 반환합니다.
+    (수정됨: 같은 요청을 여러 번 반영해도 거절 횟수/대화 내역은 한 번만 바뀌고 같은 결과를 반환)
+    """
+    if "finished" in request:
+        return request["finished"]
+
+    # (이동을 먼저 적용해야 되돌리기 항목의 거절 횟수가 설득 전 값으로 남음)
     if decision == "수락":
+        commit_persuaded_move(board, white_ids, piece_data, request, journal)
 
-        # ⬇️⬇️⬇️ [추가] ⬇️⬇️⬇️
-        # 이동 직전에 캡처 여부 확인
-        if board.is_capture(move):
-            captured_piece = board.piece_at(move.to_square)  # 흑 기물
-            if captured_piece:
-                symbol = captured_piece.symbol().upper()
-                captured_value = PIECE_VALUES.get(symbol, 0)
-        # ⬆️⬆️⬆️ [추가 완료] ⬆️⬆️⬆️
-
-        # --- (기존 이동 로직과 동일) ---
-        end_sq = chess.square_name(move.to_square)
-        if board.is_castling(move):
-            rook_start_sq, rook_end_sq = (None, None)
-            if move.to_square == chess.G1:
-                rook_start_sq, rook_end_sq = "h1", "f1"
-            elif move.to_square == chess.C1:
-                rook_start_sq, rook_end_sq = "a1", "d1"
-            if rook_start_sq:
-                rook_id = location_to_id.get(rook_start_sq)
-                if rook_id:
-                    white_ids[rook_id] = rook_end_sq
-                    piece_data[rook_id]["current_square"] = rook_end_sq
-
-        white_ids[piece_id] = end_sq
-        piece_data[piece_id]["current_square"] = end_sq
-
-        if move.promotion:
-            new_type_symbol = chess.piece_symbol(move.promotion).upper()
-            piece_data[piece_id]["type"] = new_type_symbol
-
-        board.push(move)
-        # --- (기존 로직 끝) ---
-
-        return True, dialogue, captured_value  # <--- [수정] 점수 반환
+    request["history_added"] = apply_persuasion_result(
+        piece_data, request, decision, llm_output
+    )
+
+    if decision == "수락":
+        request["undo"]["history"] = (request["piece_id"], request["history_added"])
+        result = (True, dialogue, request["captured_value"])  # <--- [수정] 점수 반환
 
     else:  # (decision == "거부" or "오류")
-        return False, dialogue, 0  # <--- [수정] 0점 반환
+        result = (False, dialogue, 0)  # <--- [수정] 0점 반환
+
+    request["finished"] = result
+    return result
+
+
+def council_moves(
+    board: chess.Board, white_ids: dict, to_square: str, piece_ids: list = None
+) -> list:
+    """
+    [회의 모드] to_square로 합법적으로 갈 수 있는 아군 기물(킹 제외)의 이동 목록을 반환합니다.
+    piece_ids가 주어지면 그 기물들만 후보로 합니다. (승진은 퀸 승진만 후보로 사용)
+    """
+    target = chess.parse_square(to_square)
+    moves = []
+    for move in POSITION_CACHE.current(board)["moves"]:
+        if move.to_square != target or move.promotion not in (None, chess.QUEEN):
+            continue
+        piece_id = white_ids.id_at(move.from_square)
+        if not piece_id or board.piece_type_at(move.from_square) == chess.KING:
+            continue
+        if piece_ids is None or piece_id in piece_ids:
+            moves.append(move.uci())
+    return moves
+
+
+def prepare_council(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    to_square: str,
+    persuasion_dialogue: str,
+    morale: int = 1,
+    piece_ids: list = None,
+) -> list:
+    """
+    [회의 모드] 왕의 대사 하나로 to_square 후보 기물 모두에게 보낼 설득 요청 목록을 만듭니다.
+    (이번 턴에 이미 3회 거절한 기물은 회의에 부르지 않음)
+    """
+    requests = []
+    for uci_move in council_moves(board, white_ids, to_square, piece_ids):
+        request = prepare_persuaded_move(
+            board, white_ids, piece_data, uci_move, persuasion_dialogue, morale
+        )
+        if "error" in request:
+            continue
+        if piece_data[request["piece_id"]].get("rejection_count_this_turn", 0) >= 3:
+            continue
+        # (단독 설득과 task를 공유하지 않도록 회의용 키를 따로 사용)
+        if request.get("flight_key"):
+            request["flight_key"] = ("council", *request["flight_key"])
+        requests.append(request)
+    return requests
+
+
+def finish_council(piece_data: dict, results: list) -> list:
+    """
+    [회의 모드] 각 기물의 대답을 거절 횟수/대화 내역에 반영하고, 수락한 요청 목록을 반환합니다.
+    이동은 적용하지 않습니다. (플레이어가 고른 기물만 commit_persuaded_move로 이동)
+    results: [(request, (결정, 대사, LLM 원본 응답)), ...]
+    (수정됨: 같은 요청을 공유한 중복 회의는 이미 반영된 요청을 건너뜀)
+    """
+    accepted = []
+    for request, (decision, dialogue, llm_output) in results:
+        if "finished" in request:
+            continue
+        request["history_added"] = apply_persuasion_result(
+            piece_data, request, decision, llm_output
+        )
+        request["reply"] = (decision, dialogue)
+        request["finished"] = (False, dialogue, 0)  # (이동은 고른 기물만 따로 적용)
+        if decision == "수락":
+            accepted.append(request)
+    return accepted
+
+
+def council_persuade(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    to_square: str,
+    persuasion_dialogue: str,
+    morale: int = 1,
+    piece_ids: list = None,
+) -> list:
+    """
+    [회의 모드] 후보 기물 모두를 동시에 설득하고 결과를 반영한 뒤 수락한 요청 목록을 반환합니다.
+    (블로킹 버전. 이동은 고른 요청을 commit_persuaded_move에 넘겨 적용)
+    """
+    requests = prepare_council(
+        board,
+        white_ids,
+        piece_data,
+        to_square,
+        persuasion_dialogue,
+        morale,
+        piece_ids,
+    )
+    council = submit_council(requests)
+    council.wait()
+    return finish_council(piece_data, council.results())
 
 
 # ⬇️⬇️⬇️ [수정됨] ⬇️⬇️⬇️
 def move_piece_black(
-    board: chess.Board, white_ids: dict, piece_data: dict, uci_move: str
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    uci_move: str,
+    journal: list = None,
 ) -> (bool, int):  # <--- [반환값 수정] (bool, lost_value)
     """
     [수정] 흑(Stockfish)의 이동을 처리하고 (성공여부, 잃은기물점수)를 반환합니다.
@@ -262,59 +459,149 @@ def move_piece_black(
     except ValueError:
         return (False, 0)  # <--- [수정]
 
-    if move not in board.legal_moves:
+    if not POSITION_CACHE.is_legal(board, move.uci()):
         return (False, 0)  # <--- [수정]
 
-    # ⬇️⬇️⬇️ [추가] ⬇️⬇️⬇️
-    lost_value = 0  # 잃은 기물 점수 초기화
-    # ⬆️⬆️⬆️ [추가 완료] ⬆️⬆️⬆️
+    # 3. 잡기 반영 및 보드에 이동 적용
+    # (수정됨: 잡힌 백 기물(앙파상 포함)의 처리와 점수 계산은 apply_move에서)
+    entry = apply_move(board, white_ids, piece_data, move, journal=journal)
+    lost_value = entry["value"]
 
-    # 3. 캡처(잡기)가 발생했는지 확인
-    if board.is_capture(move):
-        captured_sq_name = None
+    return (True, lost_value)  # <--- [수정] 성공여부와 점수 반환
+
+
+def apply_move(
+    board: chess.Board,
+    white_ids: dict,
+    piece_data: dict,
+    move: chess.Move,
+    journal: list = None,
+    forced: bool = False,
+) -> dict:
+    """
+    [추가] 백/흑 모든 수(ply)를 보드, 기물 목록(PieceRegistry), 기물 데이터에 적용하는 단일 경로입니다.
+    (잡기, 앙파상, 캐슬링, 승진을 반영한 뒤 board.push)
+    되돌리기 항목을 반환하고, journal(리스트)이 주어지면 그 끝에 쌓습니다.
+      value:       백의 수면 잡은 흑 기물 점수, 흑의 수면 잃은 백 기물 점수
+      morale_delta: 이 수로 바뀐 사기 (백 +value / 흑 -value)
+      registry:    PieceRegistry.apply_move의 변경 목록
+      promoted:    (기물 ID, 승진 전 종류) 또는 None
+      rejections:  (백의 수) 이동 직전 기물별 거절 횟수
+      history:     (기물 ID, 이 수의 설득으로 추가된 대화) 또는 None
+      forced:      강제 이동 여부 (되돌리면 강제 이동 횟수도 돌려줌)
+    """
+    white_turn = board.turn == chess.WHITE
+    entry = {
+        "move": move,
+        "value": 0,
+        "morale_delta": 0,
+        "promoted": None,
+        "rejections": None,
+        "history": None,
+        "forced": forced,
+    }
+
+    if white_turn:
+        # 1. 이동 직전에 캡처 여부 확인
+        if board.is_capture(move):
+            captured_piece = board.piece_at(move.to_square)  # 흑 기물
+            if captured_piece:
+                symbol = captured_piece.symbol().upper()
+                entry["value"] = PIECE_VALUES.get(symbol, 0)
+        entry["rejections"] = {
+            piece_id: data.get("rejection_count_this_turn", 0)
+            for piece_id, data in piece_data.items()
+        }
+        piece_id = white_ids.id_at(move.from_square)
+
+    # 2. 기물 목록 갱신 (백의 수: 이동/캐슬링, 흑의 수: 잡힌 백 기물)
+    entry["registry"] = white_ids.apply_move(board, move)
+    for changed_id, _ in entry["registry"]:
+        if changed_id not in piece_data:
+            continue
+        piece_data[changed_id]["current_square"] = white_ids[changed_id]
+        if not white_turn:
+            # 잃은 기물의 점수 계산
+            lost_piece_type = piece_data[changed_id]["type"]
+            entry["value"] = PIECE_VALUES.get(lost_piece_type, 0)
+            print(
+                f"흑에게 {changed_id}({lost_piece_type}) 기물을 잃음. (점수: {entry['value']})"
+            )
+
+    # 3. 승진 (ID는 그대로, 종류만 변경)
+    if white_turn and move.promotion and piece_id in piece_data:
+        entry["promoted"] = (piece_id, piece_data[piece_id]["type"])
+        piece_data[piece_id]["type"] = chess.piece_symbol(move.promotion).upper()
 
-        if board.is_en_passant(move):
-            captured_file = chess.square_file(move.to_square)
-            captured_rank = chess.square_rank(move.from_square)
-            captured_sq_index = chess.square(captured_file, captured_rank)
-            captured_sq_name = chess.square_name(captured_sq_index)
-        else:
-            captured_sq_name = chess.square_name(move.to_square)
-
-        # 4. 잡힌 칸(captured_sq_name)에 백 기물이 있었는지 확인
-        captured_id = None
-        for piece_id, location in white_ids.items():
-            if location == captured_sq_name:
-                captured_id = piece_id
-                break
-
-        # 5. [핵심 수정] 백색 기물이 잡혔다면, 상태 변경 및 점수 계산
-        if captured_id:
-            white_ids[captured_id] = None
-
-            if captured_id in piece_data:
-                piece_data[captured_id]["current_square"] = None
-
-                # ⬇️⬇️⬇️ [추가] ⬇️⬇️⬇️
-                # 잃은 기물의 점수 계산
-                lost_piece_type = piece_data[captured_id]["type"]
-                lost_value = PIECE_VALUES.get(lost_piece_type, 0)
-                print(
-                    f"흑에게 {captured_id}({lost_piece_type}) 기물을 잃음. (점수: {lost_value})"
-                )
-                # ⬆️⬆️⬆️ [추가 완료] ⬆️⬆️⬆️
-
-    # 6. 보드에 이동 적용
     board.push(move)
+    POSITION_CACHE.invalidate()
+    entry["morale_delta"] = entry["value"] if white_turn else -entry["value"]
+    if journal is not None:
+        journal.append(entry)
+    return entry
 
-    return (True, lost_value)  # <--- [수정] 성공여부와 점수 반환
+
+def undo_move(board: chess.Board, white_ids: dict, piece_data: dict, entry: dict):
+    """
+    [추가] apply_move가 적용한 마지막 수를 되돌립니다. (board.pop + 기록된 변경만 복원)
+    사기(morale_delta)와 강제 이동 횟수(forced)는 그 값을 관리하는 호출자가 되돌립니다.
+    """
+    board.pop()
+    POSITION_CACHE.invalidate()
+
+    white_ids.undo(entry["registry"])
+    for changed_id, _ in entry["registry"]:
+        if changed_id in piece_data:
+            piece_data[changed_id]["current_square"] = white_ids[changed_id]
+
+    if entry["promoted"]:
+        piece_id, piece_type = entry["promoted"]
+        piece_data[piece_id]["type"] = piece_type
+
+    if entry["rejections"]:
+        for piece_id, count in entry["rejections"].items():
+            if piece_id in piece_data:
+                piece_data[piece_id]["rejection_count_this_turn"] = count
+
+    # 이 수의 설득으로 추가된 대화 제거 (이미 요약으로 접힌 대화는 그대로 둠)
+    if entry["history"]:
+        piece_id, messages = entry["history"]
+        history = piece_data.get(piece_id, {}).get("history", [])
+        for message in messages:
+            for index in range(len(history) - 1, 0, -1):
+                if history[index] is message:
+                    del history[index]
+                    break
+
+
+def take_back(
+    board: chess.Board, white_ids: dict, piece_data: dict, journal: list
+) -> list:
+    """
+    [추가] 무르기: 마지막 백의 수(와 그 뒤의 흑의 수)를 되돌려 다시 백 턴으로 만듭니다.
+    되돌린 항목 목록을 반환합니다. (되돌릴 수 없으면 빈 목록)
+    """
+    undone = []
+    while journal and board.move_stack and journal[-1]["move"] == board.peek():
+        entry = journal.pop()
+        undo_move(board, white_ids, piece_data, entry)
+        undone.append(entry)
+        if board.turn == chess.WHITE:
+            break
+    return undone
 
 
 def get_square_safety(board: chess.Board, uci_move: str) -> (int, int):
     """
     특정 이동의 '도착지' 칸에 대한 안정도와 위험도를 계산합니다.
+    (수정됨: 합법 수는 SAFETY_TABLE의 이동 후 국면 기준 값을 사용합니다.
+     핀에 걸린 기물과 이동한 기물이 비운 칸을 반영하며, 국면마다 한 번만 계산)
     """
-    # (코드 로직 동일)
+    safety = SAFETY_TABLE.lookup(board, uci_move)
+    if safety is not None:
+        return (safety["stability"], safety["risk"])
+
+    # (합법 수가 아니면 기존처럼 이동 전 국면의 공격 기물 수)
     try:
         move = chess.Move.from_uci(uci_move)
     except ValueError:
@@ -0,0 +1,140 @@
+import math
+import os
+import random
+import threading
+
+# --- 빠른 결정(fast path) 설정 (.env 로 덮어쓸 수 있음) ---
+# 수락 확률이 FAST_PATH_ACCEPT 이상이면 즉시 수락, FAST_PATH_REJECT 이하이면 즉시 거부.
+# 그 사이의 애매한 경우에만 LLM이 결정합니다.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH", "1") == "1"
+FAST_ACCEPT_THRESHOLD = float(os.getenv("FAST_PATH_ACCEPT", "0.85"))
+FAST_REJECT_THRESHOLD = float(os.getenv("FAST_PATH_REJECT", "0.1"))
+# 빠른 결정 후에도 (스트리밍 모드에서) LLM에게 결정에 맞는 대사를 쓰게 할지 여부
+FAST_PATH_FLAVOUR = os.getenv("FAST_PATH_FLAVOUR", "1") == "1"
+
+# 페르소나 문장에 들어 있으면 수락 점수에 더하는 가중치
+TRAIT_WEIGHTS = {
+    "겁": -1.0,
+    "두려": -0.6,
+    "살아 돌아": -0.8,
+    "트라우마": -0.5,
+    "회의": -0.4,
+    "불만": -0.4,
+    "냉소": -0.5,
+    "불신": -0.4,
+    "충성": 1.0,
+    "복종": 0.8,
+    "두려워하지 않": 1.2,
+    "용감": 0.8,
+    "광신": 0.8,
+    "의리": 0.5,
+    "애국": 0.5,
+    "야망": 0.3,
+    "기회주의": 0.2,
+}
+
+# 로지스틱 점수 가중치
+BASE_SCORE = 0.8
+STABILITY_WEIGHT = 1.2
+RISK_WEIGHT = 1.8
+MORALE_WEIGHT = 0.3
+REJECTION_WEIGHT = 0.6
+DIALOGUE_BONUS = 0.3
+# 교환 평가(SEE) 1점당 가중치 (기물을 잃는 교환이면 꺼림, -5 ~ 5로 제한)
+EXCHANGE_WEIGHT = 0.4
+
+FAST_ACCEPT_LINES = [
+    "알겠습니다, 폐하! 바로 가겠습니다.",
+    "명령대로 하겠습니다.",
+    "그 정도는 문제없습니다, 폐하.",
+]
+FAST_REJECT_LINES = [
+    "폐하, 그곳으로 가면 저는 죽습니다. 따를 수 없습니다.",
+    "이건 자살 행위입니다. 다른 명령을 내려 주십시오.",
+    "적들이 기다리는 곳으로 갈 수는 없습니다!",
+]
+
+
+def trait_score(profile: str) -> float:
+    return sum(w for word, w in TRAIT_WEIGHTS.items() if word in (profile or ""))
+
+
+class DecisionScorer:
+    """
+    위험도/안정도/교환 평가(SAFETY_TABLE), 페르소나 성향, 사기로 수락 확률을 즉시 계산합니다.
+
+    확률이 임계값 밖이면 LLM 없이 결정하고(빠른 결정), 애매한 경우에만 LLM에 맡깁니다.
+    """
+
+    def __init__(
+        self,
+        accept_threshold: float = FAST_ACCEPT_THRESHOLD,
+        reject_threshold: float = FAST_REJECT_THRESHOLD,
+        enabled: bool = FAST_PATH_ENABLED,
+    ):
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.fast_accepts = 0
+        self.fast_rejects = 0
+        self.llm_decisions = 0
+
+    def accept_probability(
+        self,
+        piece: dict,
+        risk: int,
+        stability: int,
+        morale: int,
+        dialogue: str = "",
+        exchange: int = 0,
+    ) -> float:
+        score = (
+            BASE_SCORE
+            + STABILITY_WEIGHT * stability
+            - RISK_WEIGHT * risk
+            + MORALE_WEIGHT * max(-5, min(5, morale))
+            + trait_score(piece.get("profile", ""))
+            - REJECTION_WEIGHT * piece.get("rejection_count_this_turn", 0)
+            + (DIALOGUE_BONUS if len(dialogue.strip()) >= 10 else 0)
+            + EXCHANGE_WEIGHT * max(-5, min(5, exchange))
+        )
+        return 1 / (1 + math.exp(-score))
+
+    def decide(self, probability: float) -> str | None:
+        """
+        "수락"/"거부": LLM 없이 결정, None: 애매하므로 LLM에 맡김
+        """
+        if not self.enabled:
+            return None
+        if probability >= self.accept_threshold:
+            return "수락"
+        if probability <= self.reject_threshold:
+            return "거부"
+        return None
+
+    def record(self, fast_decision: str | None):
+        with self._lock:
+            if fast_decision == "수락":
+                self.fast_accepts += 1
+            elif fast_decision == "거부":
+                self.fast_rejects += 1
+            else:
+                self.llm_decisions += 1
+
+    def template_line(self, decision: str) -> str:
+        return random.choice(
+            FAST_ACCEPT_LINES if decision == "수락" else FAST_REJECT_LINES
+        )
+
+    def report(self) -> str:
+        with self._lock:
+            fast = self.fast_accepts + self.fast_rejects
+            total = fast + self.llm_decisions
+            if not total:
+                return "⚡ 빠른 결정: 아직 설득 없음"
+            return (
+                f"⚡ 빠른 결정 {fast}/{total}건 ({fast / total:.0%}의 LLM 결정 호출 생략: "
+                f"수락 {self.fast_accepts}, 거부 {self.fast_rejects}), "
+                f"LLM 결정 {self.llm_decisions}건"
+            )
@@ -0,0 +1,354 @@
+import random
+import weakref
+
+import chess
+
+import persuade
+from chess_logic import (
+    GAME_OVER_STATUSES,
+    commit_persuaded_move,
+    finish_council,
+    finish_persuaded_move,
+    get_game_status,
+    is_move_valid,
+    move_piece,
+    move_piece_black,
+    persuasion_flight_key,
+    prepare_council,
+    prepare_persuaded_move,
+    take_back,
+)
+from persuade import reset_rejection
+from persuasion_worker import (
+    SINGLE_FLIGHT,
+    cancel_all_persuasions,
+    completed_task,
+    submit_council,
+    submit_persuasion,
+)
+from position_cache import POSITION_CACHE
+from prefetch import PROMPT_PREFETCHER
+from start_chess import initialize_game
+
+# 프로세스에 열려 있는 GameSession (weakref). 설득 백엔드(persuade.LLM_BACKEND),
+# 스케줄러, 프롬프트 예열, 설득 작업 목록이 모두 프로세스 전역이므로 한 번에 하나만 허용
+_ACTIVE_SESSION = None
+
+
+class RandomEngine:
+    """
+    Stockfish 대신 합법 수 중 하나를 무작위로 두는 흑 엔진입니다.
+    (StockfishEngine과 같은 get_best_move / set_elo. 창 없는 시뮬레이션/벤치마크용)
+    """
+
+    def __init__(self, seed: int = None):
+        self.rng = random.Random(seed)
+
+    def set_elo(self, elo_level: int):
+        pass
+
+    def get_best_move(self, board: chess.Board) -> str | None:
+        moves = POSITION_CACHE.current(board)["moves"]
+        return self.rng.choice(moves).uci() if moves else None
+
+
+class GameSession:
+    """
+    게임 한 판의 상태와 규칙 진행을 담당합니다. (pygame과 무관)
+
+    보드, 기물 목록(PieceRegistry), 기물 데이터, 사기, 강제 이동 횟수, 무르기 기록,
+    흑 엔진을 가지고 있으며, GUI(main.py)는 이 객체의 메서드를 호출하는 클라이언트입니다.
+    - submit_order():   백의 명령 1건을 (블로킹으로) 설득/강제 이동
+    - submit_persuasion() / poll_persuasion(): 백그라운드 설득 (GUI용)
+    - submit_council() / poll_council() / choose_council_member(): 회의 모드
+    - play_black():     흑 엔진의 수 1개
+    - take_back():      마지막 백/흑의 수 무르기
+    - status() / is_over(): 게임 상태
+    - close():          세션 정리 (진행 중인 설득 취소, 교체한 백엔드 되돌리기)
+    engine: get_best_move(board)를 가진 객체 (없으면 RandomEngine)
+    backend: 설득에 사용할 LLM 백엔드 (주면 close()까지 persuade.LLM_BACKEND를 교체)
+    (수정됨: 백엔드와 예열/설득 작업이 프로세스 전역이므로 세션은 한 번에 하나만 열 수 있음.
+     이전 세션을 close()하지 않고 새 세션을 만들면 RuntimeError)
+    """
+
+    def __init__(
+        self,
+        engine=None,
+        fen: str = None,
+        king_name: str = "아서",
+        force_move_limit: int = 5,
+        backend=None,
+    ):
+        global _ACTIVE_SESSION
+        if _ACTIVE_SESSION is not None and _ACTIVE_SESSION() is not None:
+            raise RuntimeError(
+                "GameSession은 한 번에 하나만 열 수 있습니다. (이전 세션을 close()하세요)"
+            )
+        _ACTIVE_SESSION = weakref.ref(self)
+
+        self.engine = engine or RandomEngine()
+        self._previous_backend = persuade.LLM_BACKEND
+        if backend is not None:
+            persuade.LLM_BACKEND = backend
+        self.backend = persuade.LLM_BACKEND
+        self.king_name = king_name
+        self.force_move_limit = force_move_limit
+        self.reset(fen)
+
+    # --- 1. 새 게임 ---
+    def reset(self, fen: str = None, king_name: str = None):
+        """
+        새 게임을 시작합니다. (이전 게임에서 진행 중이던 설득/프롬프트 예열은 취소)
+        """
+        cancelled = cancel_all_persuasions()
+        if cancelled:
+            print(f"🛑 이전 게임의 설득 {cancelled}건을 취소했습니다.")
+        PROMPT_PREFETCHER.cancel()
+
+        if king_name:
+            self.king_name = king_name
+        self.board, self.white_ids, self.piece_data = initialize_game(
+            fen=fen, king_name=self.king_name
+        )
+        self.morale = 1
+        self.force_move_remaining = self.force_move_limit
+        self.journal = []
+
+    def close(self):
+        """
+        진행 중인 설득/프롬프트 예열을 취소하고, 이 세션이 교체한 백엔드를 되돌립니다.
+        """
+        global _ACTIVE_SESSION
+        if _ACTIVE_SESSION is None or _ACTIVE_SESSION() is not self:
+            return  # (이미 닫힘)
+        cancel_all_persuasions()
+        PROMPT_PREFETCHER.cancel()
+        if persuade.LLM_BACKEND is self.backend:
+            persuade.LLM_BACKEND = self._previous_backend
+        _ACTIVE_SESSION = None
+
+    # --- 2. 상태 ---
+    def status(self) -> str:
+        return get_game_status(self.board)
+
+    def is_over(self) -> bool:
+        return self.status() in GAME_OVER_STATUSES
+
+    # --- 3. 백의 명령 ---
+    def _white_moved(self, captured_value: int, forced: bool = False):
+        # 백의 이동이 끝난 뒤: 사기, 강제 이동 횟수, 이번 턴 거절 횟수 정리
+        if captured_value > 0:
+            self.morale += captured_value
+            print(
+                f"🎉 기물 획득! 사기 {captured_value} 증가. (현재 사기: {self.morale})"
+            )
+        if forced:
+            self.force_move_remaining -= 1
+        reset_rejection(self.piece_data)
+
+    def submit_order(
+        self,
+        uci_move: str,
+        persuasion_dialogue: str = "",
+        force_move: bool = False,
+        on_dialogue=None,
+    ) -> (str, str):
+        """
+        백의 명령 1건을 처리하고 (결정, 대사)를 반환합니다. (설득은 LLM 응답까지 기다림)
+        force_move=True 이면 설득 없이 강제 이동 (남은 강제 이동 횟수가 있어야 함)
+        on_dialogue가 주어지면 기물의 응답을 스트리밍으로 전달합니다.
+        """
+        try:
+            chess.Move.from_uci(uci_move)
+        except ValueError:
+            return "오류", "킹의 명령: 잘못된 UCI 형식입니다."
+        if not is_move_valid(self.board, uci_move):
+            return "거부", "킹의 명령: 해당 이동은 현재 규칙상 유효하지 않습니다."
+        if force_move and self.force_move_remaining <= 0:
+            return "거부", "킹의 명령: 강제 이동 횟수를 모두 사용했습니다."
+
+        moved, dialogue, captured_value = move_piece(
+            self.board,
+            self.white_ids,
+            self.piece_data,
+            uci_move,
+            persuade=(not force_move),
+            persuasion_dialogue=persuasion_dialogue,
+            morale=self.morale,
+            on_dialogue=on_dialogue,
+            journal=self.journal,
+        )
+        if not moved:
+            return "거부", dialogue
+
+        self._white_moved(captured_value, forced=force_move)
+        return "수락", dialogue
+
+    def submit_persuasion(self, uci_move: str, persuasion_dialogue: str):
+        """
+        설득 이동을 백그라운드에서 시작하고 PersuasionTask를 반환합니다.
+        (보드/기물 데이터 변경은 poll_persuasion이 호출한 스레드에서 처리)
+        같은 설득이 진행 중이면 요청을 만들지 않고 그 task를 함께 사용합니다.
+        """
+        task = SINGLE_FLIGHT.join(
+            persuasion_flight_key(
+                self.board, self.white_ids, uci_move, persuasion_dialogue
+            )
+        )
+        if task is not None:
+            # (접두어는 진행 중인 설득이 이미 평가했으므로 남은 예열은 멈춤)
+            PROMPT_PREFETCHER.cancel()
+            return task
+
+        request = prepare_persuaded_move(
+            self.board,
+            self.white_ids,
+            self.piece_data,
+            uci_move,
+            persuasion_dialogue,
+            self.morale,
+        )
+        if "error" in request:
+            _, message, _ = request["error"]
+            return completed_task(request, ("거부", message, ""))
+
+        task = submit_persuasion(request)
+        if task.request is request:  # (중복 제출이면 진행 중인 task를 함께 사용)
+            PROMPT_PREFETCHER.claim(request["piece_id"], request["messages"])
+        return task
+
+    def poll_persuasion(self, task) -> tuple | None:
+        """
+        설득이 끝났으면 결과를 보드와 사기에 반영하고 (결정, 대사)를 반환합니다.
+        진행 중이면 None을 반환합니다.
+        """
+        if "error" in task.request:
+            decision, dialogue, _ = task.result()
+            return decision, dialogue
+
+        # 1. [수락]이 먼저 도착했다면 대사 생성이 끝나기 전에 이동부터 적용
+        stream_decision, _ = task.stream_state()
+        if stream_decision == "수락":
+            commit_persuaded_move(
+                self.board, self.white_ids, self.piece_data, task.request, self.journal
+            )
+
+        if not task.done():
+            return None
+
+        # 2. 최종 결과 반영 (거절 횟수, history, 이동)
+        # (같은 task를 공유한 중복 제출은 이미 반영된 결과만 받음)
+        first_result = "finished" not in task.request
+        decision, dialogue, llm_output = task.result()
+        _, dialogue, captured_value = finish_persuaded_move(
+            self.board,
+            self.white_ids,
+            self.piece_data,
+            task.request,
+            decision,
+            dialogue,
+            llm_output,
+            self.journal,
+        )
+
+        # 3. 사기 점수 적용
+        if first_result and decision == "수락":
+            self._white_moved(captured_value)
+
+        return decision, dialogue
+
+    def prefetch_piece(self, piece_id: str | None):
+        """
+        기물을 선택하면 그 기물의 프롬프트 접두어를 미리 예열합니다.
+        (선택 해제(None)나 킹 선택이면 진행 중인 예열을 취소)
+        """
+        piece = self.piece_data.get(piece_id) if piece_id else None
+        if piece is None or piece["type"] == "K":
+            PROMPT_PREFETCHER.cancel()
+            return
+        PROMPT_PREFETCHER.warm(piece_id, piece)
+
+    # --- 4. 회의 모드 ---
+    def submit_council(self, to_square: str, persuasion_dialogue: str):
+        """
+        to_square로 갈 수 있는 아군 기물 모두에게 같은 대사로 동시에 설득합니다.
+        부를 기물이 없으면 None을 반환합니다.
+        """
+        requests = prepare_council(
+            self.board,
+            self.white_ids,
+            self.piece_data,
+            to_square,
+            persuasion_dialogue,
+            self.morale,
+        )
+        if not requests:
+            return None
+        print(f"🏛️ 회의 소집: {', '.join(r['piece_id'] for r in requests)}")
+        return submit_council(requests)
+
+    def poll_council(self, council) -> list | None:
+        """
+        회의가 끝났으면 모든 기물의 대답(거절 횟수, history)을 반영하고
+        수락한 설득 요청 목록을 반환합니다. 진행 중이면 None을 반환합니다.
+        """
+        if not council.done():
+            return None
+        return finish_council(self.piece_data, council.results())
+
+    def choose_council_member(self, request: dict) -> (str, str):
+        """
+        회의에서 수락한 기물 중 플레이어가 고른 기물을 이동시킵니다.
+        """
+        commit_persuaded_move(
+            self.board, self.white_ids, self.piece_data, request, self.journal
+        )
+        self._white_moved(request["captured_value"])
+        return request["reply"]
+
+    # --- 5. 흑 / 무르기 ---
+    def play_black(self) -> (bool, int):
+        """
+        흑 엔진의 수를 두고 (성공여부, 잃은기물점수)를 반환합니다.
+        """
+        engine_move = self.engine.get_best_move(self.board)
+        if not engine_move:
+            print("❌ 흑 엔진이 수를 찾지 못했습니다.")
+            return (False, 0)
+
+        success, lost_value = move_piece_black(
+            self.board, self.white_ids, self.piece_data, engine_move, self.journal
+        )
+        if not success:
+            print(f"❌ 흑 기물 이동 오류: {engine_move}")
+            return (False, 0)
+
+        if lost_value > 0:
+            self.morale -= lost_value
+            print(f"🔥 기물 잃음! 사기 {lost_value} 감소. (현재 사기: {self.morale})")
+        return (True, lost_value)
+
+    def take_back(self) -> bool:
+        """
+        무르기: 마지막 백의 수와 그 뒤 흑의 수를 되돌리고,
+        그 수들로 바뀐 사기와 강제 이동 횟수도 돌려놓습니다.
+        """
+        cancelled = cancel_all_persuasions()
+        if cancelled:
+            print(f"🛑 무르기 전에 진행 중이던 설득 {cancelled}건을 취소했습니다.")
+        PROMPT_PREFETCHER.cancel()
+
+        undone = take_back(self.board, self.white_ids, self.piece_data, self.journal)
+        if not undone:
+            print("↩️ 무를 수 있는 수가 없습니다.")
+            return False
+
+        for entry in undone:
+            self.morale -= entry["morale_delta"]
+            if entry["forced"]:
+                self.force_move_remaining += 1
+        print(
+            f"↩️ 무르기: {', '.join(entry['move'].uci() for entry in undone)} "
+            f"(현재 사기: {self.morale}, 남은 강제 이동: {self.force_move_remaining})"
+        )
+        return True
@@ -0,0 +1,212 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# --- 기물별 대화 내역 토큰 예산 (.env 로 덮어쓸 수 있음) ---
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+KEEP_RECENT_EXCHANGES = int(os.getenv("HISTORY_KEEP_RECENT", "2"))
+
+SUMMARY_HEADER = "### 지난 대화 요약 ###"
+
+SUMMARY_INSTRUCTION = """너는 체스 기물과 왕 사이의 지난 대화를 기록하는 서기이다.
+아래 대화에서 왕이 내린 명령, 기물의 수락/거부 여부, 기물이 느낀 감정과 왕과의 관계 변화를
+기물의 입장에서 3문장 이내의 한국어로 요약하라. 기존 요약이 있다면 그 내용도 포함하라.
+요약문만 출력하라."""
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 토큰 수를 대략 추정합니다.
+    (영문/숫자/FEN은 약 4글자당 1토큰, 한글 등은 약 1.5글자당 1토큰)
+    (수정됨: 글자마다 ord()를 부르지 않고 ASCII 인코딩 길이로 셈. 창 없는 연속 대국에서 병목)
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    other_chars = len(text) - ascii_chars
+    return int(ascii_chars / 4 + other_chars / 1.5) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    estimate_tokens 기준으로 max_tokens 안에 들어가는 가장 긴 앞부분을 반환합니다.
+    (가짜 LLM이 num_predict 상한을 대사 길이 계산과 같은 비율로 흉내낼 때 사용)
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid]) <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low]
+
+
+def count_message_tokens(messages: list) -> int:
+    return sum(estimate_tokens(m["content"]) + 4 for m in messages)
+
+
+class HistoryManager:
+    """
+    기물별 대화 내역을 토큰 예산 안으로 유지합니다.
+
+    - 페르소나(system) 메시지와 최근 KEEP_RECENT_EXCHANGES개의 대화는 항상 그대로 보냅니다.
+    - 예산을 넘으면 그보다 오래된 대화를 백그라운드에서 LLM으로 요약해
+      piece["summary"]에 누적하고, 요약된 대화는 piece["history"]에서 제거합니다.
+    - 요약 결과의 반영(기물 데이터 변경)은 항상 메인 스레드에서 이루어집니다.
+    """
+
+    def __init__(
+        self,
+        query_fn,
+        token_budget: int = HISTORY_TOKEN_BUDGET,
+        keep_recent: int = KEEP_RECENT_EXCHANGES,
+    ):
+        self.query_fn = query_fn
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        # piece_id -> {"piece": 기물 dict, "folded": 요약 대상 메시지 수, "future": Future}
+        self._pending = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="history-summary"
+        )
+        self.total_saved_tokens = 0
+
+    def build_messages(
+        self, piece_id: str, piece: dict, system_prompt: str, situation_prompt: str
+    ) -> (list, dict):
+        """
+        LLM에 보낼 메시지 목록과 토큰 통계를 만듭니다.
+        (system_prompt: 페르소나와 고정 규칙. 요약은 그 뒤에 붙여 접두어를 유지합니다.)
+        통계: {"full_tokens": 전체 기록 기준, "sent_tokens": 실제 전송, "saved_tokens": 절약}
+        """
+        self.collect_summary(piece_id, piece)
+
+        history = piece["history"]
+        system_message = self.system_message(piece, system_prompt)
+        user_message = {"role": "user", "content": situation_prompt}
+
+        # 1. 최근 대화부터 예산 안에 들어가는 만큼 유지 (최근 N개는 무조건 유지)
+        recent = self.recent_history(system_message, history, user_message)
+        messages = [system_message, *recent, user_message]
+
+        # 2. 절약된 토큰 계산 (요약 없이 전체 기록을 보냈을 경우와 비교)
+        full_tokens = piece.get("folded_tokens", 0) + count_message_tokens(
+            [{"role": "system", "content": system_prompt}, *history[1:], user_message]
+        )
+        sent_tokens = count_message_tokens(messages)
+        saved_tokens = max(0, full_tokens - sent_tokens)
+        self.total_saved_tokens += saved_tokens
+
+        stats = {
+            "full_tokens": full_tokens,
+            "sent_tokens": sent_tokens,
+            "saved_tokens": saved_tokens,
+        }
+        print(
+            f"🧾 {piece_id} 프롬프트 토큰 약 {sent_tokens} "
+            f"(전체 기록 기준 {full_tokens}, 절약 {saved_tokens}, 누적 절약 {self.total_saved_tokens})"
+        )
+        return messages, stats
+
+    def recent_history(
+        self, system_message: dict, history: list, user_message: dict = None
+    ) -> list:
+        """
+        system 메시지(와 user 메시지)를 더해도 예산 안에 들어가는 최근 대화를 반환합니다.
+        """
+        tail = [user_message] if user_message else []
+        recent = list(history[1:])
+        min_len = self.keep_recent * 2
+        while (
+            len(recent) > min_len
+            and count_message_tokens([system_message, *recent, *tail])
+            > self.token_budget
+        ):
+            recent = recent[2:]
+        return recent
+
+    def prefix_messages(self, piece_id: str, piece: dict, system_prompt: str) -> list:
+        """
+        다음 설득 요청에서 상황 프롬프트 앞에 놓일 메시지(페르소나 + 요약 + 최근 대화)를
+        만듭니다. (프롬프트 예열용. 상황 프롬프트가 예산을 좌우할 만큼 길면 조금 다를 수 있음)
+        """
+        self.collect_summary(piece_id, piece)
+        system_message = self.system_message(piece, system_prompt)
+        return [system_message, *self.recent_history(system_message, piece["history"])]
+
+    def system_message(self, piece: dict, system_prompt: str) -> dict:
+        content = system_prompt
+        if piece.get("summary"):
+            content = f"{content}\n\n{SUMMARY_HEADER}\n{piece['summary']}"
+        return {"role": "system", "content": content}
+
+    def schedule_summary(self, piece_id: str, piece: dict, system_prompt: str):
+        """
+        대화가 예산을 넘었으면 최근 N개보다 오래된 대화의 요약을 백그라운드에서 시작합니다.
+        """
+        self.collect_summary(piece_id, piece)
+        if piece_id in self._pending:
+            return  # 이미 요약 중
+
+        history = piece["history"]
+        foldable = len(history) - 1 - self.keep_recent * 2
+        foldable -= foldable % 2  # (user, assistant) 쌍 단위로만 요약
+        if foldable <= 0:
+            return
+        system_message = self.system_message(piece, system_prompt)
+        if count_message_tokens([system_message, *history[1:]]) <= self.token_budget:
+            return
+
+        old_exchanges = list(history[1 : 1 + foldable])
+        summary_request = [
+            {"role": "system", "content": SUMMARY_INSTRUCTION},
+            {
+                "role": "user",
+                "content": self.summary_prompt(piece.get("summary", ""), old_exchanges),
+            },
+        ]
+        self._pending[piece_id] = {
+            "piece": piece,
+            "folded": foldable,
+            "folded_tokens": count_message_tokens(old_exchanges),
+            "future": self._executor.submit(
+                self.query_fn,
+                summary_request,
+                tags={"kind": "summary", "piece_id": piece_id},
+            ),
+        }
+
+    def summary_prompt(self, previous_summary: str, exchanges: list) -> str:
+        lines = []
+        if previous_summary:
+            lines.append(f"[기존 요약]\n{previous_summary}\n")
+        lines.append("[요약할 대화]")
+        for message in exchanges:
+            speaker = "왕의 명령" if message["role"] == "user" else "기물의 대답"
+            lines.append(f"{speaker}: {message['content'].strip()}")
+        return "\n".join(lines)
+
+    def collect_summary(self, piece_id: str, piece: dict):
+        """
+        끝난 요약 작업이 있으면 기물 데이터에 반영합니다. (메인 스레드에서 호출)
+        """
+        pending = self._pending.get(piece_id)
+        if not pending or not pending["future"].done():
+            return
+        del self._pending[piece_id]
+
+        if pending["piece"] is not piece:
+            return  # (새 게임이 시작되어 다른 기물이 되었음)
+
+        try:
+            summary = pending["future"].result().strip()
+        except Exception as e:
+            print(f"{piece_id} 대화 요약 실패 (다음 기회에 재시도): {e}")
+            return
+
+        piece["summary"] = summary
+        piece["folded_tokens"] = (
+            piece.get("folded_tokens", 0) + pending["folded_tokens"]
+        )
+        del piece["history"][1 : 1 + pending["folded"]]
+        print(f"📝 {piece_id}의 오래된 대화 {pending['folded'] // 2}건을 요약했습니다.")
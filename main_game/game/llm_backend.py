@@ -0,0 +1,382 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from contextlib import closing
+from typing import Callable, Protocol
+
+from history_manager import count_message_tokens, estimate_tokens, truncate_to_tokens
+from llm_client import OLLAMA_KEEP_ALIVE
+
+# --- LLM 백엔드 선택 (.env 로 덮어쓸 수 있음) ---
+# "ollama": 실제 Ollama 서버 (기본값)
+# "mock":   규칙 기반 가짜 응답 (오프라인 실행/부하 테스트용)
+# "record": Ollama 응답을 LLM_RECORD_PATH 파일에 기록
+# "replay": LLM_RECORD_PATH 파일에 기록된 응답을 재생 (서버 없이 같은 결과 재현)
+LLM_BACKEND_NAME = os.getenv("LLM_BACKEND", "ollama")
+LLM_RECORD_PATH = os.getenv(
+    "LLM_RECORD_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "llm_recording.jsonl"),
+)
+MOCK_LATENCY = float(os.getenv("MOCK_LLM_LATENCY", "0"))
+MOCK_TOKEN_DELAY = float(os.getenv("MOCK_LLM_TOKEN_DELAY", "0"))
+
+PROMPT_EVAL_FIELDS = (
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+    "total_duration",
+    "load_duration",
+)
+
+
+class RequestCancelled(Exception):
+    """
+    취소된 LLM 요청입니다. stream의 on_text 콜백에서 발생시키면
+    HTTP 스트림을 닫아 서버의 생성을 중단시키고 호출자에게 그대로 전달됩니다.
+    """
+
+
+class LLMBackend(Protocol):
+    """
+    설득/요약에 사용하는 LLM 호출 인터페이스입니다.
+
+    chat:   전체 응답 문자열을 반환
+    stream: 토큰이 도착할 때마다 지금까지 누적된 응답으로 on_text(text)를 호출하고,
+            마지막에 전체 응답 문자열을 반환 (on_text가 RequestCancelled를 발생시키면 중단)
+    stats 딕셔너리가 주어지면 prompt_eval_count 등의 응답 통계를 채웁니다.
+    options는 Ollama 생성 옵션(num_predict, temperature 등)입니다.
+    keep_alive는 서버의 모델 유지 시간입니다. (None이면 OLLAMA_KEEP_ALIVE)
+    """
+
+    def chat(
+        self,
+        messages: list,
+        model: str,
+        format=None,
+        stats: dict = None,
+        options: dict = None,
+        keep_alive: str = None,
+    ) -> str: ...
+
+    def stream(
+        self,
+        messages: list,
+        on_text: Callable[[str], None],
+        model: str,
+        format=None,
+        stats: dict = None,
+        options: dict = None,
+        keep_alive: str = None,
+    ) -> str: ...
+
+
+def collect_response_stats(response, stats: dict | None):
+    """
+    Ollama 응답(또는 스트리밍의 마지막 청크)의 시간/토큰 통계를 stats에 복사합니다.
+    """
+    if stats is None:
+        return
+    for field in PROMPT_EVAL_FIELDS:
+        value = getattr(response, field, None)
+        if value is not None:
+            stats[field] = value
+
+
+# --- 1. Ollama (HTTP) ---
+class OllamaBackend:
+    """
+    LLMRouter를 통해 실제 Ollama 서버를 호출합니다.
+    """
+
+    def __init__(self, router):
+        self.router = router
+
+    def chat(
+        self, messages, model, format=None, stats=None, options=None, keep_alive=None
+    ) -> str:
+        response = self.router.chat(
+            stats=stats,
+            model=model,
+            messages=messages,
+            format=format,
+            options=options,
+            keep_alive=keep_alive or OLLAMA_KEEP_ALIVE,
+        )
+        collect_response_stats(response, stats)
+        return response["message"]["content"]
+
+    def stream(
+        self,
+        messages,
+        on_text,
+        model,
+        format=None,
+        stats=None,
+        options=None,
+        keep_alive=None,
+    ) -> str:
+        text = ""
+        # (on_text에서 예외가 나면 closing이 스트림을 닫아 HTTP 연결을 끊음)
+        with closing(
+            self.router.stream_chat(
+                stats=stats,
+                model=model,
+                messages=messages,
+                format=format,
+                options=options,
+                keep_alive=keep_alive or OLLAMA_KEEP_ALIVE,
+            )
+        ) as chunks:
+            for chunk in chunks:
+                if chunk.done:
+                    collect_response_stats(chunk, stats)
+                content = chunk["message"]["content"]
+                if content:
+                    text += content
+                    on_text(text)
+        return text
+
+
+# --- 2. 규칙 기반 가짜 LLM ---
+# (fen/compact 상황 형식 모두 해석)
+_RISK = re.compile(r"위험도(?:\(적의 공격\)는)? (-?\d+)")
+_STABILITY = re.compile(r"안정도(?:\(아군 방어\)는)? (-?\d+)")
+_MORALE = re.compile(r"사기(?:는)? (-?\d+)")
+_DIALOGUE = re.compile(r'설득(?:한다)?:\s*"(.*)"', re.S)
+
+MOCK_ACCEPT_LINES = [
+    "알겠습니다, 폐하! 가문의 영광을 위해!",
+    "명령대로 하겠습니다.",
+    "폐하의 뜻이라면 따르겠습니다.",
+]
+MOCK_REJECT_LINES = [
+    "제 목숨이 위험합니다. 이 명령은 따를 수 없습니다.",
+    "폐하, 그곳은 너무 위험합니다.",
+    "조금 더 설득해 보시지요.",
+]
+
+
+class MockBackend:
+    """
+    서버 없이 동작하는 결정적(deterministic) 가짜 LLM입니다.
+
+    설득 프롬프트의 위험도/안정도/사기/대사 길이로 점수를 매겨
+    점수 >= accept_threshold 이면 수락합니다. 같은 입력에는 항상 같은 응답을 돌려줍니다.
+    (설득 프롬프트가 아닌 요청, 예를 들어 대화 요약에는 짧은 요약문을 돌려줍니다.)
+
+    Args:
+        latency (float): 응답 전 지연(초). 프롬프트 평가 시간 대역
+        token_delay (float): 스트리밍 토큰(2글자)마다의 지연(초)
+        accept_threshold (int): 수락 기준 점수
+    """
+
+    def __init__(
+        self,
+        latency: float = MOCK_LATENCY,
+        token_delay: float = MOCK_TOKEN_DELAY,
+        accept_threshold: int = 0,
+    ):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.accept_threshold = accept_threshold
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def reply(self, messages: list, format=None) -> str:
+        prompt = messages[-1]["content"] if messages else ""
+        if "왕의 명령" not in prompt:
+            return "왕과 기물은 몇 차례 명령을 주고받았다."
+
+        def number(pattern, default=0):
+            match = pattern.search(prompt)
+            return int(match.group(1)) if match else default
+
+        dialogue_match = _DIALOGUE.search(prompt)
+        dialogue = dialogue_match.group(1).strip() if dialogue_match else ""
+        score = (
+            number(_STABILITY)
+            - number(_RISK)
+            + min(number(_MORALE, 1), 3)
+            + (1 if len(dialogue) >= 10 else 0)
+            - 1
+        )
+        decision = "수락" if score >= self.accept_threshold else "거부"
+
+        lines = MOCK_ACCEPT_LINES if decision == "수락" else MOCK_REJECT_LINES
+        seed = int(hashlib.md5(prompt.encode("utf-8")).hexdigest(), 16)
+        line = lines[seed % len(lines)]
+
+        if format:
+            reply = {"decision": decision, "dialogue": line}
+            if isinstance(format, dict) and "dialogue" not in format["properties"]:
+                del reply["dialogue"]  # 결정만 묻는 스키마
+            return json.dumps(reply, ensure_ascii=False)
+        return f"[{decision}][{line}]"
+
+    def _limit(self, reply: str, options) -> str:
+        # num_predict를 흉내냄 (수정됨: dialogue_options와 같은 estimate_tokens 비율로 자름)
+        if options and options.get("num_predict", -1) >= 0:
+            return truncate_to_tokens(reply, options["num_predict"])
+        return reply
+
+    def _fill_stats(self, messages, stats, reply: str = "", started: float = None):
+        if stats is not None:
+            stats["prompt_eval_count"] = count_message_tokens(messages)
+            stats["prompt_eval_duration"] = int(self.latency * 1e9)
+            stats["eval_count"] = estimate_tokens(reply) if reply else 0
+            if started is not None:
+                total = int((time.perf_counter() - started) * 1e9)
+                stats["total_duration"] = total
+                stats["eval_duration"] = max(0, total - stats["prompt_eval_duration"])
+
+    def chat(
+        self, messages, model, format=None, stats=None, options=None, keep_alive=None
+    ) -> str:
+        started = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        reply = self._limit(self.reply(messages, format), options)
+        self._fill_stats(messages, stats, reply, started)
+        return reply
+
+    def stream(
+        self,
+        messages,
+        on_text,
+        model,
+        format=None,
+        stats=None,
+        options=None,
+        keep_alive=None,
+    ) -> str:
+        started = time.perf_counter()
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        reply = self._limit(self.reply(messages, format), options)
+        for end in range(2, len(reply) + 2, 2):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            on_text(reply[:end])
+        self._fill_stats(messages, stats, reply, started)
+        return reply
+
+
+# --- 3. 기록/재생 ---
+def request_key(messages: list, model: str, format=None) -> str:
+    raw = json.dumps([messages, model, format], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class RecordReplayBackend:
+    """
+    mode="record": inner 백엔드의 응답을 JSONL 파일에 기록하며 그대로 전달합니다.
+    mode="replay": 기록된 응답을 돌려줍니다. 기록에 없는 요청은 inner가 있으면
+                   inner로 넘기고, 없으면 KeyError를 발생시킵니다.
+    """
+
+    def __init__(self, path: str = LLM_RECORD_PATH, mode: str = "replay", inner=None):
+        self.path = path
+        self.mode = mode
+        self.inner = inner
+        self.replayed = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._records[entry["key"]] = entry["content"]
+
+    def _lookup(self, key: str) -> str | None:
+        if self.mode != "replay":
+            return None
+        with self._lock:
+            content = self._records.get(key)
+            if content is not None:
+                self.replayed += 1
+        if content is None and self.inner is None:
+            raise KeyError(f"기록에 없는 LLM 요청입니다: {key[:12]}")
+        return content
+
+    def _record(self, key: str, content: str):
+        if self.mode != "record":
+            return
+        with self._lock:
+            self._records[key] = content
+            self.recorded += 1
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(
+                    json.dumps({"key": key, "content": content}, ensure_ascii=False)
+                )
+                f.write("\n")
+
+    def chat(
+        self, messages, model, format=None, stats=None, options=None, keep_alive=None
+    ) -> str:
+        key = request_key(messages, model, format)
+        content = self._lookup(key)
+        if content is None:
+            content = self.inner.chat(
+                messages,
+                model,
+                format=format,
+                stats=stats,
+                options=options,
+                keep_alive=keep_alive,
+            )
+            self._record(key, content)
+        return content
+
+    def stream(
+        self,
+        messages,
+        on_text,
+        model,
+        format=None,
+        stats=None,
+        options=None,
+        keep_alive=None,
+    ) -> str:
+        key = request_key(messages, model, format)
+        content = self._lookup(key)
+        if content is None:
+            content = self.inner.stream(
+                messages,
+                on_text,
+                model,
+                format=format,
+                stats=stats,
+                options=options,
+                keep_alive=keep_alive,
+            )
+            self._record(key, content)
+            return content
+        for end in range(2, len(content) + 2, 2):
+            on_text(content[:end])
+        return content
+
+
+def create_backend(name: str = None, router=None) -> LLMBackend:
+    """
+    LLM_BACKEND 설정에 맞는 백엔드를 만듭니다. (router: Ollama 호출에 사용할 LLMRouter)
+    """
+    name = name or LLM_BACKEND_NAME
+    if name == "mock":
+        return MockBackend()
+    if name == "record":
+        return RecordReplayBackend(mode="record", inner=OllamaBackend(router))
+    if name == "replay":
+        return RecordReplayBackend(mode="replay")
+    if name != "ollama":
+        print(f"알 수 없는 LLM_BACKEND '{name}', ollama를 사용합니다.")
+    return OllamaBackend(router)
@@ -0,0 +1,73 @@
+import os
+import threading
+
+import httpx
+import ollama
+from dotenv import load_dotenv
+
+load_dotenv()
+
+POD_ID = os.getenv("POD_ID")
+
+RUNPOD_OLLAMA_URL = f"https://{POD_ID}-11434.proxy.runpod.net"
+
+# 여러 Ollama 서버를 쉼표로 나열하면 LLMRouter가 그중 가장 빠른 정상 서버를 사용
+# (없으면 POD_ID의 RunPod 주소 하나만 사용)
+OLLAMA_ENDPOINTS = [
+    url.strip() for url in os.getenv("OLLAMA_ENDPOINTS", "").split(",") if url.strip()
+] or [RUNPOD_OLLAMA_URL]
+
+# --- 연결 풀 / 타임아웃 설정 (.env 로 덮어쓸 수 있음) ---
+CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "10"))
+READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "120"))
+MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "4"))
+KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60"))
+
+# Ollama 서버가 마지막 요청 이후 모델(과 KV 캐시)을 메모리에 유지할 시간
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# host -> ollama.Client (게임 전체에서 공유)
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def create_ollama_client(host: str = None) -> ollama.Client:
+    """
+    keep-alive 연결 풀과 타임아웃이 설정된 새 Ollama 클라이언트를 만듭니다.
+    (보통은 get_ollama_client로 공유 클라이언트를 사용합니다.)
+    """
+    timeout = httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return ollama.Client(host=host or RUNPOD_OLLAMA_URL, timeout=timeout, limits=limits)
+
+
+def get_ollama_client(host: str = None) -> ollama.Client:
+    """
+    host별로 하나씩만 만들어지는 공유 Ollama 클라이언트를 반환합니다.
+    같은 연결을 재사용하므로 매 설득마다 TLS 핸드셰이크를 다시 하지 않습니다.
+    """
+    host = host or RUNPOD_OLLAMA_URL
+
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(host)
+        if client is None:
+            client = create_ollama_client(host)
+            _CLIENTS[host] = client
+        return client
+
+
+def close_ollama_clients():
+    """
+    공유 클라이언트의 연결 풀을 모두 닫습니다. (프로그램 종료 시 호출)
+    """
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            try:
+                client._client.close()
+            except Exception as e:
+                print(f"Ollama 클라이언트 종료 중 오류: {e}")
+        _CLIENTS.clear()
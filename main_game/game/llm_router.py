@@ -0,0 +1,360 @@
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import closing
+
+import httpx
+import ollama
+
+from llm_client import OLLAMA_ENDPOINTS, get_ollama_client
+
+# --- 라우터 설정 (.env 로 덮어쓸 수 있음) ---
+# 요청 1건의 총 제한 시간(초). 재시도와 백오프는 모두 이 안에서 이루어짐
+REQUEST_DEADLINE = float(os.getenv("OLLAMA_DEADLINE", "90"))
+BACKOFF_BASE = float(os.getenv("OLLAMA_BACKOFF_BASE", "0.25"))
+BACKOFF_MAX = float(os.getenv("OLLAMA_BACKOFF_MAX", "4"))
+HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+# 헤징: 첫 요청이 해당 서버의 p95 지연을 넘기면 다른 서버에 같은 요청을 한 번 더 보냄
+HEDGE_ENABLED = os.getenv("OLLAMA_HEDGE", "0") == "1"
+HEDGE_MIN_SAMPLES = 5
+HEDGE_DEFAULT_DELAY = float(os.getenv("OLLAMA_HEDGE_DELAY", "10"))
+# 가끔 가장 빠르지 않은 정상 서버도 써서 지연 시간 기록을 최신으로 유지하는 비율
+EXPLORE_RATE = float(os.getenv("OLLAMA_EXPLORE_RATE", "0.1"))
+
+# 재시도할 HTTP 상태 코드 (그 밖의 4xx는 다시 보내도 같으므로 바로 실패)
+RETRYABLE_STATUS = {408, 429}
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """
+    다른 서버/백오프로 다시 시도할 만한 오류인지 확인합니다.
+    (연결 오류, 타임아웃, 5xx/408/429는 재시도. 모델 없음(404), 잘못된 요청(400),
+     코드 오류 같은 나머지는 재시도해도 같으므로 바로 실패)
+    """
+    if isinstance(error, ollama.ResponseError):
+        code = error.status_code
+        return code == -1 or code >= 500 or code in RETRYABLE_STATUS
+    return isinstance(error, (OSError, httpx.TransportError))
+
+
+class HedgeCancelled(Exception):
+    """
+    헤징에서 다른 서버가 먼저 응답해 취소된 요청입니다. (서버 실패로 기록하지 않음)
+    """
+
+
+class EndpointState:
+    """
+    Ollama 서버 1개의 지연 시간/상태 기록입니다. (LLMRouter의 lock 안에서만 변경)
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self.latencies = deque(maxlen=50)
+        self.ewma = None
+        self.failures = 0  # 연속 실패 횟수
+        self.unhealthy_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.unhealthy_until
+
+    def p95(self) -> float | None:
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else 0.7 * self.ewma + 0.3 * latency
+        self.failures = 0
+        self.unhealthy_until = 0.0
+
+    def record_failure(self, now: float):
+        self.errors += 1
+        self.failures += 1
+        cooldown = min(BACKOFF_MAX * 8, BACKOFF_BASE * 2**self.failures)
+        self.unhealthy_until = now + cooldown
+
+
+class LLMRouter:
+    """
+    여러 Ollama 서버 중 가장 빠른 정상 서버로 요청을 보냅니다.
+
+    - 서버별 지연 시간(EWMA, p95)과 연속 실패를 기록하고, 실패한 서버는 잠시 제외합니다.
+      (EXPLORE_RATE 비율로 다른 정상 서버도 사용해 지연 시간 기록을 갱신)
+    - 실패 시 다른 정상 서버가 있으면 바로 넘기고, 없으면 지수 백오프 + 지터 후 재시도합니다.
+      (재시도는 연결 오류/타임아웃/5xx만. 모델 없음(404) 같은 오류는 바로 발생)
+    - 모든 재시도는 deadline(초) 안에서만 이루어집니다.
+    - hedge=True 이면 첫 요청이 p95 지연을 넘길 때 두 번째 서버에 같은 요청을 보내
+      먼저 온 응답을 사용하고, 진 쪽 요청은 연결을 닫아 취소합니다. (스트리밍 요청은 헤징하지 않음)
+    """
+
+    def __init__(
+        self,
+        endpoints: list = None,
+        deadline: float = REQUEST_DEADLINE,
+        hedge: bool = HEDGE_ENABLED,
+    ):
+        self.endpoints = [EndpointState(url) for url in endpoints or OLLAMA_ENDPOINTS]
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedged_requests = 0
+        self.hedge_wins = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=4, thread_name_prefix="llm-hedge"
+        )
+        self._health_stop = threading.Event()
+        self._health_thread = None
+
+    # --- 1. 서버 선택 ---
+    def ranked_endpoints(self) -> list:
+        """
+        정상 서버를 빠른 순서로 (측정 전인 서버를 먼저), 그 뒤에 곧 복구될 서버 순으로 반환합니다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [e for e in self.endpoints if e.healthy(now)]
+            healthy.sort(key=lambda e: -1 if e.ewma is None else e.ewma)
+            if len(healthy) > 1 and random.random() < EXPLORE_RATE:
+                healthy.insert(0, healthy.pop(random.randrange(1, len(healthy))))
+            waiting = sorted(
+                (e for e in self.endpoints if not e.healthy(now)),
+                key=lambda e: e.unhealthy_until,
+            )
+        return healthy + waiting
+
+    def _record(self, endpoint: EndpointState, started: float, error=None):
+        now = time.monotonic()
+        with self._lock:
+            endpoint.requests += 1
+            if error is None:
+                endpoint.record_success(now - started)
+            elif is_retryable_error(error):
+                endpoint.record_failure(now)
+            else:
+                endpoint.errors += 1  # (요청 쪽 문제이므로 서버를 제외하지 않음)
+
+    def _backoff(self, attempt: int, deadline_at: float):
+        delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+        time.sleep(max(0.0, min(delay, deadline_at - time.monotonic())))
+
+    def _call(self, endpoint: EndpointState, kwargs: dict, cancel=None):
+        """
+        cancel(threading.Event)이 주어지면 스트리밍으로 받아 청크마다 취소를 확인하고,
+        취소되면 연결을 닫아 서버의 생성도 멈춥니다. (결과는 일반 요청과 같은 응답으로 합침)
+        """
+        started = time.monotonic()
+        try:
+            client = get_ollama_client(endpoint.url)
+            if cancel is None:
+                response = client.chat(**kwargs)
+            else:
+                response = self._cancellable_chat(client, kwargs, cancel)
+        except HedgeCancelled:
+            raise
+        except Exception as e:
+            self._record(endpoint, started, e)
+            raise
+        self._record(endpoint, started)
+        return response
+
+    def _cancellable_chat(self, client, kwargs: dict, cancel: threading.Event):
+        parts = []
+        response = None
+        with closing(client.chat(stream=True, **kwargs)) as chunks:
+            for chunk in chunks:
+                if cancel.is_set():
+                    raise HedgeCancelled()
+                parts.append(chunk["message"]["content"] or "")
+                response = chunk
+        if response is not None:
+            response["message"]["content"] = "".join(parts)
+        return response
+
+    # --- 2. 일반 요청 ---
+    def chat(self, stats: dict = None, **kwargs):
+        """
+        ollama.Client.chat과 같은 인자를 받아 가장 알맞은 서버로 보냅니다.
+        deadline 안에 성공하지 못하면 마지막 예외를 발생시킵니다.
+        stats가 주어지면 재시도 횟수(retries)와 마지막으로 시도한 서버(endpoint)를 기록합니다.
+        """
+        deadline_at = time.monotonic() + self.deadline
+        last_exception = TimeoutError("LLM 요청 제한 시간 초과")
+        attempt = 0
+
+        while time.monotonic() < deadline_at:
+            ranked = self.ranked_endpoints()
+            if stats is not None:
+                stats["retries"], stats["endpoint"] = attempt, ranked[0].url
+            try:
+                if self.hedge and len(ranked) > 1:
+                    return self._hedged_call(ranked[0], ranked[1], kwargs)
+                return self._call(ranked[0], kwargs)
+            except Exception as e:
+                print(f"Ollama 호출 오류 ({ranked[0].url}, 시도 {attempt + 1}): {e}")
+                if not is_retryable_error(e):
+                    raise
+                last_exception = e
+
+            attempt += 1
+            # 다른 정상 서버가 남아 있으면 즉시 넘기고, 없으면 백오프
+            if not self.ranked_endpoints()[0].healthy(time.monotonic()):
+                self._backoff(attempt, deadline_at)
+
+        print(f"Ollama 호출 실패: {self.deadline:.0f}초 안에 응답을 받지 못했습니다.")
+        raise last_exception
+
+    def _hedged_call(self, primary, secondary, kwargs: dict):
+        with self._lock:
+            hedge_delay = primary.p95() or HEDGE_DEFAULT_DELAY
+
+        # (진 쪽 요청은 cancel을 걸어 연결을 닫음 -> 서버가 같은 생성을 두 번 하지 않음)
+        cancels = [threading.Event(), threading.Event()]
+        first = self._executor.submit(self._call, primary, kwargs, cancels[0])
+        done, _ = wait([first], timeout=hedge_delay)
+        if done:
+            return first.result()
+
+        # p95를 넘김 -> 두 번째 서버에 같은 요청을 보내고 먼저 성공한 쪽을 사용
+        with self._lock:
+            self.hedged_requests += 1
+        second = self._executor.submit(self._call, secondary, kwargs, cancels[1])
+        futures = [first, second]
+        pending = set(futures)
+        last_exception = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other, cancel in zip(futures, cancels):
+                        if other is not future:
+                            cancel.set()
+                    if future is second:
+                        with self._lock:
+                            self.hedge_wins += 1
+                    return future.result()
+                last_exception = future.exception()
+        raise last_exception
+
+    # --- 3. 스트리밍 요청 ---
+    def stream_chat(self, stats: dict = None, **kwargs):
+        """
+        stream=True 로 chat을 호출하고 청크를 그대로 내보내는 제너레이터입니다.
+        첫 청크를 받기 전의 실패만 다른 서버/백오프로 재시도합니다.
+        (지연 시간은 첫 청크까지의 시간으로 기록, stats는 chat과 같음)
+        """
+        deadline_at = time.monotonic() + self.deadline
+        last_exception = TimeoutError("LLM 요청 제한 시간 초과")
+        attempt = 0
+
+        while time.monotonic() < deadline_at:
+            endpoint = self.ranked_endpoints()[0]
+            if stats is not None:
+                stats["retries"], stats["endpoint"] = attempt, endpoint.url
+            started = time.monotonic()
+            received = False
+            try:
+                # (스트림을 닫으면(close) 내부 HTTP 응답도 바로 닫히도록 closing 사용)
+                with closing(
+                    get_ollama_client(endpoint.url).chat(stream=True, **kwargs)
+                ) as chunks:
+                    for chunk in chunks:
+                        if not received:
+                            received = True
+                            self._record(endpoint, started)
+                        yield chunk
+                return
+            except Exception as e:
+                if received:
+                    with self._lock:
+                        endpoint.record_failure(time.monotonic())
+                    raise
+                self._record(endpoint, started, e)
+                print(
+                    f"Ollama 스트리밍 호출 오류 ({endpoint.url}, 시도 {attempt + 1}): {e}"
+                )
+                if not is_retryable_error(e):
+                    raise
+                last_exception = e
+
+            attempt += 1
+            if not self.ranked_endpoints()[0].healthy(time.monotonic()):
+                self._backoff(attempt, deadline_at)
+
+        print(
+            f"Ollama 스트리밍 호출 실패: {self.deadline:.0f}초 안에 응답을 받지 못했습니다."
+        )
+        raise last_exception
+
+    # --- 4. 상태 확인 ---
+    def probe(self, endpoint: EndpointState) -> bool:
+        """
+        가벼운 /api/tags 요청으로 서버 상태를 확인합니다. (지연 시간 기록에는 넣지 않음)
+        """
+        try:
+            get_ollama_client(endpoint.url).list()
+        except Exception:
+            with self._lock:
+                endpoint.record_failure(time.monotonic())
+            return False
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.unhealthy_until = 0.0
+        return True
+
+    def probe_all(self) -> dict:
+        return {endpoint.url: self.probe(endpoint) for endpoint in self.endpoints}
+
+    def start_health_checks(self, interval: float = HEALTH_INTERVAL):
+        """
+        interval초마다 모든 서버의 상태를 확인하는 백그라운드 스레드를 시작합니다.
+        """
+        if self._health_thread or len(self.endpoints) < 2:
+            return  # 서버가 하나뿐이면 고를 대상이 없으므로 생략
+
+        def loop():
+            while not self._health_stop.wait(interval):
+                self.probe_all()
+
+        self._health_thread = threading.Thread(
+            target=loop, name="llm-health", daemon=True
+        )
+        self._health_thread.start()
+
+    def stats(self) -> list:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": e.url,
+                    "healthy": e.healthy(now),
+                    "requests": e.requests,
+                    "errors": e.errors,
+                    "ewma_ms": None if e.ewma is None else e.ewma * 1000,
+                    "p95_ms": None if e.p95() is None else e.p95() * 1000,
+                }
+                for e in self.endpoints
+            ]
+
+    def report(self) -> str:
+        lines = [
+            f"🛰️ LLM 라우터: 헤징 {self.hedged_requests}회 (두 번째 서버 승리 {self.hedge_wins}회)"
+        ]
+        for s in self.stats():
+            ewma = "-" if s["ewma_ms"] is None else f"{s['ewma_ms']:.0f}ms"
+            lines.append(
+                f"   {s['url']} {'정상' if s['healthy'] else '제외됨'} "
+                f"요청 {s['requests']} 오류 {s['errors']} 평균 {ewma}"
+            )
+        return "\n".join(lines)
+
+    def close(self):
+        self._health_stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,219 @@
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from llm_backend import RequestCancelled
+
+# --- LLM 호출 스케줄러 설정 (.env 로 덮어쓸 수 있음) ---
+# 동시에 서버로 보내는 LLM 요청 수. 서버의 OLLAMA_NUM_PARALLEL과 맞출 것
+# (넘치는 요청은 서버 대기열 대신 이 스케줄러의 우선순위 대기열에서 기다림)
+MAX_CONCURRENCY = int(
+    os.getenv("LLM_MAX_CONCURRENCY", os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+)
+# 설득(대화형) 요청만 쓸 수 있도록 비워 두는 자리 수
+INTERACTIVE_RESERVE = int(os.getenv("LLM_INTERACTIVE_RESERVE", "1"))
+
+# 우선순위 (숫자가 작을수록 먼저)
+PRIORITY_INTERACTIVE = 0  # 플레이어가 기다리는 설득/결정
+PRIORITY_WARMUP = 1  # 모델 예열/하트비트/프롬프트 예열
+PRIORITY_BACKGROUND = 2  # 대화 요약 등 배경 작업
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "대화형",
+    PRIORITY_WARMUP: "예열",
+    PRIORITY_BACKGROUND: "배경",
+}
+
+# 호출 종류(telemetry tags의 kind) -> 우선순위
+KIND_PRIORITY = {
+    "persuasion": PRIORITY_INTERACTIVE,
+    "decision": PRIORITY_INTERACTIVE,
+    "warmup": PRIORITY_WARMUP,
+    "heartbeat": PRIORITY_WARMUP,
+    "prefetch": PRIORITY_WARMUP,
+    "summary": PRIORITY_BACKGROUND,
+}
+# 대화형 요청이 들어오면 대기 중인 것을 버려도 되는 (다시 하면 되는) 호출 종류
+DROPPABLE_KINDS = {"heartbeat", "prefetch"}
+
+
+class RequestDropped(RequestCancelled):
+    """
+    대화형 요청에 자리를 내주느라 버려지거나 선점된 낮은 우선순위 요청입니다.
+    """
+
+
+class SchedulerTicket:
+    """
+    스케줄러를 거치는 LLM 호출 1건입니다.
+    preempted: 실행 중에 대화형 요청이 들어와 중단을 요청받음
+               (낮은 우선순위 호출은 모두 스트리밍으로 보내고, 청크마다 check()로 확인)
+    stopped:   선점 요청을 받고 실제로 중단함 (스케줄러의 선점 건수는 이것만 셈)
+    """
+
+    def __init__(self, kind: str, priority: int, droppable: bool, seq: int):
+        self.kind = kind
+        self.priority = priority
+        self.droppable = droppable
+        self.seq = seq
+        self.dropped = False
+        self.preempted = False
+        self.stopped = False
+        self.enqueued_at = time.perf_counter()
+        self.wait_ms = 0.0
+
+    def check(self):
+        """
+        선점 요청을 받았으면 RequestDropped로 호출을 중단합니다. (스트림 청크마다 호출)
+        """
+        if self.preempted:
+            self.stopped = True
+            raise RequestDropped("대화형 요청에 자리를 내주고 중단합니다.")
+
+
+class LLMScheduler:
+    """
+    모든 Ollama 호출 앞에 있는 클라이언트 측 스케줄러입니다.
+
+    - 동시에 실행되는 호출을 max_concurrency개로 제한하고, 빈자리는 우선순위
+      (대화형 > 예열 > 배경) 순으로, 같은 우선순위에서는 먼저 온 순서로 나눠 줍니다.
+    - interactive_reserve개의 자리는 대화형 요청만 사용합니다.
+    - 대화형 요청이 들어오면 대기 중인 버려도 되는 요청(DROPPABLE_KINDS)은 버리고,
+      자리가 없으면 실행 중인 낮은 우선순위 요청을 선점(중단 요청)합니다.
+      (선점 건수는 요청을 받은 호출이 다음 청크에서 실제로 멈춘 경우만 셈)
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        interactive_reserve: int = INTERACTIVE_RESERVE,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.interactive_reserve = max(
+            0, min(interactive_reserve, self.max_concurrency - 1)
+        )
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = []
+        self._running = set()
+        # 우선순위 -> {"started", "wait_ms", "max_wait_ms", "peak_depth"}
+        self._metrics = {
+            priority: {
+                "started": 0,
+                "wait_ms": 0.0,
+                "max_wait_ms": 0.0,
+                "peak_depth": 0,
+            }
+            for priority in PRIORITY_NAMES
+        }
+        self.dropped = 0
+        self.preempted = 0
+
+    # --- 1. 자리 얻기 / 돌려주기 ---
+    def _limit(self, priority: int) -> int:
+        if priority == PRIORITY_INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.interactive_reserve
+
+    def _can_start(self, ticket: SchedulerTicket) -> bool:
+        # (lock 안에서 호출) 가장 앞선 대기 요청이고 자리가 있어야 시작
+        first = min(self._waiting, key=lambda t: (t.priority, t.seq))
+        return first is ticket and len(self._running) < self._limit(ticket.priority)
+
+    def _make_room(self):
+        # (lock 안에서 호출) 대화형 요청을 위해 낮은 우선순위 요청을 정리
+        for ticket in self._waiting:
+            if ticket.droppable and not ticket.dropped:
+                ticket.dropped = True
+                self.dropped += 1
+        if len(self._running) >= self.max_concurrency:
+            candidates = [
+                t
+                for t in self._running
+                if t.priority != PRIORITY_INTERACTIVE and not t.preempted
+            ]
+            if candidates:
+                # 가장 낮은 우선순위 중 가장 늦게 시작한 요청 1건
+                victim = max(candidates, key=lambda t: (t.priority, t.seq))
+                victim.preempted = True
+        self._cond.notify_all()
+
+    def acquire(self, kind: str = "other") -> SchedulerTicket:
+        """
+        kind의 우선순위로 자리가 날 때까지 기다립니다.
+        버려지면 RequestDropped를 발생시킵니다.
+        """
+        priority = KIND_PRIORITY.get(kind, PRIORITY_BACKGROUND)
+        with self._cond:
+            ticket = SchedulerTicket(
+                kind, priority, kind in DROPPABLE_KINDS, next(self._seq)
+            )
+            if priority == PRIORITY_INTERACTIVE:
+                self._make_room()
+            self._waiting.append(ticket)
+            metrics = self._metrics[priority]
+            depth = sum(1 for t in self._waiting if t.priority == priority)
+            metrics["peak_depth"] = max(metrics["peak_depth"], depth)
+
+            while not ticket.dropped and not self._can_start(ticket):
+                self._cond.wait()
+            self._waiting.remove(ticket)
+            self._cond.notify_all()  # (다음 대기 요청이 시작할 수 있는지 다시 확인)
+            if ticket.dropped:
+                raise RequestDropped(f"대화형 요청에 밀려 {kind} 요청을 버렸습니다.")
+
+            ticket.wait_ms = (time.perf_counter() - ticket.enqueued_at) * 1000
+            metrics["started"] += 1
+            metrics["wait_ms"] += ticket.wait_ms
+            metrics["max_wait_ms"] = max(metrics["max_wait_ms"], ticket.wait_ms)
+            self._running.add(ticket)
+        return ticket
+
+    def release(self, ticket: SchedulerTicket):
+        with self._cond:
+            self._running.discard(ticket)
+            if ticket.stopped:
+                self.preempted += 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, kind: str = "other"):
+        ticket = self.acquire(kind)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    # --- 2. 상태 ---
+    def queue_depth(self) -> dict:
+        """
+        {"running": 실행 중, 우선순위 이름: 대기 중인 요청 수}
+        """
+        with self._cond:
+            depth = {"running": len(self._running)}
+            for priority, name in PRIORITY_NAMES.items():
+                depth[name] = sum(1 for t in self._waiting if t.priority == priority)
+        return depth
+
+    def report(self) -> str:
+        with self._cond:
+            lines = [
+                f"🚦 LLM 스케줄러 (동시 실행 {self.max_concurrency}, "
+                f"대화형 예약 {self.interactive_reserve}): "
+                f"버림 {self.dropped}건, 선점 {self.preempted}건"
+            ]
+            for priority, name in PRIORITY_NAMES.items():
+                metrics = self._metrics[priority]
+                if not metrics["started"]:
+                    continue
+                lines.append(
+                    f"   {name}: {metrics['started']}건, 대기 평균 "
+                    f"{metrics['wait_ms'] / metrics['started']:.0f}ms "
+                    f"(최대 {metrics['max_wait_ms']:.0f}ms), "
+                    f"최대 대기열 {metrics['peak_depth']}"
+                )
+        return "\n".join(lines)
+
+
+LLM_SCHEDULER = LLMScheduler()
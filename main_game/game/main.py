@@ -2,10 +2,18 @@ import chess
 import os
 import sys
 import pygame
-from start_chess import initialize_game
 from chess_logic import *
 from persuade import *
 from black_moving import StockfishEngine
+from game_session import GameSession
+from llm_client import close_ollama_clients
+from prefetch import PROMPT_PREFETCHER
+from model_warmup import MODEL_WARMUP
+from telemetry import LLM_TELEMETRY, TELEMETRY_DUMP_PATH
+from llm_scheduler import LLM_SCHEDULER
+from position_cache import POSITION_CACHE
+from safety_table import SAFETY_TABLE
+from persuasion_worker import SINGLE_FLIGHT, shutdown_persuasion_worker
 
 # GUI 관련 import 경로 수정 및 main_menu, custom_game_screen, settings_screen 추가
 from gui_utils import WINDOW_WIDTH, WINDOW_HEIGHT
@@ -23,35 +31,58 @@ STOCKFISH_PATH = r"main_game\stockfish\stockfish-windows-x86-64-avx2.exe"
 current_elo = 400
 current_king_name = "아서"
 current_force_move_limit = 5
+current_generation_profile = GENERATION_PROFILE  # (LLM_PROFILE 기본값, 설정 화면에서 변경)
 
-try:
-    sf_engine = StockfishEngine(executable_path=STOCKFISH_PATH, elo_level=current_elo)
-    if sf_engine.stockfish is None:
-        print("Stockfish 엔진 로드 실패. 프로그램을 종료합니다.")
+
+def create_stockfish_engine() -> StockfishEngine:
+    """
+    [수정] Stockfish 엔진을 만듭니다. (import 시점이 아니라 게임 루프 시작 시 호출)
+    """
+    try:
+        sf_engine = StockfishEngine(
+            executable_path=STOCKFISH_PATH, elo_level=current_elo
+        )
+        if sf_engine.stockfish is None:
+            print("Stockfish 엔진 로드 실패. 프로그램을 종료합니다.")
+            sys.exit(1)
+    except Exception as e:
+        print(f"Stockfish 초기화 중 오류 발생: {e}")
         sys.exit(1)
-except Exception as e:
-    print(f"Stockfish 초기화 중 오류 발생: {e}")
-    sys.exit(1)
+    return sf_engine
 
 
-# --- 2. 게임 상태 전역 변수 선언 ---
-game_board = None
-game_white_ids = None
-game_piece_data = None
-morale = 1
-force_move_remaining = current_force_move_limit
+# --- 2. 게임 상태 ---
+# (수정됨: 보드/기물/사기/강제 이동 횟수/무르기 기록은 GameSession이 가지고,
+#  이 GUI는 session의 메서드를 호출하는 클라이언트입니다.)
+session = None
 
 
 # --- 3. 핸들러 및 헬퍼 함수 정의 ---
 
 
+def save_telemetry():
+    """
+    [추가] 아직 저장하지 않은 LLM 호출 측정값을 LLM_TELEMETRY_PATH에 덧붙입니다.
+    (한 판이 끝날 때 / 새 게임 시작 전 / 프로그램 종료 시(예외, 창 닫기 포함) 호출)
+    """
+    if not TELEMETRY_DUMP_PATH:
+        return
+    try:
+        count = LLM_TELEMETRY.save_jsonl(TELEMETRY_DUMP_PATH)
+        if count:
+            print(f"📊 LLM 호출 측정 {count}건 저장: {TELEMETRY_DUMP_PATH}")
+    except OSError as e:
+        print(f"LLM 호출 측정 저장 실패: {e}")
+
+
 def reset_game_for_new_start(fen: str = None):
     """
-    [수정] 새 게임 시작을 위해 모든 전역 변수를 초기화합니다.
-    (사기 점수 morale=1 초기화 추가)
+    [수정] 새 게임 시작을 위해 게임 상태와 GUI 상태를 초기화합니다.
+    (수정됨: 게임 상태는 session.reset()이 초기화하고, 설득/프롬프트 예열 취소도 그쪽에서 처리)
     """
-    global game_board, game_white_ids, game_piece_data, morale, force_move_remaining
-    global current_king_name, current_force_move_limit
+    # (추가됨: 지난 판의 LLM 측정값을 저장하고 판 번호를 올림)
+    save_telemetry()
+    LLM_TELEMETRY.new_game()
 
     if fen:
         print(f"--- 🚀 커스텀 게임(FEN)으로 상태 초기화 ---")
@@ -59,11 +90,8 @@ def reset_game_for_new_start(fen: str = None):
         print("--- 🚀 새 게임을 위한 상태 초기화 ---")
 
     # 1. 게임 로직 변수 초기화 (수정됨)
-    game_board, game_white_ids, game_piece_data = initialize_game(
-        fen=fen, king_name=current_king_name
-    )
-    morale = 1  # <--- 사기 점수 1로 리셋
-    force_move_remaining = current_force_move_limit
+    session.force_move_limit = current_force_move_limit
+    session.reset(fen=fen, king_name=current_king_name)
 
     # 2. GUI 상태 (함수 속성) 초기화
     if hasattr(run_game_gui, "prev_last_response"):
@@ -78,71 +106,18 @@ def reset_game_for_new_start(fen: str = None):
             pass
 
 
-def handle_player_move(
-    uci_move: str, persuasion_dialogue: str, force_move: bool = False
-) -> (str, str):
-    """
-    [수정] GUI에서 호출될 실제 백 기물 이동 처리 로직.
-    move_piece로부터 (decision, dialogue, captured_value)를 받아
-    morale 전역 변수를 업데이트합니다.
-    """
-    global game_board, game_white_ids, game_piece_data, morale
-
-    try:
-        if chess.Move.from_uci(uci_move) not in game_board.legal_moves:
-            return "거부", "킹의 명령: 해당 이동은 현재 규칙상 유효하지 않습니다."
-    except ValueError:
-        return "오류", "킹의 명령: 잘못된 UCI 형식입니다."
-
-    # 3. move_piece 호출 (이제 3개의 값을 반환)
-    decision, dialogue, captured_value = move_piece(
-        game_board,
-        game_white_ids,
-        game_piece_data,
-        uci_move,
-        persuade=(not force_move),
-        persuasion_dialogue=persuasion_dialogue,
-        morale=morale,
-    )
-
-    # 4. [추가] 사기 점수 적용
-    if decision == "수락" or decision == True:
-        if captured_value > 0:
-            morale += captured_value
-            print(f"🎉 기물 획득! 사기 {captured_value} 증가. (현재 사기: {morale})")
-
-    return decision, dialogue
-
-
-def handle_black_turn() -> (bool, int):
-    """
-    [수정] 흑(Stockfish) 턴의 이동을 처리합니다.
-    move_piece_black으로부터 (success, lost_value)를 받아 그대로 반환합니다.
-    """
-    global game_board, game_white_ids, game_piece_data
-
-    stockfish_move = sf_engine.get_best_move(game_board)
-
-    if stockfish_move:
-        success, lost_value = move_piece_black(
-            game_board, game_white_ids, game_piece_data, stockfish_move
-        )
-        if success:
-            return (True, lost_value)
-        else:
-            print(f"❌ 흑 기물 이동 오류: {stockfish_move}")
-            return (False, 0)
-    else:
-        print("❌ Stockfish가 수를 찾지 못했습니다.")
-        return (False, 0)
-
-
 # --- 5. 메인 게임 루프 (상태 관리자) ---
 
 
 def main_game_loop():
-    global game_board, game_white_ids, game_piece_data, force_move_remaining, morale
-    global current_elo, current_king_name, current_force_move_limit, sf_engine
+    global current_elo, current_king_name, current_force_move_limit, session
+    global current_generation_profile
+
+    session = GameSession(
+        engine=create_stockfish_engine(),
+        king_name=current_king_name,
+        force_move_limit=current_force_move_limit,
+    )
 
     pygame.init()
 
@@ -158,6 +133,11 @@ def main_game_loop():
     except pygame.error as e:
         print(f"❌ Pygame 클립보드(scrap) 초기화 실패: {e}")
         print("붙여넣기(Ctrl+V) 기능이 작동하지 않을 수 있습니다.")
+
+    # 여러 Ollama 서버가 설정된 경우 주기적으로 상태 확인
+    LLM_ROUTER.start_health_checks()
+    # 메인 메뉴가 떠 있는 동안 원격 서버에 모델을 올려 두고, 이후 하트비트로 유지
+    MODEL_WARMUP.start()
     # ⬆️⬆️⬆️ [수정 완료] ⬆️⬆️⬆️
 
     current_state = "MENU"
@@ -167,7 +147,9 @@ def main_game_loop():
         # --- 5-1. 메인 메뉴 상태 ---
         if current_state == "MENU":
             pygame.display.set_caption("PLEASE Chess - 메인 메뉴")
-            menu_choice = run_main_menu_screen(screen, clock)
+            menu_choice = run_main_menu_screen(
+                screen, clock, model_status=MODEL_WARMUP.status
+            )
 
             if menu_choice == "NEW_GAME":
                 reset_game_for_new_start(fen=None)
@@ -205,6 +187,7 @@ def main_game_loop():
                 "elo": current_elo,
                 "king_name": current_king_name,
                 "force_moves": current_force_move_limit,
+                "profile": current_generation_profile,
             }
 
             new_settings = run_settings_screen(screen, clock, current_settings_data)
@@ -216,11 +199,16 @@ def main_game_loop():
                     new_elo = int(new_settings["elo"])
                     if current_elo != new_elo:
                         current_elo = new_elo
-                        sf_engine.set_elo(current_elo)
+                        session.engine.set_elo(current_elo)
 
                     current_king_name = new_settings["king_name"]
                     current_force_move_limit = int(new_settings["force_moves"])
 
+                    if current_generation_profile != new_settings["profile"]:
+                        current_generation_profile = new_settings["profile"]
+                        set_generation_profile(current_generation_profile)
+                        MODEL_WARMUP.rewarm()  # (num_ctx가 바뀌면 모델을 다시 올림)
+
                 except ValueError:
                     print(
                         "오류: settings_screen이 숫자가 아닌 값을 반환했습니다. (ELO/Force)"
@@ -235,18 +223,10 @@ def main_game_loop():
             pygame.display.set_caption("자아를 가진 체스 (플레이 중)")
 
             # 1. 보드 상태 확인
-            board_state = get_game_status(game_board)
+            board_state = session.status()
 
             # 2. 게임 종료 확인
-            is_game_over = board_state in [
-                STATUS_CHECKMATE_WHITE_WINS,
-                STATUS_CHECKMATE_BLACK_WINS,
-                STATUS_STALEMATE,
-                STATUS_DRAW_INSUFFICIENT_MATERIAL,
-                STATUS_DRAW_SEVENTYFIVE_MOVES,
-                STATUS_DRAW_FIVEFOLD_REPETITION,
-                STATUS_DRAW_OTHER,
-            ]
+            is_game_over = board_state in GAME_OVER_STATUSES
 
             if is_game_over:
                 # ( ... 게임 오버 로직 ... )
@@ -265,15 +245,16 @@ def main_game_loop():
                 )
                 draw_current_state(
                     screen,
-                    game_board,
-                    game_white_ids,
-                    game_piece_data,
+                    session.board,
+                    session.white_ids,
+                    session.piece_data,
                     f"[게임 종료] {final_message}",
                     last_piece_dialogue,
                     selected_piece_id_to_show,
-                    force_move_count=force_move_remaining,
+                    force_move_count=session.force_move_remaining,
                 )
                 pygame.display.flip()
+                save_telemetry()
 
                 game_over_choice = run_game_over_screen(screen, clock, final_message)
 
@@ -287,21 +268,28 @@ def main_game_loop():
             # 3. 턴 처리 로직 (게임이 종료되지 않았을 때)
             else:
                 # 3-1. ⚪ 백 (플레이어) 턴
-                if game_board.turn == chess.WHITE:
+                if session.board.turn == chess.WHITE:
                     gui_result = run_game_gui(
-                        game_board,
-                        game_white_ids,
-                        game_piece_data,
-                        sf_engine,
-                        handle_player_move,
+                        session.board,
+                        session.white_ids,
+                        session.piece_data,
+                        session.engine,
+                        session.submit_order,
                         screen,
                         clock,
-                        force_move_count=force_move_remaining,
+                        force_move_count=session.force_move_remaining,
+                        submit_persuasion=session.submit_persuasion,
+                        poll_persuasion=session.poll_persuasion,
+                        on_piece_selected=session.prefetch_piece,
+                        submit_council=session.submit_council,
+                        poll_council=session.poll_council,
+                        choose_council_member=session.choose_council_member,
+                        take_back=session.take_back,
                     )
 
+                    # (수정됨: 사기/강제 이동 횟수/거절 횟수 정리는 session이 이동과 함께 처리)
                     if gui_result == "WHITE_MOVED":
                         print("✅ 백의 수락 및 이동 완료. 흑 턴으로 전환.")
-                        reset_rejection(game_piece_data)
                         # ( ... 딜레이 로직 ... )
                         last_response = getattr(
                             run_game_gui, "prev_last_response", "[INFO] 백의 이동 완료."
@@ -314,23 +302,22 @@ def main_game_loop():
                         )
                         draw_current_state(
                             screen,
-                            game_board,
-                            game_white_ids,
-                            game_piece_data,
+                            session.board,
+                            session.white_ids,
+                            session.piece_data,
                             last_response,
                             last_piece_dialogue,
                             selected_piece_id_to_show,
-                            force_move_count=force_move_remaining,
+                            force_move_count=session.force_move_remaining,
                         )
                         pygame.display.flip()
                         pygame.time.delay(100)
 
                     elif gui_result == "WHITE_MOVED_FORCED":
-                        force_move_remaining -= 1
                         print(
-                            f"✅ 백의 강제 이동 완료. (남은 횟수: {force_move_remaining})"
+                            f"✅ 백의 강제 이동 완료. "
+                            f"(남은 횟수: {session.force_move_remaining})"
                         )
-                        reset_rejection(game_piece_data)
                         # ( ... 딜레이 로직 ... )
                         last_response = getattr(
                             run_game_gui, "prev_last_response", "[INFO] 백의 이동 완료."
@@ -343,37 +330,34 @@ def main_game_loop():
                         )
                         draw_current_state(
                             screen,
-                            game_board,
-                            game_white_ids,
-                            game_piece_data,
+                            session.board,
+                            session.white_ids,
+                            session.piece_data,
                             last_response,
                             last_piece_dialogue,
                             selected_piece_id_to_show,
-                            force_move_count=force_move_remaining,
+                            force_move_count=session.force_move_remaining,
                         )
                         pygame.display.flip()
                         pygame.time.delay(100)
 
+                    elif gui_result == "TAKEN_BACK":
+                        print("↩️ 무르기 완료. 다시 백 턴.")
+
                     elif gui_result == "QUIT":
                         print("사용자가 게임을 중단했습니다. 메뉴로 복귀합니다.")
                         current_state = "MENU"
 
                 # 3-2. ⚫ 흑 (Stockfish) 턴
-                elif game_board.turn == chess.BLACK:
+                elif session.board.turn == chess.BLACK:
                     print("--- ⚫ 흑 턴: Stockfish 실행 중 ---")
 
-                    success, lost_value = handle_black_turn()
+                    success, _ = session.play_black()
 
                     if not success:
                         print("흑 턴 처리 실패. 게임을 종료합니다.")
                         break
 
-                    if lost_value > 0:
-                        morale -= lost_value
-                        print(
-                            f"🔥 기물 잃음! 사기 {lost_value} 감소. (현재 사기: {morale})"
-                        )
-
                     print("✅ 흑의 이동 완료. 백 턴으로 전환.")
 
                     # ( ... 흑 턴 딜레이 로직 ... )
@@ -398,19 +382,37 @@ def main_game_loop():
 
                         draw_current_state(
                             screen,
-                            game_board,
-                            game_white_ids,
-                            game_piece_data,
+                            session.board,
+                            session.white_ids,
+                            session.piece_data,
                             last_response,
                             last_piece_dialogue,
                             selected_piece_id_to_show,
-                            force_move_count=force_move_remaining,
+                            force_move_count=session.force_move_remaining,
                         )
                         clock.tick(60)
 
                     pygame.event.clear()
 
-    # 메인 루프 종료 시 Pygame 환경 최종 종료
+    # 메인 루프 종료 시 Pygame 환경 및 LLM 연결 풀 최종 종료
+    shutdown_persuasion_worker()
+    PROMPT_PREFETCHER.close()
+    MODEL_WARMUP.close()
+    close_ollama_clients()
+    print(LLM_ROUTER.report())
+    LLM_ROUTER.close()
+    print(PERSUASION_CACHE.report())
+    print(FORMAT_STATS.report())
+    print(DECISION_SCORER.report())
+    print(PROMPT_PREFETCHER.report())
+    print(SINGLE_FLIGHT.report())
+    print(PROFILE_STATS.report())
+    print(MODEL_WARMUP.report())
+    print(LLM_TELEMETRY.report())
+    print(LLM_SCHEDULER.report())
+    print(SAFETY_TABLE.report())
+    print(POSITION_CACHE.report())
+    PERSUASION_CACHE.close()
     pygame.quit()
 
 
@@ -421,3 +423,6 @@ if __name__ == "__main__":
         print(f"치명적인 오류 발생: {e}")
         pygame.quit()
         sys.exit(1)
+    finally:
+        # (흑 턴 중 창 닫기의 sys.exit(0), 치명적인 오류에서도 측정값을 잃지 않도록)
+        save_telemetry()
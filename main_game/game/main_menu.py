@@ -5,8 +5,17 @@ from gui_utils import (
     WINDOW_HEIGHT,
     # (폰트 import는 이제 필요 없으므로 제거)
     IMAGE_DIR,
+    INFO_FONT_BODY,
 )
 
+# 모델 준비 상태 표시 색 (model_warmup.ModelWarmup.status()의 state)
+MODEL_STATUS_COLORS = {
+    "warming": (230, 200, 80),
+    "ready": (90, 210, 110),
+    "failed": (230, 90, 90),
+    "disabled": (160, 160, 160),
+}
+
 
 # 헬퍼 함수: 비율에 맞게 이미지 리사이즈
 def scale_image_proportional(image, target_width):
@@ -26,10 +35,13 @@ def scale_image_proportional(image, target_width):
     return scaled_image
 
 
-def run_main_menu_screen(screen: pygame.Surface, clock: pygame.Surface) -> str:
+def run_main_menu_screen(
+    screen: pygame.Surface, clock: pygame.Surface, model_status=None
+) -> str:
     """
     메인 메뉴 화면을 표시하고 사용자 입력을 대기합니다.
     (수정됨: 모든 UI 이미지의 비율을 유지하며 리사이즈)
+    (추가됨: model_status()가 주어지면 왼쪽 아래에 LLM 모델 준비 상태 표시)
     """
 
     # --- 1. 배경 이미지 로드 ---
@@ -221,6 +233,16 @@ def run_main_menu_screen(screen: pygame.Surface, clock: pygame.Surface) -> str:
         else:
             screen.blit(quit_img, quit_game_rect)
 
+        # 6-4. 모델 준비 상태 (● 모델 준비 중... / 준비 완료 / 연결 실패)
+        if model_status:
+            status = model_status()
+            color = MODEL_STATUS_COLORS.get(status["state"], (200, 200, 200))
+            status_surf = INFO_FONT_BODY.render(f"● {status['text']}", True, color)
+            screen.blit(
+                status_surf,
+                status_surf.get_rect(bottomleft=(20, WINDOW_HEIGHT - 20)),
+            )
+
         # 7. 화면 업데이트
         pygame.display.flip()
         clock.tick(60)
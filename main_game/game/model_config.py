@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+
+# --- 모델 단계별 설정 (.env 로 덮어쓸 수 있음) ---
+# 대사(및 단일 모델 모드의 결정)를 만드는 큰 모델
+DIALOGUE_MODEL = os.getenv("LLM_DIALOGUE_MODEL", "EEVE-Korean-10.8B:latest")
+
+# MODEL_TIERING=1 이면 결정 단계를 따로 두어, 작은 모델(또는 짧은 num_predict 호출)이
+# 먼저 수락/거부만 정하고 큰 모델은 그 결정에 맞는 대사를 이어서 작성합니다.
+MODEL_TIERING = os.getenv("MODEL_TIERING", "0") == "1"
+DECISION_MODEL = os.getenv("LLM_DECISION_MODEL", DIALOGUE_MODEL)
+
+
+def _options_from_env(name: str, default: dict) -> dict:
+    """
+    JSON 문자열로 된 Ollama options 환경변수를 읽습니다. (예: '{"num_predict": 12}')
+    """
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return json.loads(raw)
+    except ValueError as e:
+        print(f"{name} 설정을 읽을 수 없어 기본값을 사용합니다: {e}")
+        return default
+
+
+# 결정 단계: 결정 한 단어만 필요하므로 짧게, 낮은 온도로
+DECISION_OPTIONS = _options_from_env(
+    "LLM_DECISION_OPTIONS", {"num_predict": 16, "temperature": 0.2}
+)
+# 대사 단계: 비워 두면 서버(Modelfile) 기본값 사용
+DIALOGUE_OPTIONS = _options_from_env("LLM_DIALOGUE_OPTIONS", {})
+
+
+# --- 생성 프로필 (.env 의 LLM_PROFILE 기본값, 게임 중에는 설정 화면에서 선택) ---
+# options:     Ollama 생성 옵션 (num_predict는 아래 reply_chars로 기물별로 정함)
+# keep_alive:  서버가 모델/KV 캐시를 유지하는 시간 (None이면 OLLAMA_KEEP_ALIVE)
+# reply_chars: 기물 종류별 대사 최대 글자 수 (프롬프트 지시 + num_predict 상한)
+# (num_ctx가 바뀌면 Ollama가 모델을 다시 올리므로, 같은 프로필의 모든 호출에 같은 값을 사용)
+GENERATION_PROFILES = {
+    "fast": {
+        "label": "빠름",
+        "options": {
+            "num_ctx": 2048,
+            "temperature": 0.6,
+            "stop": ["\n\n", "###", "왕(플레이어)"],
+        },
+        "keep_alive": "60m",
+        "reply_chars": {"P": 25, "N": 35, "B": 35, "R": 40, "Q": 50, "K": 35},
+    },
+    "balanced": {
+        "label": "보통",
+        "options": {
+            "num_ctx": 4096,
+            "temperature": 0.8,
+            "stop": ["\n\n", "###", "왕(플레이어)"],
+        },
+        "keep_alive": None,
+        "reply_chars": {"P": 50, "N": 70, "B": 70, "R": 80, "Q": 100, "K": 70},
+    },
+    "rich": {
+        "label": "풍부함",
+        "options": {
+            "num_ctx": 8192,
+            "temperature": 0.9,
+            "stop": ["###", "왕(플레이어)"],
+        },
+        "keep_alive": None,
+        "reply_chars": {"P": 120, "N": 160, "B": 160, "R": 180, "Q": 220, "K": 160},
+    },
+}
+DEFAULT_PROFILE = os.getenv("LLM_PROFILE", "balanced")
+# 서버 CPU 스레드 수 (0이면 서버 기본값. GPU 서버에서는 보통 그대로 둠)
+NUM_THREAD = int(os.getenv("LLM_NUM_THREAD", "0"))
+
+
+def get_profile(name: str) -> dict:
+    return GENERATION_PROFILES.get(name) or GENERATION_PROFILES["balanced"]
+
+
+def load_options(name: str) -> dict:
+    """
+    모델 로드에 영향을 주는 옵션(num_ctx, num_thread)만 반환합니다.
+    (요약/예열/결정 호출도 같은 값을 써야 모델을 다시 올리지 않음)
+    """
+    options = {"num_ctx": get_profile(name)["options"]["num_ctx"]}
+    if NUM_THREAD > 0:
+        options["num_thread"] = NUM_THREAD
+    return options
+
+
+def reply_char_limit(name: str, piece_type: str) -> int:
+    reply_chars = get_profile(name)["reply_chars"]
+    return reply_chars.get(piece_type, max(reply_chars.values()))
+
+
+def dialogue_options(name: str, piece_type: str, extra_tokens: int = 0) -> dict:
+    """
+    대사 생성 호출의 Ollama options를 만듭니다.
+    num_predict = 기물별 최대 글자 수의 추정 토큰 수(한글 약 1.5글자당 1토큰) + extra_tokens
+    (LLM_DIALOGUE_OPTIONS 환경변수 값이 있으면 그 값이 우선)
+    """
+    options = {**get_profile(name)["options"], **load_options(name)}
+    options["num_predict"] = (
+        int(reply_char_limit(name, piece_type) / 1.5) + extra_tokens
+    )
+    options.update(DIALOGUE_OPTIONS)
+    return options
+
+
+class ProfileStats:
+    """
+    생성 프로필별 응답 지연 시간과 응답 토큰 수를 집계합니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = {}  # 프로필 이름 -> [(지연 초, 응답 토큰 수), ...]
+
+    def record(self, name: str, latency: float, tokens: int):
+        with self._lock:
+            self._samples.setdefault(name, []).append((latency, tokens))
+
+    def report(self) -> str:
+        with self._lock:
+            if not self._samples:
+                return "🎛️ 생성 프로필 통계: 아직 응답 없음"
+            lines = ["🎛️ 생성 프로필별 응답:"]
+            for name, samples in self._samples.items():
+                latencies = sorted(latency for latency, _ in samples)
+                p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+                tokens = sum(t for _, t in samples) / len(samples)
+                lines.append(
+                    f"   {name}: {len(samples)}건, 평균 {sum(latencies) / len(latencies) * 1000:.0f}ms "
+                    f"(p95 {p95 * 1000:.0f}ms), 응답 평균 {tokens:.0f}토큰"
+                )
+            return "\n".join(lines)
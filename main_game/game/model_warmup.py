@@ -0,0 +1,194 @@
+import os
+import threading
+import time
+
+from llm_backend import LLM_BACKEND_NAME
+from llm_scheduler import RequestDropped
+from model_config import DECISION_MODEL, DIALOGUE_MODEL, MODEL_TIERING
+from persuade import query_ollama
+
+# --- 시작 예열 / 하트비트 설정 (.env 로 덮어쓸 수 있음) ---
+# 게임을 켜자마자(메인 메뉴가 떠 있는 동안) 짧은 프롬프트를 보내 원격 서버에 모델을 올려 두고,
+# 그 뒤에는 HEARTBEAT_INTERVAL초마다 생성 없는 요청으로 keep_alive 타이머를 갱신합니다.
+# (OLLAMA_KEEP_ALIVE보다 짧게 설정해야 메뉴에 오래 머물러도 모델이 내려가지 않음)
+WARMUP_ENABLED = os.getenv("MODEL_WARMUP", "1") == "1"
+HEARTBEAT_INTERVAL = float(os.getenv("MODEL_HEARTBEAT_INTERVAL", "300"))
+WARMUP_RETRY_INTERVAL = float(os.getenv("MODEL_WARMUP_RETRY", "30"))
+
+# 모델 로드 + 첫 프롬프트 평가까지 끝내되 생성은 1토큰만
+WARMUP_MESSAGES = [{"role": "user", "content": "안녕"}]
+WARMUP_OPTIONS = {"num_predict": 1}
+# messages가 비어 있으면 Ollama는 모델만 올리고(이미 올라와 있으면 keep_alive만 갱신) 바로 응답
+HEARTBEAT_MESSAGES = []
+
+
+def warmup_models() -> list:
+    models = [DIALOGUE_MODEL]
+    if MODEL_TIERING and DECISION_MODEL != DIALOGUE_MODEL:
+        models.append(DECISION_MODEL)
+    return models
+
+
+class ModelWarmup:
+    """
+    원격 Ollama 서버의 모델을 미리 올려 두고 계속 유지합니다.
+
+    - start():  게임 시작 시 1번 호출. 백그라운드 스레드가 예열 후 하트비트를 보냅니다.
+    - rewarm(): num_ctx가 바뀌는 등(생성 프로필 변경) 모델을 다시 올려야 할 때 호출
+    - status(): 메인 메뉴의 준비 상태 표시용 {"state", "text"}
+      state: "warming" / "ready" / "failed" / "disabled"
+    예열이 실패하면 WARMUP_RETRY_INTERVAL초 뒤에 다시 시도합니다.
+    """
+
+    def __init__(
+        self,
+        query_fn=query_ollama,
+        models: list = None,
+        enabled: bool = WARMUP_ENABLED and LLM_BACKEND_NAME in ("ollama", "record"),
+        heartbeat_interval: float = HEARTBEAT_INTERVAL,
+    ):
+        self.query_fn = query_fn
+        self.models = models or warmup_models()
+        self.enabled = enabled
+        self.heartbeat_interval = heartbeat_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._stopped = False
+        self._pending = False
+        self.state = "warming" if enabled else "disabled"
+        self.error = ""
+        self.started_at = time.monotonic()
+        self.ready_seconds = None
+        self.load_seconds = 0.0
+        self.last_ping = 0.0
+        self.heartbeats = 0
+        self.heartbeat_failures = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self.rewarm()
+        self._thread = threading.Thread(
+            target=self._loop, name="model-warmup", daemon=True
+        )
+        self._thread.start()
+
+    def rewarm(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._pending = True
+            self.state = "warming"
+            self.started_at = time.monotonic()
+        self._wake.set()
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+
+    # --- 1. 백그라운드 스레드 ---
+    def _loop(self):
+        while not self._stopped:
+            self._wake.clear()
+            with self._lock:
+                pending, self._pending = self._pending, False
+            if pending:
+                self._warm()
+            elif time.monotonic() - self.last_ping >= self._next_interval():
+                if self.state == "failed":
+                    self._warm()
+                else:
+                    self._heartbeat()
+            self._wake.wait(self._next_interval())
+
+    def _next_interval(self) -> float:
+        if self.state == "failed":
+            return WARMUP_RETRY_INTERVAL
+        return self.heartbeat_interval if self.heartbeat_interval > 0 else 3600
+
+    def _warm(self):
+        started = time.monotonic()
+        load_ns = 0
+        try:
+            for model in self.models:
+                stats = {}
+                try:
+                    self.query_fn(
+                        WARMUP_MESSAGES,
+                        model=model,
+                        stats=stats,
+                        options=WARMUP_OPTIONS,
+                        tags={"kind": "warmup"},
+                    )
+                except RequestDropped:
+                    pass  # (첫 토큰에서 설득 요청에 선점됨: 모델은 이미 올라와 있음)
+                load_ns += stats.get("load_duration", 0)
+        except Exception as e:
+            with self._lock:
+                self.state = "failed"
+                self.error = str(e)
+            self.last_ping = time.monotonic()
+            print(f"🔌 모델 예열 실패: {e} ({WARMUP_RETRY_INTERVAL:.0f}초 뒤 재시도)")
+            return
+        self.last_ping = time.monotonic()
+        with self._lock:
+            if self._pending:
+                return  # (예열 중에 프로필이 바뀜: 다음 루프에서 다시 예열)
+            self.state = "ready"
+            self.error = ""
+            self.ready_seconds = self.last_ping - self.started_at
+            self.load_seconds = load_ns / 1e9
+        print(
+            f"🔌 모델 예열 완료: {', '.join(self.models)} "
+            f"({time.monotonic() - started:.1f}초, 모델 로드 {load_ns / 1e9:.1f}초)"
+        )
+
+    def _heartbeat(self):
+        try:
+            for model in self.models:
+                self.query_fn(
+                    HEARTBEAT_MESSAGES, model=model, tags={"kind": "heartbeat"}
+                )
+        except RequestDropped:
+            pass  # (설득 요청이 서버를 쓰는 중이면 모델은 이미 유지되고 있음)
+        except Exception as e:
+            with self._lock:
+                self.heartbeat_failures += 1
+            print(f"🔌 모델 하트비트 실패: {e}")
+        else:
+            with self._lock:
+                self.heartbeats += 1
+        self.last_ping = time.monotonic()
+
+    # --- 2. 상태 표시 ---
+    def status(self) -> dict:
+        with self._lock:
+            state = self.state
+            if state == "disabled":
+                text = f"LLM: {LLM_BACKEND_NAME} (예열 안 함)"
+            elif state == "warming":
+                elapsed = time.monotonic() - self.started_at
+                text = f"모델 준비 중... {elapsed:.0f}초"
+            elif state == "ready":
+                text = f"모델 준비 완료 ({self.ready_seconds:.1f}초)"
+            else:
+                text = f"모델 연결 실패: {self.error[:40]}"
+        return {"state": state, "text": text}
+
+    def report(self) -> str:
+        with self._lock:
+            if self.state == "disabled":
+                return "🔌 모델 예열: 사용 안 함"
+            ready = (
+                f"{self.ready_seconds:.1f}초 만에 준비 (모델 로드 {self.load_seconds:.1f}초)"
+                if self.ready_seconds is not None
+                else "준비되지 않음"
+            )
+            return (
+                f"🔌 모델 예열: {ready}, 하트비트 {self.heartbeats}회 "
+                f"(실패 {self.heartbeat_failures})"
+            )
+
+
+MODEL_WARMUP = ModelWarmup()
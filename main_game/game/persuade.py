@@ -1,14 +1,43 @@
-import ollama
 import chess
 import os
-from dotenv import load_dotenv
+import threading
 import time
-
-load_dotenv()
-
-POD_ID = os.getenv("POD_ID")
-
-RUNPOD_OLLAMA_URL = f"https://{POD_ID}-11434.proxy.runpod.net"
+from decision_scorer import FAST_PATH_FLAVOUR, DecisionScorer
+from llm_backend import RequestCancelled, create_backend
+from model_config import (
+    DECISION_MODEL,
+    DECISION_OPTIONS,
+    DEFAULT_PROFILE,
+    DIALOGUE_MODEL,
+    GENERATION_PROFILES,
+    MODEL_TIERING,
+    ProfileStats,
+    dialogue_options,
+    get_profile,
+    load_options,
+    reply_char_limit,
+)
+from llm_router import LLMRouter
+from llm_scheduler import LLM_SCHEDULER, PRIORITY_INTERACTIVE, RequestDropped
+from history_manager import HistoryManager, estimate_tokens
+from persuasion_cache import PersuasionCache, make_cache_key
+from safety_table import SAFETY_TABLE
+from situation_encoder import COMPACT_LEGEND, SITUATION_ENCODING, encode_situation
+from telemetry import LLM_TELEMETRY, build_record
+from reply_format import (
+    REPLY_FORMAT,
+    FormatStats,
+    decision_format_options,
+    format_reply,
+    parse_decision_prefix,
+    parse_reply,
+    reply_format_options,
+    split_decision,
+)
+
+# 측정 모드: 응답마다 prompt_eval_count / prompt_eval_duration을 출력하여
+# Ollama KV 캐시(프롬프트 접두어) 재사용 정도를 확인합니다.
+LOG_PROMPT_EVAL = os.getenv("LOG_PROMPT_EVAL", "0") == "1"
 
 
 def reset_rejection(piece_data):
@@ -16,30 +45,247 @@ def reset_rejection(piece_data):
         piece_data[k]["rejection_count_this_turn"] = 0
 
 
-def query_ollama(prompt: list, model: str = "EEVE-Korean-10.8B:latest") -> str:
+# 여러 Ollama 서버 중 가장 빠른 정상 서버로 요청을 보내는 라우터
+LLM_ROUTER = LLMRouter()
+
+# 설득/요약 LLM 호출이 거쳐 가는 백엔드 (LLM_BACKEND=ollama/mock/record/replay)
+LLM_BACKEND = create_backend(router=LLM_ROUTER)
+
+# 현재 생성 프로필 (fast/balanced/rich, 설정 화면에서 set_generation_profile로 변경)
+GENERATION_PROFILE = (
+    DEFAULT_PROFILE if DEFAULT_PROFILE in GENERATION_PROFILES else "balanced"
+)
+
+# 프로필별 응답 지연 시간 / 응답 토큰 수
+PROFILE_STATS = ProfileStats()
+
+# json 모드에서 대사 외에 필요한 토큰 ({"decision": "수락", "dialogue": "..."} 부분)
+JSON_OVERHEAD_TOKENS = 24
+
+
+def set_generation_profile(name: str):
+    global GENERATION_PROFILE
+    if name not in GENERATION_PROFILES:
+        print(f"알 수 없는 생성 프로필 '{name}', 변경하지 않습니다.")
+        return
+    if name != GENERATION_PROFILE:
+        print(f"🎛️ 생성 프로필 변경: {GENERATION_PROFILE} -> {name}")
+    GENERATION_PROFILE = name
+
+
+def record_llm_call(
+    model: str,
+    stats: dict,
+    started: float,
+    tags: dict = None,
+    streaming: bool = False,
+    status: str = "ok",
+):
+    """
+    LLM 호출 1건의 측정값(응답 통계 + 클라이언트 측 시간/재시도)을 LLM_TELEMETRY에 기록합니다.
+    """
+    LLM_TELEMETRY.record(
+        build_record(
+            model,
+            stats,
+            time.perf_counter() - started,
+            tags=tags,
+            streaming=streaming,
+            status=status,
+        )
+    )
+
+
+def query_ollama(
+    prompt: list,
+    model: str = DIALOGUE_MODEL,
+    stats: dict = None,
+    format=None,
+    options: dict = None,
+    tags: dict = None,
+) -> str:
     """
     Ollama API를 호출합니다.
-    (수정됨: 네트워크 오류 발생 시 5회 재시도)
+    (수정됨: 매번 새 클라이언트 대신 연결 풀을 공유하는 클라이언트 사용)
+    (수정됨: keep_alive로 모델과 KV 캐시를 서버에 유지, stats에 응답 통계 기록)
+    (추가됨: format에 JSON 스키마를 주면 구조화된 응답을 강제)
+    (수정됨: 고정 1초 x 5회 재시도 대신 LLM_ROUTER가 서버 선택/백오프/제한 시간을 관리)
+    (수정됨: LLM_BACKEND를 통해 호출 - 오프라인 mock/기록 재생으로 교체 가능)
+    (수정됨: 현재 생성 프로필의 num_ctx/num_thread/keep_alive를 항상 함께 보냄)
+    (추가됨: 모든 호출의 측정값을 tags(kind, piece_id, piece_type)와 함께 LLM_TELEMETRY에 기록)
+    (추가됨: LLM_SCHEDULER가 tags의 kind에 따른 우선순위로 동시 호출 수를 제한)
+    (수정됨: 낮은 우선순위 호출(요약/예열/하트비트)은 스트리밍으로 보내, 대화형 요청에
+     선점되면 다음 청크에서 스트림을 닫고 RequestDropped로 중단)
+    """
+    stats = {} if stats is None else stats
+    started = time.perf_counter()
+    streaming = False
+    try:
+        with LLM_SCHEDULER.slot((tags or {}).get("kind", "other")) as ticket:
+            stats["queue_ms"] = ticket.wait_ms
+            request = dict(
+                format=format,
+                stats=stats,
+                options={**load_options(GENERATION_PROFILE), **(options or {})},
+                keep_alive=get_profile(GENERATION_PROFILE)["keep_alive"],
+            )
+            if ticket.priority == PRIORITY_INTERACTIVE:
+                content = LLM_BACKEND.chat(prompt, model, **request)
+            else:
+                streaming = True
+                content = LLM_BACKEND.stream(
+                    prompt, lambda text: ticket.check(), model, **request
+                )
+    except RequestDropped:
+        record_llm_call(model, stats, started, tags, streaming, status="dropped")
+        raise
+    except Exception:
+        record_llm_call(model, stats, started, tags, streaming, status="error")
+        raise
+    record_llm_call(model, stats, started, tags, streaming)
+    return content
+
+
+# 기물별 대화 내역을 토큰 예산 안으로 유지 (오래된 대화는 백그라운드 요약)
+HISTORY_MANAGER = HistoryManager(query_fn=query_ollama)
+
+# 같은 페르소나 + 같은 명령 + 같은 대사에 대한 응답 캐시 (메모리 LRU + SQLite)
+PERSUASION_CACHE = PersuasionCache()
+
+# 응답 형식 실패율 (엄격한 파서 기준 vs 관대한 파서 적용 후)
+FORMAT_STATS = FormatStats()
+
+# 뻔한 경우(안전한 칸 / 자살 행위)는 LLM 없이 즉시 결정
+DECISION_SCORER = DecisionScorer()
+
+
+def query_ollama_stream(
+    prompt: list,
+    on_text,
+    model: str = DIALOGUE_MODEL,
+    stats: dict = None,
+    format=None,
+    options: dict = None,
+    tags: dict = None,
+    cancelled: threading.Event = None,
+) -> str:
+    """
+    Ollama API를 stream=True로 호출하고, 토큰이 도착할 때마다
+    지금까지 누적된 응답 전체를 on_text(text)로 전달합니다.
+    첫 토큰을 받기 전의 오류만 재시도합니다. (이미 화면에 보인 응답은 되돌릴 수 없음)
+    (낮은 우선순위 호출이 스케줄러에게 선점되면 다음 토큰에서 RequestDropped로 중단)
+    (추가됨: cancelled가 설정되면 자리를 얻은 뒤 요청을 보내기 전, 또는 다음 토큰에서
+     RequestCancelled로 중단)
     """
-    client = ollama.Client(host=RUNPOD_OLLAMA_URL)
+    stats = {} if stats is None else stats
+    started = time.perf_counter()
+    try:
+        with LLM_SCHEDULER.slot((tags or {}).get("kind", "other")) as ticket:
+            stats["queue_ms"] = ticket.wait_ms
+
+            def check_cancelled():
+                if cancelled is not None and cancelled.is_set():
+                    raise RequestCancelled("요청이 취소되었습니다.")
+
+            def handle_text(text: str):
+                check_cancelled()
+                ticket.check()
+                on_text(text)
+
+            check_cancelled()  # (자리를 기다리는 동안 취소되었으면 보내지 않음)
+
+            content = LLM_BACKEND.stream(
+                prompt,
+                handle_text,
+                model,
+                format=format,
+                stats=stats,
+                options={**load_options(GENERATION_PROFILE), **(options or {})},
+                keep_alive=get_profile(GENERATION_PROFILE)["keep_alive"],
+            )
+    except RequestDropped:
+        record_llm_call(model, stats, started, tags, True, status="dropped")
+        raise
+    except RequestCancelled:
+        record_llm_call(model, stats, started, tags, True, status="cancelled")
+        raise
+    except Exception:
+        record_llm_call(model, stats, started, tags, True, status="error")
+        raise
+    record_llm_call(model, stats, started, tags, True)
+    return content
+
+
+def update_rejection_count(target_piece: dict, decision: str):
+    if decision == "수락":
+        target_piece["rejection_count_this_turn"] = 0
+    elif decision == "거부":
+        target_piece["rejection_count_this_turn"] += 1
+
+
+# --- 설득 프롬프트의 고정 규칙 (system 프롬프트에 한 번만 포함) ---
+# 매 요청마다 바뀌지 않는 내용을 앞쪽에 모아 두어야 Ollama가
+# 이전 요청의 KV 캐시(같은 접두어)를 재사용할 수 있습니다.
+PERSUASION_RULES = """### 너의 역할 ###
+너는 위와 같은 성격(페르소나)을 가진 {piece_type_kr} '{piece_id}'이다.
+왕(플레이어)이 매번 현재 상황, 이동 명령, 위험도와 안정도, 설득 대사를 알려준다.
 
-    max_retries = 5
-    last_exception = None
+### 너의 결정 ###
+너의 성격(페르소나)과 주어진 상황을 종합적으로 고려하여 이 명령을 [수락]할지 [거부]할지 결정하라.
+너의 계급({piece_type_kr})에 맞는 말투를 사용하라. (폰은 비굴하거나 충성스럽게, 퀸은 위엄 있게 등)
+{format_rules}"""
+
+# 응답 형식별 출력 규칙과 예시
+FORMAT_RULES = {
+    "tag": """반드시 다음 형식으로만 대답해야 한다:
+[결정][너의 대답]
+
+### 출력예시:
+[수락][알겠습니다, 폐하! 가문의 영광을 위해!]
+[거부][제 목숨이 위험합니다. 이 명령은 따를 수 없습니다.]""",
+    "json": """반드시 다음 JSON 형식으로만 대답해야 한다. decision은 "수락" 또는 "거부"이다:
+{"decision": "결정", "dialogue": "너의 대답"}
+
+### 출력예시:
+{"decision": "수락", "dialogue": "알겠습니다, 폐하! 가문의 영광을 위해!"}
+{"decision": "거부", "dialogue": "제 목숨이 위험합니다. 이 명령은 따를 수 없습니다."}""",
+}
 
-    for attempt in range(max_retries):
-        try:
-            response = client.chat(model=model, messages=prompt)
-            # 1. 성공 시 즉시 결과 반환
-            return response["message"]["content"]
-        except Exception as e:
-            # 2. 실패 시 로그 출력 및 1초 대기
-            print(f"Ollama LLM 호출 오류 (시도 {attempt + 1}/{max_retries}): {e}")
-            last_exception = e
-            time.sleep(1)  # 1초 대기 후 재시도
 
-    # 3. 5회 모두 실패한 경우, 예외를 발생시킴
-    print(f"Ollama 호출 {max_retries}회 재시도 모두 실패.")
-    raise last_exception
+def build_system_prompt(piece_id: str, piece: dict, encoding: str = None) -> str:
+    """
+    페르소나 + 출력 형식 규칙 + 예시로 이루어진 기물별 고정 system 프롬프트를 만듭니다.
+    (compact 상황 형식이면 기호 설명을 한 번만 덧붙임)
+    """
+    piece_type_kr = PIECE_TYPE_MAP.get(piece["type"], piece["type"])
+    rules = PERSUASION_RULES.format(
+        piece_type_kr=piece_type_kr,
+        piece_id=piece_id,
+        format_rules=FORMAT_RULES.get(REPLY_FORMAT, FORMAT_RULES["tag"]),
+    )
+    if (encoding or SITUATION_ENCODING) == "compact":
+        rules = f"{rules}\n{COMPACT_LEGEND}"
+    return f"{piece['history'][0]['content']}\n\n{rules}"
+
+
+def log_prompt_eval(piece_id: str, stats: dict, estimated_prompt_tokens: int):
+    """
+    [측정 모드] 프롬프트 평가 통계를 출력합니다.
+    prompt_eval_count는 캐시를 재사용하지 못해 새로 평가한 토큰 수이므로,
+    추정 전체 프롬프트 토큰과 비교하면 대략의 재사용률을 알 수 있습니다.
+    """
+    if "prompt_eval_count" not in stats:
+        print(f"📏 {piece_id} prompt_eval 통계 없음")
+        return
+
+    eval_count = stats["prompt_eval_count"]
+    eval_ms = stats.get("prompt_eval_duration", 0) / 1e6
+    reuse = max(0.0, 1 - eval_count / max(1, estimated_prompt_tokens))
+    print(
+        f"📏 {piece_id} prompt_eval_count={eval_count} "
+        f"prompt_eval_duration={eval_ms:.0f}ms "
+        f"(추정 프롬프트 {estimated_prompt_tokens}토큰, 재사용 추정 {reuse:.0%})"
+    )
 
 
 # --- LLM 프롬프트에 사용할 기물 한글 이름 ---
@@ -53,7 +299,7 @@ PIECE_TYPE_MAP = {
 }
 
 
-def persuade_piece(
+def prepare_persuasion(
     board: chess.Board,
     piece_data: dict,
     white_ids: dict,
@@ -62,106 +308,373 @@ def persuade_piece(
     stability: int,
     risk: int,
     morale: int,
-) -> (str, str):
+    use_cache: bool = True,
+    encoding: str = None,
+) -> dict:
     """
-    LLM을 호출하여 특정 기물이 왕의 명령(이동)을 수락할지 거부할지 결정합니다.
-    (수정됨: 형식 오류 및 네트워크 오류 시 "오류"를 반환하고 history에 저장하지 않음)
+    설득 요청(상황 프롬프트와 LLM에 보낼 대화 내역)을 만듭니다.
+    게임 상태는 읽기만 하며, 실패 시 "error" 키에 (결정, 메시지)를 담아 반환합니다.
+    (use_cache=False 이면 응답 캐시를 건너뛰고 항상 LLM을 호출합니다.)
+    (추가됨: encoding으로 상황 프롬프트 형식 선택 - "fen"/"compact", 기본 SITUATION_ENCODING)
     """
 
-    # 1. 이동하는 기물 ID 찾기
-    location_to_id = {v: k for k, v in white_ids.items()}
+    # 1. 이동하는 기물 ID 찾기 (수정됨: PieceRegistry의 칸 -> ID 조회)
     start_square = chess.Move.from_uci(move_uci).from_square
     start_square_name = chess.square_name(start_square)
 
-    piece_id = location_to_id.get(start_square_name)
+    piece_id = white_ids.id_at(start_square)
 
     if not piece_id:
-        return (
-            "거부",  # (이것은 LLM 오류가 아닌 시스템 오류이므로 '거부' 유지)
-            f"(오류) '{start_square_name}' 위치의 아군 기물 ID를 찾을 수 없습니다.",
-        )
+        return {
+            "error": (
+                "거부",  # (이것은 LLM 오류가 아닌 시스템 오류이므로 '거부' 유지)
+                f"(오류) '{start_square_name}' 위치의 아군 기물 ID를 찾을 수 없습니다.",
+            )
+        }
 
     # 2. 설득할 기물의 정보 가져오기
     target_piece = piece_data.get(piece_id)
     if not target_piece:
-        return ("거부", f"(오류) '{piece_id}'의 상세 데이터를 찾을 수 없습니다.")
+        return {
+            "error": ("거부", f"(오류) '{piece_id}'의 상세 데이터를 찾을 수 없습니다.")
+        }
 
     # 3. LLM에게 전달할 프롬프트 생성
     # ( ... 코드 동일 ... )
-    piece_type_symbol = target_piece["type"]
-    piece_type_kr = PIECE_TYPE_MAP.get(piece_type_symbol, piece_type_symbol)
-    current_fen = board.fen()
-    to_square_name = chess.square_name(chess.Move.from_uci(move_uci).to_square)
-
-    situation_prompt = f"""
-### 현재 상황 ###
-너는 {piece_type_kr} '{piece_id}'이다.
-현재 너의 위치는 '{start_square_name}'이다.
-아군 전체의 사기는 {morale}이다.
-현재 전체 전장 상황(FEN): {current_fen}
-
-### 왕의 명령 ###
-왕(플레이어)이 너에게 '{to_square_name}'(으)로 이동하라고 명령했다. (이동: {move_uci})
-이 이동의 위험도(적의 공격)는 {risk}이고, 안정도(아군 방어)는 {stability}이다.
+    # (추가됨: 생성 프로필에 따라 기물 종류별 대사 길이를 제한)
+    profile = GENERATION_PROFILE
+    encoding = encoding or SITUATION_ENCODING
+
+    # (수정됨: 매번 바뀌는 내용만 담음. 고정된 규칙/예시는 system 프롬프트로 이동)
+    # (수정됨: 상황 프롬프트는 situation_encoder가 만듦. compact 형식은 FEN 대신
+    #  주변 칸/목표 칸의 공격자와 방어자/기물 점수/최근 수만 담음)
+    situation_prompt = encode_situation(
+        board,
+        move_uci,
+        morale,
+        risk,
+        stability,
+        persuasion_dialogue,
+        reply_char_limit(profile, target_piece["type"]),
+        encoding,
+    )
+    system_prompt = build_system_prompt(piece_id, target_piece, encoding)
+
+    # 3-1. 로컬 점수로 수락 확률 계산 (확실한 경우 LLM 결정 생략)
+    # (추가됨: 이번 국면의 안전도 표에서 이 수의 교환 평가(SEE)도 반영)
+    safety = SAFETY_TABLE.lookup(board, move_uci) or {}
+    accept_probability = DECISION_SCORER.accept_probability(
+        target_piece,
+        risk,
+        stability,
+        morale,
+        persuasion_dialogue,
+        exchange=safety.get("see", 0),
+    )
+
+    # 4. LLM 호출 준비 (토큰 예산에 맞춰 오래된 대화는 요약본으로 대체)
+    messages_history, token_stats = HISTORY_MANAGER.build_messages(
+        piece_id, target_piece, system_prompt, situation_prompt
+    )
+
+    return {
+        "piece_id": piece_id,
+        "piece_type": target_piece["type"],
+        "profile": profile,
+        "system_prompt": system_prompt,
+        "situation_prompt": situation_prompt,
+        "messages": messages_history,
+        "token_stats": token_stats,
+        "cache_key": make_cache_key(
+            target_piece.get("profile", target_piece["history"][0]["content"]),
+            target_piece["type"],
+            move_uci,
+            risk,
+            stability,
+            morale,
+            persuasion_dialogue,
+            # (fen 형식은 예전 캐시 키 유지)
+            variant=profile if encoding == "fen" else f"{profile}:{encoding}",
+            reply_format=REPLY_FORMAT,
+            models=(DECISION_MODEL, DIALOGUE_MODEL),
+        ),
+        "use_cache": use_cache,
+        "accept_probability": accept_probability,
+        "fast_decision": DECISION_SCORER.decide(accept_probability),
+    }
+
+
+def with_decision_note(messages: list, decision: str) -> list:
+    """
+    이미 정해진 결정을 마지막 user 메시지에 덧붙인 새 메시지 목록을 반환합니다.
+    (대사 단계용. 원래 메시지와 대화 내역은 바꾸지 않음)
+    """
+    return [
+        *messages[:-1],
+        {
+            "role": "user",
+            "content": f"{messages[-1]['content']}\n"
+            f"(너는 이미 이 명령을 [{decision}]하기로 결정했다. "
+            f"그 결정에 어울리는 대답만 하라.)",
+        },
+    ]
+
+
+def query_decision(messages: list, piece_id: str, piece_type: str = "") -> str | None:
+    """
+    [결정 단계] DECISION_MODEL에 짧은 호출(DECISION_OPTIONS)로 수락/거부만 묻습니다.
+    결정을 얻지 못하면 None을 반환하며, 이 경우 큰 모델이 결정과 대사를 함께 만듭니다.
+    """
+    try:
+        output = query_ollama(
+            messages,
+            model=DECISION_MODEL,
+            options=DECISION_OPTIONS,
+            tags={"kind": "decision", "piece_id": piece_id, "piece_type": piece_type},
+            **decision_format_options(),
+        )
+    except Exception as e:
+        print(f"결정 단계 호출 실패 ({piece_id}), 단일 모델로 진행: {e}")
+        return None
 
-왕이 다음과 같이 설득한다:
-"{persuasion_dialogue}"
+    decision, _, _ = parse_reply(output)
+    if decision:
+        print(f"🎯 {piece_id} 결정 단계({DECISION_MODEL}): {decision}")
+    return decision
 
-### 너의 결정 ###
-너의 성격(페르소나)과 위 상황을 종합적으로 고려하여 이 명령을 [수락]할지 [거부]할지 결정하라.
-너의 계급({piece_type_kr})에 맞는 말투를 사용하라. (폰은 비굴하거나 충성스럽게, 퀸은 위엄 있게 등)
-반드시 다음 형식으로만 대답해야 한다:
-[결정][너의 대답]
 
-### 출력예시:
-[수락][알겠습니다, 폐하! 가문의 영광을 위해!]
-[거부][제 목숨이 위험합니다. 이 명령은 따를 수 없습니다.]
-"""
+def run_persuasion(
+    request: dict, on_decision=None, on_dialogue=None
+) -> (str, str, str):
+    """
+    LLM을 호출하고 응답을 (결정, 대사, LLM 원본 응답)으로 파싱합니다.
+    게임 상태를 변경하지 않으므로 백그라운드 스레드에서 호출해도 안전합니다.
+    (on_decision/on_dialogue가 주어지면 스트리밍 모드로 호출)
+    """
+    piece_id = request["piece_id"]
+    use_cache = request.get("use_cache", True) and "cache_key" in request
+
+    # 4-1. 응답 캐시 확인 (같은 상황의 같은 명령이면 LLM 호출 생략)
+    cached_output = PERSUASION_CACHE.get(request["cache_key"]) if use_cache else None
+    if cached_output is not None:
+        decision, dialogue, _ = parse_reply(cached_output)
+        print(f"💾 {piece_id} 설득 응답 캐시 적중 ({decision})")
+        if on_decision:
+            on_decision(decision)
+        if on_dialogue:
+            on_dialogue(decision, dialogue)
+        return (decision, dialogue, cached_output)
+
+    # 4-2. 빠른 결정: 결정은 즉시 알리고, 대사는 (스트리밍 모드라면) LLM이 이어서 작성
+    fast_decision = request.get("fast_decision")
+    DECISION_SCORER.record(fast_decision)
+    streaming = bool(on_decision or on_dialogue)
+    decided = fast_decision
+    if fast_decision:
+        print(f"⚡ {piece_id} 빠른 결정: {fast_decision}")
+        if not (streaming and FAST_PATH_FLAVOUR):
+            dialogue = DECISION_SCORER.template_line(fast_decision)
+            if on_decision:
+                on_decision(fast_decision)
+            if on_dialogue:
+                on_dialogue(fast_decision, dialogue)
+            return (fast_decision, dialogue, format_reply(fast_decision, dialogue))
+    elif MODEL_TIERING:
+        # 4-3. 모델 단계 분리: 작은 모델(짧은 호출)이 결정만 먼저 내림
+        decided = query_decision(
+            request["messages"], piece_id, request.get("piece_type", "")
+        )
 
-    # 4. LLM 호출 준비
-    messages_history = list(target_piece["history"])
-    messages_history.append({"role": "user", "content": situation_prompt})
+    messages = request["messages"]
+    if decided:
+        if on_decision:
+            on_decision(decided)
+        if on_dialogue:
+            on_dialogue(decided, "")
+        messages = with_decision_note(messages, decided)
 
     # 5. OLLAMA LLM 호출
-    try:
-        llm_output = query_ollama(messages_history).strip()
-
-        # 6. LLM 응답 파싱 및 반환
-        if llm_output.startswith("[수락]"):
-            decision = "수락"
-            dialogue = llm_output[len("[수락]") :].strip()
-            target_piece["rejection_count_this_turn"] = 0
-
-        elif llm_output.startswith("[거부]"):
-            decision = "거부"
-            dialogue = llm_output[len("[거부]") :].strip()
-            target_piece["rejection_count_this_turn"] += 1
+    # (추가됨: 스트리밍 모드에서는 [수락]/[거부] 접두어(또는 JSON의 decision)가
+    #  도착하는 즉시 결정을 알리고, 이후 대사를 계속 전달)
+    # (추가됨: json 모드에서는 format 스키마로 {"decision", "dialogue"} 응답을 강제)
+    streamed = {"decision": decided, "text": ""}
+
+    def handle_stream_text(text: str):
+        streamed["text"] = text
+        if streamed["decision"] is None:
+            early_decision = parse_decision_prefix(text)
+            if early_decision is None:
+                return  # 아직 접두어가 다 도착하지 않음
+            streamed["decision"] = early_decision
+            if on_decision:
+                on_decision(early_decision)
+
+        if on_dialogue:
+            on_dialogue(streamed["decision"], split_decision(text)[1])
+
+    response_stats = {}
+    stream_interrupted = False
+    format_options = reply_format_options()
+    profile = request.get("profile", GENERATION_PROFILE)
+    generation_options = dialogue_options(
+        profile,
+        request.get("piece_type", ""),
+        extra_tokens=JSON_OVERHEAD_TOKENS if format_options else 0,
+    )
+    tags = {
+        "kind": "persuasion",
+        "piece_id": piece_id,
+        "piece_type": request.get("piece_type", ""),
+    }
+    started = time.perf_counter()
 
+    try:
+        if streaming:
+            llm_output = query_ollama_stream(
+                messages,
+                on_text=handle_stream_text,
+                model=DIALOGUE_MODEL,
+                stats=response_stats,
+                options=generation_options,
+                tags=tags,
+                **format_options,
+            ).strip()
         else:
-            # --- [수정됨] ---
-            # LLM이 형식을 지키지 않았을 경우 "오류"로 처리
-            decision = "오류"
-            dialogue = f"(응답 형식 오류) {llm_output}"
-            # 거절 카운트를 올리지 않음
-            # --- [수정 완료] ---
-
-        # 7. 대화 내역(History) 업데이트
-        # --- [수정됨] ---
-        # "오류"가 아닐 때(수락 또는 거부)만 history에 저장
-        if decision == "수락" or decision == "거부":
-            target_piece["history"].append(
-                {"role": "user", "content": situation_prompt}
-            )
-            target_piece["history"].append({"role": "assistant", "content": llm_output})
-        # --- [수정 완료] ---
+            llm_output = query_ollama(
+                messages,
+                model=DIALOGUE_MODEL,
+                stats=response_stats,
+                options=generation_options,
+                tags=tags,
+                **format_options,
+            ).strip()
+
+        # (추가됨: 프로필별 지연 시간과 응답 토큰 수 기록)
+        latency = time.perf_counter() - started
+        reply_tokens = response_stats.get("eval_count") or estimate_tokens(llm_output)
+        PROFILE_STATS.record(profile, latency, reply_tokens)
+        print(
+            f"🎛️ {piece_id} [{profile}] {latency * 1000:.0f}ms, 응답 {reply_tokens}토큰 "
+            f"(상한 {generation_options['num_predict']})"
+        )
 
-        return (decision, dialogue)
+        if LOG_PROMPT_EVAL:
+            log_prompt_eval(
+                piece_id, response_stats, request["token_stats"]["sent_tokens"]
+            )
 
+    except RequestCancelled:
+        raise  # 취소된 설득은 결과를 만들지 않음 (호출자가 버림)
     except Exception as e:
         # [수정 없음]
         # query_ollama가 5회 재시도 후에도 실패하면 "오류" 반환
         # history는 저장되지 않음
-        return (
-            "오류",
-            f"({piece_id}가 혼란에 빠졌습니다. 명령을 이해하지 못했습니다. 오류: {e})",
+        if streamed["decision"] not in ("수락", "거부"):
+            return (
+                "오류",
+                f"({piece_id}가 혼란에 빠졌습니다. 명령을 이해하지 못했습니다. 오류: {e})",
+                "",
+            )
+        # 스트리밍 도중 끊긴 경우: 결정은 이미 알렸으므로 받은 부분까지 사용
+        print(f"Ollama 스트리밍 중단 ({piece_id}): {e}")
+        llm_output = streamed["text"].strip()
+        stream_interrupted = True
+
+    # 6. LLM 응답 파싱 및 반환
+    # (수정됨: 형식이 어긋나도 본문에서 결정을 찾아내는 관대한 파서 사용)
+    if stream_interrupted:
+        decision, dialogue = split_decision(llm_output)
+    else:
+        decision, dialogue, method = parse_reply(llm_output)
+        FORMAT_STATS.record(method)
+    if streamed["decision"] in ("수락", "거부"):
+        decision = streamed["decision"]  # 이미 알린 결정을 뒤집지 않음
+    if decided and not dialogue:
+        # 결정 후 대사 생성에 실패한 경우 기본 대사 사용
+        dialogue = DECISION_SCORER.template_line(decided)
+        llm_output = format_reply(decided, dialogue)
+
+    if decision not in ("수락", "거부"):
+        # --- [수정됨] ---
+        # 관대한 파서로도 결정을 찾지 못한 경우에만 "오류"로 처리
+        decision = "오류"
+        dialogue = f"(응답 형식 오류) {llm_output}"
+        # --- [수정 완료] ---
+    elif use_cache and not stream_interrupted:
+        # 완전한 정상 응답만 캐시에 저장
+        PERSUASION_CACHE.put(request["cache_key"], llm_output)
+
+    return (decision, dialogue, llm_output)
+
+
+def apply_persuasion_result(
+    piece_data: dict, request: dict, decision: str, llm_output: str
+) -> list:
+    """
+    설득 결과를 기물 데이터(거절 횟수, 대화 내역)에 반영합니다.
+    (백그라운드 설득의 경우 메인 스레드에서 호출해야 합니다.)
+    (추가됨: history에 추가한 메시지 목록을 반환합니다. 무르기에서 이 메시지만 제거)
+    """
+    target_piece = piece_data.get(request["piece_id"])
+    if not target_piece:
+        return []
+
+    # 거절 카운트는 "오류"일 때 올리지 않음
+    update_rejection_count(target_piece, decision)
+
+    # 7. 대화 내역(History) 업데이트
+    # --- [수정됨] ---
+    # "오류"가 아닐 때(수락 또는 거부)만 history에 저장
+    if decision == "수락" or decision == "거부":
+        added = [
+            {"role": "user", "content": request["situation_prompt"]},
+            {"role": "assistant", "content": llm_output},
+        ]
+        target_piece["history"].extend(added)
+        HISTORY_MANAGER.schedule_summary(
+            request["piece_id"], target_piece, request["system_prompt"]
         )
+        return added
+    # --- [수정 완료] ---
+    return []
+
+
+def persuade_piece(
+    board: chess.Board,
+    piece_data: dict,
+    white_ids: dict,
+    move_uci: str,
+    persuasion_dialogue: str,
+    stability: int,
+    risk: int,
+    morale: int,
+    on_decision=None,
+    on_dialogue=None,
+    use_cache: bool = True,
+) -> (str, str):
+    """
+    LLM을 호출하여 특정 기물이 왕의 명령(이동)을 수락할지 거부할지 결정합니다.
+    (수정됨: 형식 오류 및 네트워크 오류 시 "오류"를 반환하고 history에 저장하지 않음)
+    (추가됨: 스트리밍 모드)
+        on_decision(decision): [수락]/[거부] 접두어가 도착하는 즉시 한 번 호출
+        on_dialogue(decision, dialogue): 결정 이후 대사가 생성될 때마다 호출
+    (추가됨: use_cache=False 이면 응답 캐시를 건너뜀)
+    """
+    request = prepare_persuasion(
+        board,
+        piece_data,
+        white_ids,
+        move_uci,
+        persuasion_dialogue,
+        stability,
+        risk,
+        morale,
+        use_cache=use_cache,
+    )
+    if "error" in request:
+        return request["error"]
+
+    decision, dialogue, llm_output = run_persuasion(request, on_decision, on_dialogue)
+    apply_persuasion_result(piece_data, request, decision, llm_output)
+
+    return (decision, dialogue)
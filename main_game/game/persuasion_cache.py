@@ -0,0 +1,204 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+# --- 설득 응답 캐시 설정 (.env 로 덮어쓸 수 있음) ---
+# PERSUASION_CACHE=0 이면 캐시를 건너뛰고 매번 LLM을 호출합니다. (대사 다양성 우선)
+CACHE_ENABLED = os.getenv("PERSUASION_CACHE", "1") == "1"
+CACHE_MEMORY_SIZE = int(os.getenv("PERSUASION_CACHE_SIZE", "256"))
+CACHE_TTL = float(os.getenv("PERSUASION_CACHE_TTL", str(60 * 60 * 24)))
+# (수정됨: 디스크 캐시는 PERSUASION_CACHE_DB로 파일 경로를 지정할 때만 사용. 기본은 메모리만)
+CACHE_DB_PATH = os.getenv("PERSUASION_CACHE_DB", "")
+
+# 사기(morale)는 이 크기 단위로 묶어서 키에 넣습니다. (1과 2는 같은 캐시를 사용)
+MORALE_BUCKET_SIZE = 3
+
+
+def normalize_dialogue(text: str) -> str:
+    """
+    설득 대사를 캐시 키용으로 정규화합니다.
+    (유니코드 정규화, 소문자, 공백 정리, 끝의 문장부호 제거)
+    """
+    text = unicodedata.normalize("NFKC", text or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?~…")
+
+
+def morale_bucket(morale: int) -> int:
+    return morale // MORALE_BUCKET_SIZE
+
+
+def make_cache_key(
+    profile: str,
+    piece_type: str,
+    move_uci: str,
+    risk: int,
+    stability: int,
+    morale: int,
+    dialogue: str,
+    variant: str = "",
+    reply_format: str = "",
+    models: tuple = (),
+) -> str:
+    """
+    (페르소나, 기물 종류, 이동, 위험도, 안정도, 사기 구간, 대사)로 캐시 키를 만듭니다.
+    variant: 응답 모양을 바꾸는 그 밖의 설정 (예: 생성 프로필)
+    reply_format / models: 응답 형식과 결정/대사 모델 이름 (바뀌면 예전 응답을 쓰지 않음)
+    """
+    parts = [
+        profile.strip(),
+        piece_type,
+        move_uci,
+        risk,
+        stability,
+        morale_bucket(morale),
+        normalize_dialogue(dialogue),
+    ]
+    if variant:
+        parts.append(variant)  # (variant가 없으면 예전 키와 같음)
+    if reply_format or models:
+        parts.append([reply_format, *models])
+    raw = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PersuasionCache:
+    """
+    설득 LLM 응답의 2단계 캐시입니다.
+
+    - 1단계: 메모리 LRU (최대 memory_size개, TTL 초과 시 만료)
+    - 2단계: SQLite 파일 (PERSUASION_CACHE_DB를 지정한 경우. 게임을 다시 시작해도 유지)
+    워커 스레드와 메인 스레드에서 함께 사용하므로 모든 접근은 lock으로 보호합니다.
+    """
+
+    def __init__(
+        self,
+        db_path: str = CACHE_DB_PATH,
+        memory_size: int = CACHE_MEMORY_SIZE,
+        ttl: float = CACHE_TTL,
+        enabled: bool = CACHE_ENABLED,
+    ):
+        self.db_path = db_path
+        self.memory_size = memory_size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> (저장 시각, llm_output)
+        self._lock = threading.Lock()
+        self._db = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _connect(self):
+        if self._db is None and self.db_path:
+            try:
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    "key TEXT PRIMARY KEY, llm_output TEXT NOT NULL, "
+                    "created_at REAL NOT NULL)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"설득 캐시 DB를 열 수 없습니다. 메모리 캐시만 사용합니다: {e}")
+                self.db_path = None
+                self._db = None
+        return self._db
+
+    def get(self, key: str) -> str | None:
+        """
+        캐시된 LLM 원본 응답을 반환합니다. 없거나 만료되었으면 None
+        """
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            # 1. 메모리 LRU
+            entry = self._memory.get(key)
+            if entry and now - entry[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry[1]
+            self._memory.pop(key, None)
+
+            # 2. SQLite
+            db = self._connect()
+            if db is not None:
+                try:
+                    row = db.execute(
+                        "SELECT llm_output, created_at FROM responses WHERE key = ?",
+                        (key,),
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    print(f"설득 캐시 조회 오류: {e}")
+                    row = None
+                if row and now - row[1] <= self.ttl:
+                    self._remember(key, row[1], row[0])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, llm_output: str):
+        if not self.enabled:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, llm_output)
+            db = self._connect()
+            if db is not None:
+                try:
+                    db.execute(
+                        "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                        (key, llm_output, now),
+                    )
+                    db.commit()
+                except sqlite3.Error as e:
+                    print(f"설득 캐시 저장 오류: {e}")
+
+    def _remember(self, key: str, created_at: float, llm_output: str):
+        self._memory[key] = (created_at, llm_output)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._connect()
+            if db is not None:
+                db.execute("DELETE FROM responses")
+                db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+            }
+
+    def report(self) -> str:
+        s = self.stats()
+        return (
+            f"💾 설득 캐시: 메모리 적중 {s['memory_hits']}, 디스크 적중 {s['disk_hits']}, "
+            f"미스 {s['misses']} (적중률 {s['hit_rate']:.0%})"
+        )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,278 @@
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from llm_backend import RequestCancelled
+from persuade import run_persuasion
+
+# --- 회의 모드 동시 설득 수 (.env 로 덮어쓸 수 있음) ---
+# 여러 기물에게 동시에 보내는 LLM 요청의 최대 개수 (Ollama의 OLLAMA_NUM_PARALLEL에 맞출 것)
+COUNCIL_CONCURRENCY = int(os.getenv("COUNCIL_CONCURRENCY", "4"))
+
+# 설득 LLM 호출 전용 백그라운드 스레드 (pygame 루프가 멈추지 않도록)
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="persuasion")
+_COUNCIL_EXECUTOR = ThreadPoolExecutor(
+    max_workers=COUNCIL_CONCURRENCY, thread_name_prefix="council"
+)
+
+# 아직 끝나지 않은 설득 (새 게임 시작/종료 시 한꺼번에 취소)
+_ACTIVE_TASKS = set()
+_ACTIVE_LOCK = threading.Lock()
+
+
+class PersuasionTask:
+    """
+    백그라운드에서 진행 중인 설득 1건의 상태입니다.
+
+    워커 스레드는 스트리밍으로 받은 결정/대사만 기록하고,
+    게임 상태(보드, 기물 데이터)는 메인 스레드가 poll 하면서 적용합니다.
+    (추가됨: cancel()로 취소하면 다음 토큰에서 Ollama 스트림을 닫고 결과를 버립니다.)
+    """
+
+    def __init__(self, request: dict, future: Future = None):
+        self.request = request
+        self.future = future
+        self.started_at = time.perf_counter()
+        self._lock = threading.Lock()
+        self._decision = None
+        self._dialogue = ""
+        self._cancelled = threading.Event()
+
+    def update_stream(self, decision: str, dialogue: str):
+        # (워커 스레드에서 호출됨. 취소되었으면 예외로 스트리밍을 중단)
+        if self._cancelled.is_set():
+            raise RequestCancelled(f"{self.request.get('piece_id')} 설득 취소")
+        with self._lock:
+            self._decision = decision
+            self._dialogue = dialogue
+
+    def stream_state(self) -> (str | None, str):
+        """
+        지금까지 도착한 (결정, 대사)를 반환합니다. 결정 전이면 (None, "")
+        """
+        with self._lock:
+            return self._decision, self._dialogue
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self) -> (str, str, str):
+        """
+        run_persuasion의 결과 (결정, 대사, LLM 원본 응답)
+        """
+        return self.future.result()
+
+    def cancellable(self) -> bool:
+        """
+        [수락]된 이동이 아직 보드에 적용되지 않았다면 결과를 버려도 되므로 취소할 수 있습니다.
+        """
+        return not self.request.get("committed") and not self.cancelled()
+
+    def cancel(self):
+        """
+        설득을 취소합니다. 시작 전이면 실행하지 않고, 진행 중이면 다음 토큰이 도착할 때
+        HTTP 스트림을 닫아 서버의 생성을 중단합니다. (결과는 poll 하지 말고 버릴 것)
+        """
+        self._cancelled.set()
+        if self.future.cancel():
+            _forget(self)
+
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+
+def _forget(task: PersuasionTask):
+    with _ACTIVE_LOCK:
+        _ACTIVE_TASKS.discard(task)
+
+
+def _run_task(task: PersuasionTask):
+    try:
+        return run_persuasion(task.request, on_dialogue=task.update_stream)
+    except RequestCancelled:
+        print(f"🛑 {task.request['piece_id']} 설득 취소: LLM 스트림을 닫았습니다.")
+        raise
+    finally:
+        _forget(task)
+
+
+class SingleFlight:
+    """
+    같은 키(기물 ID, 이동, 대사, 수 번호)의 설득이 진행 중이면 LLM을 다시 호출하지 않고
+    진행 중인 PersuasionTask를 함께 돌려줍니다. (Enter 키 반복, 더블 클릭 등)
+    같은 task를 받은 호출자는 모두 같은 결과를 받습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tasks = {}
+        self.submitted = 0
+        self.merged = 0
+
+    def _join(self, key) -> PersuasionTask | None:
+        # (lock 안에서 호출) 진행 중인 같은 키의 task
+        task = self._tasks.get(key) if key is not None else None
+        if task is None or task.cancelled():
+            return None
+        self.merged += 1
+        print(
+            f"🔁 {task.request['piece_id']} 같은 명령이 이미 진행 중입니다. "
+            f"진행 중인 설득의 결과를 함께 사용합니다."
+        )
+        return task
+
+    def join(self, key) -> PersuasionTask | None:
+        """
+        같은 키의 설득이 진행 중이면 그 task를 반환합니다. (설득 요청을 만들기 전에 확인)
+        """
+        with self._lock:
+            task = self._join(key)
+            if task is not None:
+                self.submitted += 1
+            return task
+
+    def get_or_start(self, key, start) -> PersuasionTask:
+        with self._lock:
+            self.submitted += 1
+            task = self._join(key)
+            if task is not None:
+                return task
+            task = start()
+            if key is not None:
+                self._tasks[key] = task
+        # (이미 끝난 future면 콜백이 바로 실행되므로 lock 밖에서 등록)
+        if key is not None:
+            task.future.add_done_callback(lambda _: self._forget(key, task))
+        return task
+
+    def _forget(self, key, task: PersuasionTask):
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def report(self) -> str:
+        with self._lock:
+            return (
+                f"🔁 설득 제출 {self.submitted}건 중 중복 {self.merged}건 병합 "
+                f"(LLM 호출 {self.merged}회 절약)"
+            )
+
+
+SINGLE_FLIGHT = SingleFlight()
+
+
+def _start_task(request: dict, executor: ThreadPoolExecutor = None) -> PersuasionTask:
+    task = PersuasionTask(request)
+    with _ACTIVE_LOCK:
+        _ACTIVE_TASKS.add(task)
+    task.future = (executor or _EXECUTOR).submit(_run_task, task)
+    return task
+
+
+def submit_persuasion(request: dict) -> PersuasionTask:
+    """
+    run_persuasion을 백그라운드 스레드에서 실행하고 즉시 PersuasionTask를 반환합니다.
+    (수정됨: 같은 설득이 이미 진행 중이면 그 task를 반환 - request["flight_key"] 기준)
+    """
+    return SINGLE_FLIGHT.get_or_start(
+        request.get("flight_key"), lambda: _start_task(request)
+    )
+
+
+class CouncilTask:
+    """
+    회의 모드: 같은 대사로 여러 기물에게 동시에 보낸 설득들의 묶음입니다.
+    (각 설득은 PersuasionTask. 결과 반영은 메인 스레드에서 finish_council로)
+    """
+
+    def __init__(self, tasks: list):
+        self.tasks = tasks
+        self.started_at = time.perf_counter()
+
+    def done(self) -> bool:
+        return all(task.done() for task in self.tasks)
+
+    def wait(self):
+        for task in self.tasks:
+            task.future.exception()
+
+    def progress(self) -> (int, int, int):
+        """
+        (결정이 도착한 기물 수, 수락한 기물 수, 전체 기물 수)
+        """
+        decisions = [task.stream_state()[0] for task in self.tasks]
+        answered = sum(1 for d in decisions if d)
+        return answered, decisions.count("수락"), len(self.tasks)
+
+    def results(self) -> list:
+        """
+        [(request, (결정, 대사, LLM 원본 응답)), ...] - 실패한 설득은 "오류"
+        """
+        results = []
+        for task in self.tasks:
+            try:
+                result = task.result()
+            except Exception as e:
+                piece_id = task.request["piece_id"]
+                result = ("오류", f"({piece_id}가 회의에 답하지 못했습니다: {e})", "")
+            results.append((task.request, result))
+        return results
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started_at
+
+    def cancellable(self) -> bool:
+        return not self.cancelled()
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+
+    def cancelled(self) -> bool:
+        return any(task.cancelled() for task in self.tasks)
+
+
+def submit_council(requests: list) -> CouncilTask:
+    """
+    여러 설득 요청을 최대 COUNCIL_CONCURRENCY개씩 동시에 실행하고 즉시 CouncilTask를 반환합니다.
+    (동시 요청이므로 전체 대기 시간은 기물 수가 아니라 LLM 호출 한 번에 가까움)
+    """
+    return CouncilTask(
+        [
+            SINGLE_FLIGHT.get_or_start(
+                request.get("flight_key"),
+                lambda request=request: _start_task(request, _COUNCIL_EXECUTOR),
+            )
+            for request in requests
+        ]
+    )
+
+
+def completed_task(request: dict, result: tuple) -> PersuasionTask:
+    """
+    LLM을 호출할 필요 없이 결과가 이미 정해진 요청을 PersuasionTask로 감쌉니다.
+    """
+    future = Future()
+    future.set_result(result)
+    return PersuasionTask(request, future)
+
+
+def cancel_all_persuasions() -> int:
+    """
+    진행 중인 모든 설득을 취소하고 취소한 개수를 반환합니다. (새 게임 시작/종료 시)
+    """
+    with _ACTIVE_LOCK:
+        tasks = list(_ACTIVE_TASKS)
+    for task in tasks:
+        task.cancel()
+    return len(tasks)
+
+
+def shutdown_persuasion_worker():
+    cancel_all_persuasions()
+    _EXECUTOR.shutdown(wait=False, cancel_futures=True)
+    _COUNCIL_EXECUTOR.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,137 @@
+import chess
+
+# 칸 이름 -> 번호 (chess.parse_square는 64칸 목록을 매번 훑음)
+SQUARE_INDEX = {name: index for index, name in enumerate(chess.SQUARE_NAMES)}
+
+
+class PieceRegistry(dict):
+    """
+    백색 기물 ID <-> 칸을 함께 기억하는 기물 목록입니다.
+
+    기존 white_ids와 같은 {ID: 칸 이름} 딕셔너리이면서 (잡힌 기물은 None),
+    64칸 배열로 칸 -> ID도 함께 유지하므로 칸의 기물을 찾을 때
+    {v: k for k, v in white_ids.items()}를 다시 만들거나 전체를 훑을 필요가 없습니다.
+
+    - id_at(square):        칸(이름 또는 번호)에 있는 백색 기물 ID (없으면 None)
+    - apply_move(board, m): board.push(m) 직전에 호출하여 이동/잡기/캐슬링/앙파상을 반영
+    - undo(changes):        apply_move가 돌려준 변경 목록을 되돌림
+    (승진은 ID가 바뀌지 않으므로 기물 종류는 piece_data에서 따로 바꿈)
+    """
+
+    def __init__(self, ids: dict = None):
+        super().__init__()
+        self._by_square = [None] * 64
+        for piece_id, square_name in (ids or {}).items():
+            self[piece_id] = square_name
+
+    def __reduce__(self):
+        # (copy/deepcopy/pickle 시 칸 배열도 다시 만들어지도록)
+        return (type(self), (dict(self),))
+
+    # --- 1. 딕셔너리 변경 시 칸 배열도 함께 갱신 ---
+    def __setitem__(self, piece_id: str, square_name: str | None):
+        old = self.get(piece_id)
+        if old is not None:
+            index = SQUARE_INDEX[old]
+            if self._by_square[index] == piece_id:
+                self._by_square[index] = None
+        if square_name is not None:
+            self._by_square[SQUARE_INDEX[square_name]] = piece_id
+        super().__setitem__(piece_id, square_name)
+
+    def __delitem__(self, piece_id: str):
+        self[piece_id] = None
+        super().__delitem__(piece_id)
+
+    def pop(self, piece_id: str, *default):
+        if piece_id in self:
+            self[piece_id] = None
+        return super().pop(piece_id, *default)
+
+    def update(self, other=(), **kwargs):
+        for piece_id, square_name in dict(other, **kwargs).items():
+            self[piece_id] = square_name
+
+    def clear(self):
+        super().clear()
+        self._by_square = [None] * 64
+
+    def copy(self) -> "PieceRegistry":
+        return PieceRegistry(self)
+
+    # --- 2. 조회 ---
+    def id_at(self, square: int | str) -> str | None:
+        if isinstance(square, str):
+            square = SQUARE_INDEX[square]
+        return self._by_square[square]
+
+    # --- 3. 이동 반영 ---
+    def _relocate(self, piece_id: str, from_square: int, to_square: int | None):
+        # (apply_move 전용) 칸 배열과 딕셔너리를 직접 갱신하고 (ID, 이전 칸)을 반환
+        if self._by_square[from_square] == piece_id:
+            self._by_square[from_square] = None
+        if to_square is None:
+            dict.__setitem__(self, piece_id, None)
+        else:
+            self._by_square[to_square] = piece_id
+            dict.__setitem__(self, piece_id, chess.SQUARE_NAMES[to_square])
+        return (piece_id, chess.SQUARE_NAMES[from_square])
+
+    def apply_move(self, board: chess.Board, move: chess.Move) -> list:
+        """
+        board에 move를 두기 직전에 호출합니다.
+        바뀐 기물의 (ID, 이전 칸) 목록을 반환합니다. (undo에 넘기면 되돌림)
+        (수정됨: 대부분의 수는 일반 이동이므로 앙파상은 도착 칸이 ep_square일 때만,
+         캐슬링은 킹이 움직일 때만 확인하고, __setitem__ 대신 칸 배열을 직접 갱신)
+        """
+        by_square = self._by_square
+        to_square = move.to_square
+
+        # 1. 흑의 수: 잡힌 백색 기물만 반영 (앙파상이면 도착 칸이 아니라 옆 칸의 폰)
+        if board.turn != chess.WHITE:
+            captured = to_square
+            if (
+                by_square[captured] is None
+                and to_square == board.ep_square
+                and board.is_en_passant(move)
+            ):
+                captured = chess.square(
+                    chess.square_file(to_square), chess.square_rank(move.from_square)
+                )
+            captured_id = by_square[captured]
+            if captured_id is None:
+                return []
+            return [self._relocate(captured_id, captured, None)]
+
+        # 2. 캐슬링: 룩도 함께 이동
+        piece_id = by_square[move.from_square]
+        if board.kings & chess.BB_SQUARES[move.from_square] and board.is_castling(move):
+            changes = []
+            rank = chess.square_rank(move.from_square)
+            if board.is_kingside_castling(move):
+                rook_from, rook_to, king_to = (
+                    chess.square(7, rank),
+                    chess.square(5, rank),
+                    chess.square(6, rank),
+                )
+            else:
+                rook_from, rook_to, king_to = (
+                    chess.square(0, rank),
+                    chess.square(3, rank),
+                    chess.square(2, rank),
+                )
+            rook_id = by_square[rook_from]
+            if rook_id:
+                changes.append(self._relocate(rook_id, rook_from, rook_to))
+            if piece_id:
+                changes.append(self._relocate(piece_id, move.from_square, king_to))
+            return changes
+
+        # 3. 일반 이동 (승진 포함)
+        if piece_id is None:
+            return []
+        return [self._relocate(piece_id, move.from_square, to_square)]
+
+    def undo(self, changes: list):
+        for piece_id, square_name in reversed(changes):
+            self[piece_id] = square_name
@@ -0,0 +1,118 @@
+import os
+import threading
+from collections import OrderedDict
+
+import chess
+import chess.polyglot
+
+# --- 국면 캐시 설정 (.env 로 덮어쓸 수 있음) ---
+# 국면(Zobrist 해시)별 합법 수 목록을 기억하는 개수 (무르기 후 같은 국면에서 재사용)
+POSITION_CACHE_SIZE = int(os.getenv("POSITION_CACHE_SIZE", "512"))
+
+
+def build_position(board: chess.Board) -> dict:
+    """
+    국면에만 달린 정보 (기보와 무관하므로 같은 해시의 국면끼리 공유)
+      moves:   합법 수(chess.Move) 목록
+      legal:   합법 수의 UCI 집합
+      by_from: {출발 칸 번호: [UCI, ...]}
+      check:   현재 차례인 쪽이 체크 상태인지
+    """
+    moves = list(board.legal_moves)
+    by_from = {}
+    for move in moves:
+        by_from.setdefault(move.from_square, []).append(move.uci())
+    return {
+        "moves": moves,
+        "legal": {move.uci() for move in moves},
+        "by_from": by_from,
+        "check": board.is_check(),
+    }
+
+
+class PositionCache:
+    """
+    현재 국면의 합법 수 / 체크 / 게임 상태 캐시입니다.
+
+    - 합법 수와 체크는 Zobrist 해시 -> 국면 정보 LRU에 보관합니다.
+    - 현재 국면 슬롯은 invalidate()(apply_move / undo_move가 push/pop 할 때 호출)로
+      비워지며, 반복 규칙에 따라 달라지는 게임 상태(status)는 이 슬롯에만 둡니다.
+    (invalidate 없이 보드가 바뀌어도 수 기록 길이와 마지막 수가 다르면 다시 계산)
+    """
+
+    def __init__(self, max_size: int = POSITION_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self._lock = threading.Lock()
+        self._positions = OrderedDict()
+        self._version = 0
+        self._current = None  # (board, version, 수 기록 길이, 마지막 수, 슬롯)
+        self.current_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        with self._lock:
+            self._version += 1
+            self._current = None
+
+    def current(self, board: chess.Board) -> dict:
+        """
+        board 현재 국면의 슬롯: build_position의 내용 + "key"(Zobrist 해시)
+        (호출자가 "status" 같은 값을 덧붙여 다음 호출까지 재사용할 수 있음)
+        """
+        ply = len(board.move_stack)
+        last_move = board.move_stack[-1] if ply else None
+        with self._lock:
+            current = self._current
+            if (
+                current is not None
+                and current[0] is board
+                and current[1] == self._version
+                and current[2] == ply
+                and current[3] == last_move
+            ):
+                self.current_hits += 1
+                return current[4]
+            version = self._version
+
+        key = chess.polyglot.zobrist_hash(board)
+        with self._lock:
+            position = self._positions.get(key)
+            if position is not None:
+                self._positions.move_to_end(key)
+                self.hits += 1
+        if position is None:
+            position = build_position(board)
+            with self._lock:
+                self.misses += 1
+                self._positions[key] = position
+                while len(self._positions) > self.max_size:
+                    self._positions.popitem(last=False)
+
+        slot = {**position, "key": key}
+        with self._lock:
+            if version == self._version:
+                self._current = (board, version, ply, last_move, slot)
+        return slot
+
+    def legal_moves_from(self, board: chess.Board, square: int) -> list:
+        """
+        square에서 출발하는 합법 수의 UCI 목록
+        """
+        return list(self.current(board)["by_from"].get(square, ()))
+
+    def is_legal(self, board: chess.Board, uci_move: str) -> bool:
+        return uci_move in self.current(board)["legal"]
+
+    def report(self) -> str:
+        with self._lock:
+            if not self.misses:
+                return "♟️ 국면 캐시: 아직 조회 없음"
+            return (
+                f"♟️ 국면 캐시: 합법 수 계산 {self.misses}회, "
+                f"현재 국면 재사용 {self.current_hits}회, "
+                f"지나간 국면 재사용 {self.hits}회 (무르기/반복 국면)"
+            )
+
+
+POSITION_CACHE = PositionCache()
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from llm_backend import RequestCancelled
+from model_config import DIALOGUE_MODEL
+from persuade import HISTORY_MANAGER, build_system_prompt, query_ollama_stream
+
+# --- 프롬프트 예열 설정 (.env 로 덮어쓸 수 있음) ---
+# 기물을 선택하는 즉시 그 기물의 페르소나 + 대화 내역을 num_predict=0 으로 미리 보내
+# Ollama가 접두어를 평가(KV 캐시)해 두게 합니다. 대사를 입력하는 동안 평가가 끝나므로
+# 실제 설득 요청은 상황 프롬프트만 새로 평가하면 됩니다.
+PREFETCH_ENABLED = os.getenv("PROMPT_PREFETCH", "1") == "1"
+WARMUP_OPTIONS = {"num_predict": 0}
+
+
+def prefix_key(messages: list) -> str:
+    raw = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PromptPrefetcher:
+    """
+    선택된 기물 1개의 프롬프트 접두어를 백그라운드에서 예열합니다.
+
+    - warm(): 기물 선택 시 호출. 다른 기물의 예열은 취소합니다.
+      (아직 시작 전이면 실행하지 않고, 스케줄러 자리를 기다리는 중이면 요청을 보내지 않으며,
+       이미 보냈다면 다음 청크에서 스트림을 닫아 서버의 평가도 멈춤)
+    - cancel(): 선택 해제 시 호출
+    - claim(): 설득 요청 직전에 호출. 같은 접두어의 예열이 끝나 있으면 적중으로 보고
+      예열이 미리 처리한 프롬프트 평가 시간을 절약한 시간으로 기록합니다.
+    (warm/cancel/claim은 기물 데이터를 읽으므로 메인 스레드에서만 호출)
+    """
+
+    def __init__(self, stream_fn=query_ollama_stream, enabled: bool = PREFETCH_ENABLED):
+        self.stream_fn = stream_fn
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="prompt-prefetch"
+        )
+        self._current = None
+        self.warmups = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.hits = 0
+        self.late = 0  # 설득 시점에 예열이 아직 진행 중
+        self.misses = 0
+        self.saved_ms = 0.0
+
+    def _run(self, entry: dict, messages: list):
+        # (예열 스레드에서 호출됨)
+        if entry["cancelled"]:
+            return
+        stats = {}
+        started = time.perf_counter()
+        try:
+            self.stream_fn(
+                messages,
+                lambda text: None,
+                model=DIALOGUE_MODEL,
+                stats=stats,
+                options=WARMUP_OPTIONS,
+                tags={"kind": "prefetch", "piece_id": entry["piece_id"]},
+                cancelled=entry["cancel_event"],
+            )
+        except RequestCancelled:
+            # (cancel()로 취소(이미 집계됨)했거나, 설득 요청이 먼저 와서 스케줄러가 버림)
+            if not entry["cancelled"]:
+                with self._lock:
+                    self.cancelled += 1
+            return
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"프롬프트 예열 실패 ({entry['piece_id']}): {e}")
+            return
+        elapsed_ns = (time.perf_counter() - started) * 1e9
+        entry["eval_ms"] = stats.get("prompt_eval_duration", elapsed_ns) / 1e6
+        entry["ready"] = True
+
+    def warm(self, piece_id: str, piece: dict):
+        """
+        piece의 다음 설득 요청 접두어를 예열합니다. (같은 접두어가 이미 예열 중이면 무시)
+        """
+        if not self.enabled:
+            return
+        messages = HISTORY_MANAGER.prefix_messages(
+            piece_id, piece, build_system_prompt(piece_id, piece)
+        )
+        key = prefix_key(messages)
+        current = self._current
+        if current and current["key"] == key and not current["cancelled"]:
+            return
+        self.cancel()
+
+        entry = {
+            "piece_id": piece_id,
+            "key": key,
+            "cancelled": False,
+            "cancel_event": threading.Event(),
+            "ready": False,
+            "eval_ms": 0.0,
+        }
+        entry["future"] = self._executor.submit(self._run, entry, messages)
+        self._current = entry
+        with self._lock:
+            self.warmups += 1
+
+    def cancel(self):
+        """
+        진행 중이거나 대기 중인 예열을 취소합니다.
+        """
+        entry, self._current = self._current, None
+        if entry is None or entry["ready"]:
+            return
+        entry["cancelled"] = True
+        entry["cancel_event"].set()  # (진행 중이면 보내기 전/다음 청크에서 중단)
+        entry["future"].cancel()
+        with self._lock:
+            self.cancelled += 1
+
+    def claim(self, piece_id: str, messages: list) -> bool:
+        """
+        설득 요청 messages(마지막이 상황 프롬프트)가 예열된 접두어를 재사용하는지 기록합니다.
+        """
+        if not self.enabled:
+            return False
+        entry, self._current = self._current, None
+        hit = (
+            entry is not None
+            and entry["piece_id"] == piece_id
+            and entry["key"] == prefix_key(messages[:-1])
+        )
+        with self._lock:
+            if hit and entry["ready"]:
+                self.hits += 1
+                self.saved_ms += entry["eval_ms"]
+            elif hit:
+                self.late += 1
+            else:
+                self.misses += 1
+        if hit and entry["ready"]:
+            print(
+                f"🔥 {piece_id} 프롬프트 예열 적중 (약 {entry['eval_ms']:.0f}ms 절약)"
+            )
+        return hit and entry["ready"]
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.hits + self.late + self.misses
+            if not total:
+                return f"🔥 프롬프트 예열: {self.warmups}회 예열, 아직 설득 없음"
+            return (
+                f"🔥 프롬프트 예열 {self.warmups}회 (취소 {self.cancelled}, 실패 {self.failed}), "
+                f"설득 {total}건 중 적중 {self.hits}건 ({self.hits / total:.0%}), "
+                f"진행 중 {self.late}건, 빗나감 {self.misses}건, "
+                f"절약 약 {self.saved_ms:.0f}ms"
+            )
+
+    def close(self):
+        self.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+PROMPT_PREFETCHER = PromptPrefetcher()
@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import threading
+
+# --- 설득 응답 형식 (.env 로 덮어쓸 수 있음) ---
+# "json": Ollama format 스키마로 {"decision", "dialogue"} JSON 응답을 강제 (기본값)
+# "tag":  기존 [결정][너의 대답] 형식
+REPLY_FORMAT = os.getenv("PERSUASION_REPLY_FORMAT", "json")
+
+# --- LLM 응답의 결정 접두어 ---
+DECISION_TAGS = {"[수락]": "수락", "[거부]": "거부"}
+
+# Ollama chat(format=...)에 넘기는 JSON 스키마 (decision이 먼저 생성되도록 순서 유지)
+REPLY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "decision": {"type": "string", "enum": ["수락", "거부"]},
+        "dialogue": {"type": "string"},
+    },
+    "required": ["decision", "dialogue"],
+}
+
+# 결정 단계(모델 단계 분리)에서 사용하는 결정만 담은 스키마
+DECISION_SCHEMA = {
+    "type": "object",
+    "properties": {"decision": {"type": "string", "enum": ["수락", "거부"]}},
+    "required": ["decision"],
+}
+
+_JSON_DECISION = re.compile(r'"decision"\s*:\s*"\[?(수락|거부)\]?"')
+_JSON_DIALOGUE = re.compile(r'"dialogue"\s*:\s*"((?:[^"\\]|\\.)*)')
+
+
+def reply_format_options(reply_format: str = None) -> dict:
+    """
+    Ollama chat 호출에 추가할 인자를 반환합니다. (json 모드에서만 format 스키마 사용)
+    """
+    if (reply_format or REPLY_FORMAT) == "json":
+        return {"format": REPLY_SCHEMA}
+    return {}
+
+
+def decision_format_options(reply_format: str = None) -> dict:
+    """
+    결정 단계 호출에 추가할 인자를 반환합니다.
+    """
+    if (reply_format or REPLY_FORMAT) == "json":
+        return {"format": DECISION_SCHEMA}
+    return {}
+
+
+def _decode_json_fragment(fragment: str) -> str:
+    # 스트리밍 도중 잘린 이스케이프(\ 또는 \uXXXX 일부)는 떼어내고 디코딩
+    for cut in range(0, 6):
+        try:
+            return json.loads(f'"{fragment[: len(fragment) - cut]}"')
+        except ValueError:
+            continue
+    return fragment
+
+
+def parse_reply(text: str) -> (str | None, str, str | None):
+    """
+    LLM 응답을 (결정, 대사, 해석 방법)으로 나눕니다.
+
+    해석 순서:
+      1. "tag":      응답이 [수락]/[거부]로 시작
+      2. "json":     {"decision": ..., "dialogue": ...} JSON
+                     (끝이 잘린 JSON은 도착한 대사까지 "fallback"으로 해석)
+      3. "fallback": 본문 어딘가의 [수락]/[거부] 태그
+    결정을 찾지 못하면 (None, 응답 전체, None) (재시도/거부 처리로 넘어감)
+    (수정됨: 태그 없는 수락/거부 단어는 결정으로 보지 않음. "수락할 수 없습니다"처럼
+     부정문에서 결정이 뒤집히기 때문)
+    """
+    head = (text or "").strip()
+
+    # 1. 태그 접두어
+    for tag, decision in DECISION_TAGS.items():
+        if head.startswith(tag):
+            return decision, head[len(tag) :].strip(), "tag"
+
+    # 2. JSON (앞뒤에 잡담이 붙어 있어도 가장 바깥 {...}만 해석)
+    start, end = head.find("{"), head.rfind("}")
+    if start != -1 and end > start:
+        try:
+            data = json.loads(head[start : end + 1])
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            decision = str(data.get("decision", "")).strip().strip("[]")
+            if decision in ("수락", "거부"):
+                return decision, str(data.get("dialogue", "")).strip(), "json"
+
+    # 2-1. num_predict/stop에서 잘린 JSON: 도착한 대사까지만 사용
+    if head.startswith("{") and (decision_match := _JSON_DECISION.search(head)):
+        dialogue_match = _JSON_DIALOGUE.search(head)
+        dialogue = (
+            _decode_json_fragment(dialogue_match.group(1)) if dialogue_match else ""
+        )
+        return decision_match.group(1), dialogue.strip(), "fallback"
+
+    # 3. 자유 형식 응답에서 결정 찾기
+    positions = [(head.find(tag), tag) for tag in DECISION_TAGS if tag in head]
+    if positions:
+        index, tag = min(positions)
+        dialogue = re.sub(r"\s{2,}", " ", head[:index] + head[index + len(tag) :])
+        dialogue = dialogue.strip()
+        return DECISION_TAGS[tag], dialogue, "fallback"
+
+    return None, head, None
+
+
+def format_reply(decision: str, dialogue: str, reply_format: str = None) -> str:
+    """
+    (결정, 대사)를 현재 응답 형식의 LLM 응답 문자열로 만듭니다. (대화 내역 저장용)
+    """
+    if (reply_format or REPLY_FORMAT) == "json":
+        return json.dumps(
+            {"decision": decision, "dialogue": dialogue}, ensure_ascii=False
+        )
+    return f"[{decision}][{dialogue}]"
+
+
+def split_decision(text: str) -> (str | None, str):
+    """
+    응답을 (결정, 접두어를 뗀 대사)로 나눕니다. 결정을 찾지 못하면 결정은 None입니다.
+    (스트리밍 중인 JSON 응답도 지금까지 도착한 대사까지 꺼냅니다.)
+    """
+    decision, dialogue, method = parse_reply(text)
+    if method != "json" and text.lstrip().startswith("{"):
+        decision_match = _JSON_DECISION.search(text)
+        dialogue_match = _JSON_DIALOGUE.search(text)
+        decision = decision_match.group(1) if decision_match else None
+        dialogue = (
+            _decode_json_fragment(dialogue_match.group(1)) if dialogue_match else ""
+        )
+    return decision, dialogue
+
+
+def parse_decision_prefix(text: str) -> str | None:
+    """
+    (스트리밍 중인) 응답의 앞부분만 보고 결정을 판별합니다.
+    "수락"/"거부": 결정 확정, None: 아직 판단 불가
+    (수정됨: 형식이 어긋나도 "오류"로 확정하지 않고 응답이 끝난 뒤 parse_reply에 맡김)
+    """
+    head = text.lstrip()
+    for tag, decision in DECISION_TAGS.items():
+        if head.startswith(tag):
+            return decision
+    if head.startswith("{"):
+        match = _JSON_DECISION.search(head)
+        return match.group(1) if match else None
+    return None
+
+
+class FormatStats:
+    """
+    응답 형식 실패율을 집계합니다.
+
+    - strict:    현재 형식 그대로 바로 해석된 응답
+    - recovered: 형식은 어긋났지만 관대한 파서가 결정을 찾아낸 응답
+                 (예전에는 "오류"로 처리되어 LLM을 다시 호출해야 했던 경우)
+    - failed:    끝내 결정을 찾지 못한 응답
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.strict = 0
+        self.recovered = 0
+        self.failed = 0
+
+    def record(self, method: str | None, reply_format: str = None):
+        native = "json" if (reply_format or REPLY_FORMAT) == "json" else "tag"
+        with self._lock:
+            if method is None:
+                self.failed += 1
+            elif method == native:
+                self.strict += 1
+            else:
+                self.recovered += 1
+
+    def report(self) -> str:
+        with self._lock:
+            total = self.strict + self.recovered + self.failed
+            if not total:
+                return "🧩 응답 형식 통계: 아직 응답 없음"
+            before = (self.recovered + self.failed) / total
+            after = self.failed / total
+            return (
+                f"🧩 응답 형식({REPLY_FORMAT}) {total}건: 정상 {self.strict}, "
+                f"복구 {self.recovered}, 실패 {self.failed} "
+                f"(엄격한 파서 기준 실패율 {before:.0%} → 현재 {after:.0%})"
+            )
@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import chess
+
+from position_cache import POSITION_CACHE
+
+# --- 수 안전도 표 설정 (.env 로 덮어쓸 수 있음) ---
+# 국면(Zobrist 해시)별로 계산해 둔 표의 개수 (무르기/다시 두기에도 재사용)
+SAFETY_CACHE_SIZE = int(os.getenv("SAFETY_CACHE_SIZE", "256"))
+
+# 교환 평가(SEE)용 기물 가치 (킹은 마지막에만 잡으러 들어감)
+SEE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+    chess.KING: 100,
+}
+
+
+def allowed_mask(board: chess.Board, color: bool, square: int) -> int:
+    """
+    color의 기물 중 square로 잡으러 갈 수 있는 기물의 비트보드입니다.
+    (핀에 걸린 기물은 핀 방향 위의 칸으로만 움직일 수 있으므로 제외)
+    """
+    mask = board.occupied_co[color]
+    for pinned in chess.SquareSet(mask & board.attackers_mask(color, square)):
+        if not board.pin_mask(color, pinned) & chess.BB_SQUARES[square]:
+            mask &= ~chess.BB_SQUARES[pinned]
+    return mask
+
+
+def pinned_pieces(board: chess.Board) -> dict:
+    """
+    {색: {핀에 걸린 기물의 칸: 움직일 수 있는 칸의 비트보드}} (국면마다 한 번 계산)
+    """
+    pins = {}
+    for color in chess.COLORS:
+        pins[color] = {}
+        for square in chess.SquareSet(board.occupied_co[color]):
+            mask = board.pin_mask(color, square)
+            if mask != chess.BB_ALL:
+                pins[color][square] = mask
+    return pins
+
+
+def static_exchange(board: chess.Board, move: chess.Move, pins: dict = None) -> int:
+    """
+    move를 둔 뒤 도착 칸에서 양쪽이 가장 싼 기물부터 서로 잡는다고 할 때
+    수를 둔 쪽이 얻는(음수면 잃는) 기물 점수입니다. (폰 = 1)
+    (기물을 치울 때마다 그 뒤의 룩/비숍/퀸이 드러나는 엑스레이도 반영)
+    pins: pinned_pieces(board) 결과 (없으면 새로 계산)
+    """
+    to_square = move.to_square
+    occupied = board.occupied & ~chess.BB_SQUARES[move.from_square]
+
+    # 1. 처음 잡는 기물 (앙파상이면 옆 칸의 폰)
+    if board.is_en_passant(move):
+        captured = chess.PAWN
+        occupied &= ~chess.BB_SQUARES[
+            chess.square(
+                chess.square_file(to_square), chess.square_rank(move.from_square)
+            )
+        ]
+    else:
+        captured = board.piece_type_at(to_square)
+    occupied |= chess.BB_SQUARES[to_square]
+
+    gain = [SEE_VALUES[captured] if captured else 0]
+    on_square = move.promotion or board.piece_type_at(move.from_square)
+    if move.promotion:
+        gain[0] += SEE_VALUES[move.promotion] - SEE_VALUES[chess.PAWN]
+
+    # 2. 번갈아 가며 가장 싼 기물로 다시 잡기 (핀 방향 밖으로 잡으러 갈 수 없는 기물 제외)
+    color = not board.turn
+    if pins is None:
+        pins = pinned_pieces(board)
+    allowed = {}
+    for side in chess.COLORS:
+        allowed[side] = board.occupied_co[side]
+        for pinned, mask in pins[side].items():
+            if not mask & chess.BB_SQUARES[to_square]:
+                allowed[side] &= ~chess.BB_SQUARES[pinned]
+    while True:
+        attackers = (
+            board.attackers_mask(color, to_square, occupied) & occupied & allowed[color]
+        )
+        if not attackers:
+            break
+        for piece_type in SEE_VALUES:
+            candidates = attackers & board.pieces_mask(piece_type, color)
+            if candidates:
+                break
+        square = chess.lsb(candidates)
+        if piece_type == chess.KING and (
+            board.attackers_mask(not color, to_square, occupied & ~candidates)
+            & occupied
+            & allowed[not color]
+        ):
+            break  # (킹은 지켜지는 칸의 기물을 잡을 수 없음)
+        gain.append(SEE_VALUES[on_square] - gain[-1])
+        on_square = piece_type
+        occupied &= ~chess.BB_SQUARES[square]
+        color = not color
+
+    # 3. 각 차례에서 잡지 않고 멈추는 편이 나으면 멈춘다고 보고 거꾸로 정리
+    for depth in range(len(gain) - 1, 0, -1):
+        gain[depth - 1] = -max(-gain[depth - 1], gain[depth])
+    return gain[0]
+
+
+def exchange_squares(board: chess.Board, move: chess.Move) -> (int, int):
+    """
+    move를 둔 뒤의 국면에서 도착 칸을 두고 맞붙는 기물의 비트보드를 반환합니다.
+      (도착 칸의 기물을 합법적으로 잡을 수 있는 상대 기물,
+       그 칸을 다시 잡을 수 있는 아군 기물 (핀에 걸린 기물 제외, 엑스레이 포함))
+    (board는 잠시 push/pop 하지만 끝나면 원래대로 돌아옴)
+    """
+    color = board.turn
+    board.push(move)
+    try:
+        # (대부분의 수는 공격받지 않으므로 그때만 합법 수 생성을 생략)
+        capturers = 0
+        attackers = board.attackers_mask(not color, move.to_square)
+        if attackers:
+            for m in board.generate_legal_captures(
+                from_mask=attackers, to_mask=chess.BB_SQUARES[move.to_square]
+            ):
+                capturers |= chess.BB_SQUARES[m.from_square]
+        defenders = board.attackers_mask(color, move.to_square) & allowed_mask(
+            board, color, move.to_square
+        )
+    finally:
+        board.pop()
+    return capturers, defenders
+
+
+def move_safety(board: chess.Board, move: chess.Move, pins: dict = None) -> dict:
+    """
+    수 1개의 안전도: 이동한 뒤의 국면에서 세어 봅니다. (exchange_squares 기준)
+      risk:      도착 칸의 기물을 합법적으로 잡을 수 있는 상대 기물 수
+      stability: 그 칸을 다시 잡을 수 있는 아군 기물 수
+      see:       static_exchange 결과
+    """
+    see = static_exchange(board, move, pins)
+    capturers, defenders = exchange_squares(board, move)
+    return {
+        "risk": chess.popcount(capturers),
+        "stability": chess.popcount(defenders),
+        "see": see,
+    }
+
+
+def build_safety_table(board: chess.Board, moves: list = None) -> dict:
+    """
+    현재 국면의 모든 합법 수에 대한 {UCI: move_safety} 표를 만듭니다.
+    moves: 이미 구한 합법 수 목록 (없으면 board.legal_moves)
+    """
+    scratch = board.copy(stack=False)
+    pins = pinned_pieces(board)
+    if moves is None:
+        moves = board.legal_moves
+    return {move.uci(): move_safety(scratch, move, pins) for move in moves}
+
+
+class SafetyTableCache:
+    """
+    국면의 Zobrist 해시 -> 안전도 표 LRU 캐시입니다.
+    (해시와 합법 수 목록은 POSITION_CACHE에서 가져옴)
+
+    백 턴마다 표를 한 번만 만들고, 이동 칸 하이라이트 / 설득 프롬프트의 위험도·안정도 /
+    빠른 결정(DecisionScorer)이 모두 같은 표를 읽습니다.
+    """
+
+    def __init__(self, max_size: int = SAFETY_CACHE_SIZE):
+        self.max_size = max(1, max_size)
+        self._lock = threading.Lock()
+        self._tables = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.build_seconds = 0.0
+
+    def table(self, board: chess.Board) -> dict:
+        position = POSITION_CACHE.current(board)
+        key = position["key"]
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table
+
+        started = time.perf_counter()
+        table = build_safety_table(board, position["moves"])
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            self.misses += 1
+            self.build_seconds += elapsed
+            self._tables[key] = table
+            while len(self._tables) > self.max_size:
+                self._tables.popitem(last=False)
+        return table
+
+    def lookup(self, board: chess.Board, uci_move: str) -> dict | None:
+        """
+        uci_move의 안전도 (합법 수가 아니면 None)
+        """
+        return self.table(board).get(uci_move)
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
+
+    def report(self) -> str:
+        with self._lock:
+            if not self.misses:
+                return "🛡️ 수 안전도 표: 아직 계산 없음"
+            return (
+                f"🛡️ 수 안전도 표: 계산 {self.misses}회 "
+                f"(평균 {self.build_seconds / self.misses * 1000:.2f}ms), "
+                f"재사용 {self.hits}회"
+            )
+
+
+SAFETY_TABLE = SafetyTableCache()
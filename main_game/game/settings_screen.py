@@ -13,6 +13,7 @@ from gui_utils import (
     draw_button,
     draw_text_input,
 )
+from model_config import GENERATION_PROFILES
 
 
 # 헬퍼 함수: 문자열이 숫자인지 확인 (정수만)
@@ -39,6 +40,12 @@ def run_settings_screen(
         input_king_name = "아서"
         input_force_moves = "100"
 
+    # (추가됨: 생성 프로필은 입력창 대신 버튼을 눌러 순서대로 바꿈)
+    profile_names = list(GENERATION_PROFILES)
+    selected_profile = current_settings.get("profile", "balanced")
+    if selected_profile not in profile_names:
+        selected_profile = "balanced"
+
     input_texts = {
         "elo": input_elo,
         "king_name": input_king_name,
@@ -75,8 +82,12 @@ def run_settings_screen(
         "force_moves": force_moves_input_rect,
     }
 
-    save_button_rect = pygame.Rect(center_x - 100, 480, 200, 50)
-    back_button_rect = pygame.Rect(center_x - 100, 550, 200, 50)
+    profile_button_rect = pygame.Rect(
+        center_x - (INPUT_WIDTH // 2), 480, INPUT_WIDTH, INPUT_HEIGHT
+    )
+
+    save_button_rect = pygame.Rect(center_x - 100, 570, 200, 50)
+    back_button_rect = pygame.Rect(center_x - 100, 640, 200, 50)
 
     # --- 3. 이벤트 루프 시작 (설정 전용) ---
     pygame.key.start_text_input()
@@ -129,6 +140,7 @@ def run_settings_screen(
                                 "elo": elo_val,
                                 "king_name": name_val,
                                 "force_moves": force_val,
+                                "profile": selected_profile,
                             }
                             print(f"설정 저장: {new_settings}")
                             pygame.key.stop_text_input()
@@ -138,6 +150,13 @@ def run_settings_screen(
                             print("오류: ELO와 강제 이동 횟수는 숫자여야 합니다.")
                             pass
 
+                    elif profile_button_rect.collidepoint(event.pos):
+                        index = profile_names.index(selected_profile)
+                        selected_profile = profile_names[
+                            (index + 1) % len(profile_names)
+                        ]
+                        active_input = None
+
                     elif back_button_rect.collidepoint(event.pos):
                         print("선택: 뒤로 가기")
                         pygame.key.stop_text_input()
@@ -216,7 +235,21 @@ def run_settings_screen(
             cursor_on=cursor_on,
         )
 
-        # 4-5. 버튼 그리기 (버튼 폰트는 INFO_FONT_HEADER 그대로 사용)
+        # 4-5. 생성 프로필 (클릭할 때마다 빠름 -> 보통 -> 풍부함)
+        label_profile = SETTINGS_FONT_LABEL.render(
+            "대사 생성 프로필 (클릭하여 변경):", True, pygame.Color(200, 200, 200)
+        )
+        screen.blit(label_profile, (profile_button_rect.x, profile_button_rect.y - 35))
+        draw_button(
+            screen,
+            profile_button_rect,
+            f"{GENERATION_PROFILES[selected_profile]['label']} ({selected_profile})",
+            INFO_FONT_BODY,
+            pygame.Color(60, 60, 110),
+            pygame.Color(90, 90, 150),
+        )
+
+        # 4-6. 버튼 그리기 (버튼 폰트는 INFO_FONT_HEADER 그대로 사용)
         draw_button(
             screen,
             save_button_rect,
@@ -0,0 +1,161 @@
+import os
+
+import chess
+
+from safety_table import exchange_squares
+
+# --- 상황 프롬프트 형식 (.env 로 덮어쓸 수 있음) ---
+# "fen":     현재 위치 + 전체 FEN + 설명 문장 (기존 형식, 기본값)
+# "compact": 기물 주변 칸, 목표 칸의 공격자/방어자, 기물 점수, 최근 수만 고정 양식으로
+SITUATION_ENCODING = os.getenv("SITUATION_ENCODING", "fen")
+RECENT_MOVE_COUNT = int(os.getenv("SITUATION_RECENT_MOVES", "4"))
+
+# compact 형식의 기호 설명 (매 턴 반복되지 않도록 system 프롬프트에 한 번만 붙임)
+COMPACT_LEGEND = (
+    "[상황 표기] 기물 기호는 대문자가 아군(백), 소문자가 적(흑)이다 "
+    "(P폰 N나이트 B비숍 R룩 Q퀸 K킹). '주변'은 너의 바로 옆 칸, "
+    "'공격'/'방어'는 목표 칸을 노리는 적/지키는 아군, '점수'는 남은 기물 가치 합이다."
+)
+
+PIECE_VALUES = {
+    chess.PAWN: 1,
+    chess.KNIGHT: 3,
+    chess.BISHOP: 3,
+    chess.ROOK: 5,
+    chess.QUEEN: 9,
+    chess.KING: 0,
+}
+
+
+def material(board: chess.Board, color: bool) -> int:
+    return sum(
+        len(board.pieces(piece_type, color)) * value
+        for piece_type, value in PIECE_VALUES.items()
+    )
+
+
+def neighbourhood(board: chess.Board, square: int) -> str:
+    """
+    square 바로 옆 8칸 중 기물이 있는 칸만 "d1Q e1K f2P" 형식으로 나열합니다.
+    """
+    cells = []
+    for other in chess.SQUARES:
+        if other != square and chess.square_distance(square, other) == 1:
+            piece = board.piece_at(other)
+            if piece:
+                cells.append(f"{chess.square_name(other)}{piece.symbol()}")
+    return " ".join(cells) or "없음"
+
+
+def square_pieces(board: chess.Board, squares) -> str:
+    cells = [
+        f"{chess.square_name(square)}{board.piece_at(square).symbol()}"
+        for square in squares
+    ]
+    return " ".join(cells) or "없음"
+
+
+def recent_moves(board: chess.Board, count: int = RECENT_MOVE_COUNT) -> str:
+    """
+    마지막 count수를 SAN으로 반환합니다. (커스텀 FEN으로 시작해 기록이 없으면 "없음")
+    """
+    replay = board.copy()
+    popped = [replay.pop() for _ in range(min(count, len(replay.move_stack)))]
+    sans = []
+    for move in reversed(popped):
+        sans.append(replay.san(move))
+        replay.push(move)
+    return " ".join(sans) or "없음"
+
+
+def fen_situation(
+    board: chess.Board,
+    move: chess.Move,
+    morale: int,
+    risk: int,
+    stability: int,
+    persuasion_dialogue: str,
+    reply_chars: int,
+) -> str:
+    """
+    기존 상황 프롬프트: 위치, 사기, 전체 FEN과 명령 설명 문장
+    """
+    start_square_name = chess.square_name(move.from_square)
+    to_square_name = chess.square_name(move.to_square)
+    return f"""
+### 현재 상황 ###
+현재 너의 위치는 '{start_square_name}'이다.
+아군 전체의 사기는 {morale}이다.
+현재 전체 전장 상황(FEN): {board.fen()}
+
+### 왕의 명령 ###
+왕(플레이어)이 너에게 '{to_square_name}'(으)로 이동하라고 명령했다. (이동: {move.uci()})
+이 이동의 위험도(적의 공격)는 {risk}이고, 안정도(아군 방어)는 {stability}이다.
+
+왕이 다음과 같이 설득한다:
+"{persuasion_dialogue}"
+
+너의 대답(대사)은 {reply_chars}자 이내로 하라.
+"""
+
+
+def compact_situation(
+    board: chess.Board,
+    move: chess.Move,
+    morale: int,
+    risk: int,
+    stability: int,
+    persuasion_dialogue: str,
+    reply_chars: int,
+) -> str:
+    """
+    압축 상황 프롬프트: 기물이 판단에 필요한 것만 고정 양식으로
+    (주변 칸, 목표 칸의 공격자/방어자, 기물 점수, 최근 수)
+    (수정됨: 공격/방어 목록은 위험도/안정도와 같은 이동 후 국면 기준 (exchange_squares).
+     잡을 수 없는 공격자와 핀에 걸린 방어자는 빠지고, 비운 칸 뒤의 엑스레이는 들어감)
+    """
+    to_square = move.to_square
+    after = board.copy(stack=False)
+    attackers, defenders = map(chess.SquareSet, exchange_squares(after, move))
+    after.push(move)
+    return (
+        f"### 상황 ###\n"
+        f"위치 {chess.square_name(move.from_square)} | 사기 {morale} | "
+        f"점수 {material(board, chess.WHITE)}:{material(board, chess.BLACK)}\n"
+        f"주변 {neighbourhood(board, move.from_square)}\n"
+        f"최근 {recent_moves(board)}\n"
+        f"### 왕의 명령 ###\n"
+        f"{move.uci()} | 위험도 {risk} | 안정도 {stability}\n"
+        f"{chess.square_name(to_square)} 공격 {square_pieces(after, attackers)} | "
+        f"방어 {square_pieces(after, defenders)}\n"
+        f'설득: "{persuasion_dialogue}"\n'
+        f"대답 {reply_chars}자 이내"
+    )
+
+
+SITUATION_ENCODERS = {"fen": fen_situation, "compact": compact_situation}
+
+
+def encode_situation(
+    board: chess.Board,
+    move_uci: str,
+    morale: int,
+    risk: int,
+    stability: int,
+    persuasion_dialogue: str,
+    reply_chars: int,
+    encoding: str = None,
+) -> str:
+    """
+    encoding(기본 SITUATION_ENCODING) 형식의 상황 프롬프트를 만듭니다.
+    """
+    encoder = SITUATION_ENCODERS.get(encoding or SITUATION_ENCODING, fen_situation)
+    return encoder(
+        board,
+        chess.Move.from_uci(move_uci),
+        morale,
+        risk,
+        stability,
+        persuasion_dialogue,
+        reply_chars,
+    )
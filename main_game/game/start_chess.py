@@ -2,6 +2,7 @@ from persona import persona_list, NAME_LIST  # NAME_LIST를 persona.py에서 함
 import random
 import chess
 import copy
+from piece_registry import PieceRegistry
 
 
 def initialize_board(fen: str = None) -> chess.Board:
@@ -24,26 +25,24 @@ def initialize_board(fen: str = None) -> chess.Board:
         return chess.Board()
 
 
-def get_piece_id_at_square(white_ids: dict, square_name: str) -> str | None:
+def get_piece_id_at_square(white_ids: PieceRegistry, square_name: str) -> str | None:
     """
     주어진 칸 이름(e.g., 'a2')에 위치한 백색 기물의 ID(e.g., 'P1')를 찾습니다.
+    (수정됨: 전체를 훑지 않고 PieceRegistry의 칸 배열에서 바로 조회)
     """
-    # white_ids는 {ID: square_name} 형태입니다.
-    for piece_id, location in white_ids.items():
-        if location == square_name:
-            return piece_id
-    return None
+    return white_ids.id_at(square_name)
 
 
-def assign_white_piece_ids(board: chess.Board) -> dict:
+def assign_white_piece_ids(board: chess.Board) -> PieceRegistry:
     """
     보드 상태를 기반으로 '백색 기물'에만 고유 ID를 할당합니다.
     A1 -> H8 순서로 스캔하여 ID를 부여합니다.
 
     반환:
         white_piece_map: {'R1': 'a1', 'N1': 'b1', 'P1': 'a2', ...}
+        (수정됨: 칸 -> ID 조회도 되는 PieceRegistry)
     """
-    white_piece_map = {}
+    white_piece_map = PieceRegistry()
 
     # 백색 기물 종류별 카운터
     white_counters = {
@@ -188,6 +187,7 @@ def initialize_piece_data(
             "type": piece_symbol,
             "profile": selected_profile,
             "history": initial_history,
+            "summary": "",  # 토큰 예산을 넘은 오래된 대화의 요약
             "rejection_count_this_turn": 0,
             "current_square": square_name,
             "name": selected_name,  # <-- 이름 추가
@@ -0,0 +1,203 @@
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+
+# --- LLM 호출 측정 설정 (.env 로 덮어쓸 수 있음) ---
+# 경로를 지정하면 한 판이 끝날 때와 프로그램 종료 시 호출별 측정값을 JSONL로 저장
+# (비워 두면 저장 안 함. 기록마다 몇 번째 판인지 "game" 필드가 붙음)
+TELEMETRY_DUMP_PATH = os.getenv("LLM_TELEMETRY_PATH", "")
+TELEMETRY_MAX_RECORDS = int(os.getenv("LLM_TELEMETRY_MAX", "5000"))
+
+# Ollama 응답 통계(나노초) -> 기록 필드(밀리초)
+DURATION_FIELDS = {
+    "total_duration": "total_ms",
+    "load_duration": "load_ms",
+    "prompt_eval_duration": "prompt_eval_ms",
+    "eval_duration": "eval_ms",
+}
+
+# 요약 표에 넣는 지연 시간 필드
+SUMMARY_FIELDS = [
+    ("wall_ms", "전체"),
+    ("queue_ms", "클라이언트 대기열"),
+    ("overhead_ms", "네트워크/서버 대기"),
+    ("load_ms", "모델 로드"),
+    ("prompt_eval_ms", "프롬프트 평가"),
+    ("eval_ms", "생성"),
+]
+
+
+def percentile(values: list, q: float) -> float | None:
+    """
+    최근접 순위(nearest-rank) 백분위수입니다. (q: 0~100)
+    (수정됨: round()는 짝수 쪽으로 반올림해 p50/p95가 낮게 나오므로 올림으로 순위 계산)
+
+    >>> percentile([1, 2, 3, 4, 5], 50)
+    3
+    >>> percentile([5, 1, 4, 2, 3], 95)
+    5
+    >>> percentile([1, 2, 3, 4], 50)
+    2
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def build_record(
+    model: str,
+    stats: dict,
+    wall_seconds: float,
+    tags: dict = None,
+    streaming: bool = False,
+    status: str = "ok",
+) -> dict:
+    """
+    LLM 호출 1건의 측정값을 만듭니다.
+    stats: LLM 백엔드가 채운 응답 통계 (+ 라우터의 retries, endpoint)
+    queue_ms: LLM_SCHEDULER에서 자리를 기다린 시간
+    overhead_ms: 클라이언트 측 전체 시간 - 대기열 - 서버 처리 시간 (네트워크 + 서버 대기열)
+    """
+    record = {
+        "ts": time.time(),
+        "kind": "other",
+        "piece_id": "",
+        "piece_type": "",
+        **(tags or {}),
+        "model": model,
+        "stream": streaming,
+        "status": status,
+        "wall_ms": round(wall_seconds * 1000, 1),
+        "queue_ms": round(stats.get("queue_ms", 0.0), 1),
+        "retries": stats.get("retries", 0),
+        "endpoint": stats.get("endpoint", ""),
+        "prompt_eval_count": stats.get("prompt_eval_count"),
+        "eval_count": stats.get("eval_count"),
+    }
+    for field, name in DURATION_FIELDS.items():
+        value = stats.get(field)
+        record[name] = round(value / 1e6, 1) if value is not None else None
+    if record["total_ms"] is not None:
+        record["overhead_ms"] = round(
+            max(0.0, record["wall_ms"] - record["queue_ms"] - record["total_ms"]), 1
+        )
+    else:
+        record["overhead_ms"] = None
+    return record
+
+
+class LLMTelemetry:
+    """
+    LLM 호출별 측정값(응답 통계 + 클라이언트 측 시간/재시도 횟수)을 메모리에 모읍니다.
+
+    - record():     호출 1건 기록 (최근 TELEMETRY_MAX_RECORDS건만 유지)
+    - summary():    기물 종류(설득이 아닌 호출은 호출 종류)별 p50/p95/p99
+    - dump_jsonl(): 기록 전체를 JSONL 파일로 저장
+    - save_jsonl(): 아직 저장하지 않은 기록만 JSONL 파일 끝에 덧붙임 (판마다/종료 시)
+    - new_game():   이후 기록의 "game" 번호를 올림
+    """
+
+    def __init__(self, max_records: int = TELEMETRY_MAX_RECORDS):
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._game = 0  # (0: 첫 게임 전 호출, 예: 메인 메뉴의 모델 예열)
+        self._recorded = 0  # 지금까지 기록한 건수 (deque에서 밀려난 것 포함)
+        self._saved = 0  # 그중 save_jsonl로 저장한 건수
+        self._saved_paths = set()
+
+    def record(self, record: dict):
+        with self._lock:
+            self._records.append({**record, "game": self._game})
+            self._recorded += 1
+
+    def new_game(self):
+        with self._lock:
+            self._game += 1
+
+    def records(self) -> list:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self) -> dict:
+        """
+        {그룹: {"count", "errors", "retries", 필드: {"p50", "p95", "p99"}}}
+        (그룹: 기물 종류가 있으면 기물 종류, 없으면 호출 종류)
+        """
+        groups = {}
+        for record in self.records():
+            group = record.get("piece_type") or record.get("kind", "other")
+            groups.setdefault(group, []).append(record)
+
+        summary = {}
+        for group, records in groups.items():
+            ok = [r for r in records if r["status"] == "ok"]
+            row = {
+                "count": len(records),
+                "errors": len(records) - len(ok),
+                "retries": sum(r.get("retries", 0) for r in records),
+            }
+            for field, _ in SUMMARY_FIELDS:
+                values = [r[field] for r in ok if r.get(field) is not None]
+                row[field] = {f"p{q}": percentile(values, q) for q in (50, 95, 99)}
+            summary[group] = row
+        return summary
+
+    def report(self) -> str:
+        summary = self.summary()
+        if not summary:
+            return "📊 LLM 호출 측정: 아직 호출 없음"
+        lines = ["📊 LLM 호출 측정 (p50 / p95 / p99 ms):"]
+        for group, row in sorted(summary.items()):
+            lines.append(
+                f"   [{group}] {row['count']}건 (실패/취소 {row['errors']}, "
+                f"재시도 {row['retries']})"
+            )
+            for field, label in SUMMARY_FIELDS:
+                values = row[field]
+                if values["p50"] is None:
+                    continue
+                lines.append(
+                    f"      {label}: {values['p50']:.0f} / {values['p95']:.0f} / "
+                    f"{values['p99']:.0f}"
+                )
+        return "\n".join(lines)
+
+    def dump_jsonl(self, path: str) -> int:
+        """
+        기록을 path에 JSONL로 저장하고 저장한 건수를 반환합니다. (기존 파일은 덮어씀)
+        """
+        records = self.records()
+        with open(path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False))
+                f.write("\n")
+        return len(records)
+
+    def save_jsonl(self, path: str) -> int:
+        """
+        아직 저장하지 않은 기록을 path 끝에 덧붙이고 저장한 건수를 반환합니다.
+        (이 프로세스에서 path에 처음 저장할 때는 기존 파일을 덮어씀)
+        """
+        with self._lock:
+            unsaved = min(self._recorded - self._saved, len(self._records))
+            records = list(self._records)[len(self._records) - unsaved :]
+            mode = "a" if path in self._saved_paths else "w"
+            with open(path, mode, encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False))
+                    f.write("\n")
+            self._saved = self._recorded
+            self._saved_paths.add(path)
+        return len(records)
+
+
+LLM_TELEMETRY = LLMTelemetry()